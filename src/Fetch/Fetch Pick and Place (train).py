@@ -1,19 +1,33 @@
 # File: train.py
 
-import gymnasium as gym
+import os
+import sys
+
+# Make the repo's src package importable when run as `python src/Fetch/Fetch Pick and Place (train).py`
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir, os.pardir)))
+
+from src.resource_manager import configure_process_from_env
+
+# Learner process only: SubprocVecEnv workers re-import this module
+if __name__ == "__main__":
+    configure_process_from_env()
+
 import gymnasium_robotics
-from stable_baselines3 import DDPG, HerReplayBuffer
-from stable_baselines3.common.noise import NormalActionNoise
-import numpy as np
+from src.callbacks import ThroughputCallback
+from src.exploration import BatchedActionNoise, ExploringDDPG
+from stable_baselines3 import HerReplayBuffer
+from stable_baselines3.common.env_util import make_vec_env
 
 # 1. Define Model and Training Parameters
-model_class = DDPG
+model_class = ExploringDDPG
 goal_selection_strategy = "future"
 N_SAMPLED_GOAL = 4
+N_ENVS = 1
+TRAINING_STEPS = 100000
 model_path = "fetch_pick_and_place_ddpg_her.zip"
 
 # 2. Create the Gym environment
-env = gym.make("FetchPickAndPlace-v3")
+env = make_vec_env("FetchPickAndPlace-v3", n_envs=N_ENVS)
 
 # 3. Setup the HER Replay Buffer
 replay_buffer_kwargs = {
@@ -21,7 +35,8 @@ replay_buffer_kwargs = {
     "goal_selection_strategy": goal_selection_strategy,
 }
 n_actions = env.action_space.shape[-1]
-action_noise = NormalActionNoise(mean=np.zeros(n_actions), sigma=0.1 * np.ones(n_actions))
+# Gaussian noise; pass epsilon (random actions) and decay_steps to explore more early on
+action_noise = BatchedActionNoise(N_ENVS, n_actions, sigma=0.1)
 
 # 4. Instantiate the DDPG model with HER
 model = model_class(
@@ -36,7 +51,7 @@ model = model_class(
 
 # 5. Train the model
 print("Starting model training...")
-model.learn(total_timesteps=100000)
+model.learn(total_timesteps=TRAINING_STEPS, callback=ThroughputCallback())
 
 # 6. Save the trained model
 print("Training finished. Saving model...")
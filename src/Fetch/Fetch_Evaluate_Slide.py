@@ -1,13 +1,23 @@
 # File: evaluate_slide.py
 
+import os
+import sys
+
+# Make the repo's src package importable when run as `python src/Fetch/Fetch_Evaluate_Slide.py`
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir, os.pardir)))
+
 import gymnasium as gym
 import gymnasium_robotics
+from src.policy_export import ExportedPolicy, export_policy
 from stable_baselines3 import DDPG
 
 # --- Configuration ---
 # These must EXACTLY match the parameters from your successful training run
 ENV_ID = "FetchSlide-v3"
 MODEL_FILENAME = "fetch_slide_model.zip"
+# Run the actor through an exported graph instead of model.predict: ".pt" for
+# TorchScript, ".onnx" for onnxruntime (pip install onnx onnxruntime), None for model.predict
+EXPORTED_POLICY = "fetch_slide_model.pt"
 
 # --- Evaluation ---
 print(f"--- Evaluating model for {ENV_ID} ---")
@@ -18,6 +28,13 @@ eval_env = gym.make(ENV_ID, render_mode="human")
 
 # Load the trained model, providing the 'env' argument because it was trained with HER
 model = DDPG.load(MODEL_FILENAME, env=eval_env)
+policy = model
+if EXPORTED_POLICY is not None:
+    # Re-export only when the model has been retrained since the last export
+    if not os.path.exists(EXPORTED_POLICY) or os.path.getmtime(EXPORTED_POLICY) < os.path.getmtime(MODEL_FILENAME):
+        export_policy(model, EXPORTED_POLICY)
+    policy = ExportedPolicy(EXPORTED_POLICY)
+    print(f"Using exported policy: {EXPORTED_POLICY}")
 
 # Run the evaluation loop for 10 episodes
 for episode in range(10):
@@ -26,7 +43,7 @@ for episode in range(10):
     done = False
     while not done:
         # Use the trained policy to predict the best action
-        action, _states = model.predict(obs, deterministic=True)
+        action, _states = policy.predict(obs, deterministic=True)
         # Take the action in the environment
         obs, reward, terminated, truncated, info = eval_env.step(action)
         # Check if the episode has ended
@@ -1,6 +1,19 @@
 # Fetch Slide Environment Hyperparameter Tuning with SAC using Optuna
+import os
+import sys
+
+# Make the repo's src package importable when run as `python src/Fetch/Fetch_Slide_Train_HP_Tune_SAC.py`
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir, os.pardir)))
+
+from src.resource_manager import configure_process_from_env
+
+# Learner process only: SubprocVecEnv workers re-import this module
+if __name__ == "__main__":
+    configure_process_from_env()
+
 import gymnasium as gym
 import gymnasium_robotics
+from src.callbacks import ThroughputCallback
 from stable_baselines3 import SAC, HerReplayBuffer
 from stable_baselines3.common.callbacks import BaseCallback
 from stable_baselines3.common.monitor import Monitor
@@ -62,7 +75,7 @@ def objective(trial: optuna.Trial) -> float:
     )
 
     # Train the model
-    model.learn(total_timesteps=N_TIMESTEPS)
+    model.learn(total_timesteps=N_TIMESTEPS, callback=ThroughputCallback())
 
     # 3. Evaluate the Trained Model
     eval_env = gym.make(ENV_ID)
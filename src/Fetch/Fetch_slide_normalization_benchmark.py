@@ -0,0 +1,89 @@
+import os
+import sys
+
+# Make the repo's src package importable when run as `python src/Fetch/Fetch_slide_normalization_benchmark.py`
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir, os.pardir)))
+
+from src.resource_manager import configure_process_from_env
+
+# Learner process only: SubprocVecEnv workers re-import this module
+if __name__ == "__main__":
+    configure_process_from_env()
+
+import gymnasium as gym
+import gymnasium_robotics
+from src.callbacks import SuccessThresholdCallback, ThroughputCallback
+from src.metrics import make_sb3_logger
+from src.normalization import make_normalized_vec_env, save_with_stats
+from stable_baselines3 import DDPG, HerReplayBuffer
+from stable_baselines3.common.monitor import Monitor
+from stable_baselines3.common.noise import NormalActionNoise
+from stable_baselines3.common.vec_env import DummyVecEnv, SubprocVecEnv
+import numpy as np
+
+# --- Configuration ---
+# Compares steps-to-threshold of DDPG+HER on FetchSlide with and without
+# goal-aware observation normalization.
+ENV_ID = "FetchSlide-v3"
+N_ENVS = 4
+SEEDS = [0, 1, 2]
+TRAINING_STEPS = 1_000_000
+SUCCESS_THRESHOLD = 0.5
+# Vector steps between two merges of the workers' normalization statistics
+SYNC_EVERY = 50
+LOG_DIR = "./her_fetch_slide_tensorboard/"
+
+
+def make_env():
+    return Monitor(gym.make(ENV_ID))
+
+
+def train(normalize: bool, seed: int):
+    """
+    Train one run and return the timestep at which SUCCESS_THRESHOLD was
+    reached (None if it never was).
+    """
+    if normalize:
+        env = make_normalized_vec_env(make_env, n_envs=N_ENVS, vec_env_cls=SubprocVecEnv, sync_every=SYNC_EVERY)
+    else:
+        env = SubprocVecEnv([make_env] * N_ENVS) if N_ENVS > 1 else DummyVecEnv([make_env])
+
+    n_actions = env.action_space.shape[-1]
+    model = DDPG(
+        "MultiInputPolicy",
+        env,
+        replay_buffer_class=HerReplayBuffer,
+        replay_buffer_kwargs=dict(n_sampled_goal=4, goal_selection_strategy="future"),
+        action_noise=NormalActionNoise(mean=np.zeros(n_actions), sigma=0.1 * np.ones(n_actions)),
+        seed=seed,
+        verbose=0,
+    )
+    run_name = f"DDPG_{'norm' if normalize else 'raw'}_s{seed}"
+    model.set_logger(make_sb3_logger(LOG_DIR + run_name, window_steps=10_000))
+
+    threshold_callback = SuccessThresholdCallback(SUCCESS_THRESHOLD, check_freq=1000, stop_on_threshold=True, verbose=1)
+    model.learn(total_timesteps=TRAINING_STEPS, callback=[threshold_callback, ThroughputCallback()])
+    model.logger.close()
+
+    if normalize:
+        env.freeze()
+        save_with_stats(model, f"fetch_slide_{run_name}.zip")
+    else:
+        model.save(f"fetch_slide_{run_name}.zip")
+    env.close()
+    return threshold_callback.threshold_timestep
+
+
+if __name__ == "__main__":
+    results = {True: [], False: []}
+    for seed in SEEDS:
+        for normalize in (False, True):
+            print(f"--- Training {ENV_ID}, normalize={normalize}, seed={seed} ---")
+            results[normalize].append(train(normalize, seed))
+
+    print(f"\n--- Steps to {SUCCESS_THRESHOLD:.0%} rollout success on {ENV_ID} ---")
+    for normalize, label in ((False, "unnormalized"), (True, "normalized")):
+        steps = results[normalize]
+        reached = [s for s in steps if s is not None]
+        summary = f"median {int(np.median(reached)):,}" if reached else "threshold not reached"
+        print(f"{label:>13}: {steps}  ({len(reached)}/{len(steps)} reached, {summary})")
@@ -0,0 +1,71 @@
+import os
+import sys
+
+# Make the repo's src package importable when run as `python src/Fetch/Fetch_train_multitask.py`
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir, os.pardir)))
+
+from src.resource_manager import configure_process_from_env
+
+# Learner process only: SubprocVecEnv workers re-import this module
+# Env workers are pinned to allocation["env_workers"] (see ENV_WORKERS)
+if __name__ == "__main__":
+    allocation = configure_process_from_env()
+
+import gymnasium_robotics
+from src.callbacks import ThroughputCallback
+from src.exploration import BatchedActionNoise, ExploringDDPG
+from src.metrics import make_sb3_logger
+from src.multitask import PerTaskSuccessCallback, TaskBalancedHerReplayBuffer, make_multitask_vec_env
+from stable_baselines3.common.monitor import Monitor
+
+# --- Configuration ---
+# One learner, one replay buffer and one set of weights for the whole Fetch family
+ENV_IDS = ["FetchSlide-v3", "FetchPickAndPlace-v3", "FetchPush-v3"]
+TASK_NAMES = ["slide", "pick_and_place", "push"]
+ENVS_PER_TASK = 2
+MODEL_FILENAME = "fetch_multitask_model.zip"
+LOG_DIR = "./her_fetch_multitask_tensorboard/"
+TRAINING_STEPS = 3_000_000
+LOG_WINDOW_STEPS = 10_000
+
+
+if __name__ == "__main__":
+    # --- Environment and Model Setup ---
+    train_env, env_tasks = make_multitask_vec_env(
+        ENV_IDS,
+        envs_per_task=ENVS_PER_TASK,
+        worker_cores=allocation["env_workers"],
+        wrapper=Monitor,
+    )
+
+    n_actions = train_env.action_space.shape[-1]
+    action_noise = BatchedActionNoise(
+        train_env.num_envs, n_actions, sigma=0.1, epsilon=0.3, decay_steps=TRAINING_STEPS, final_scale=0.2
+    )
+
+    model = ExploringDDPG(
+        "MultiInputPolicy",
+        train_env,
+        replay_buffer_class=TaskBalancedHerReplayBuffer,
+        replay_buffer_kwargs=dict(
+            n_sampled_goal=4,
+            goal_selection_strategy="future",
+            env_tasks=env_tasks,
+        ),
+        action_noise=action_noise,
+        # Every worker must finish an episode (50 steps) before the first update
+        learning_starts=100 * train_env.num_envs,
+        verbose=0,
+    )
+    model.set_logger(make_sb3_logger(LOG_DIR + "DDPG", window_steps=LOG_WINDOW_STEPS))
+
+    # --- Training ---
+    print(f"--- Starting multi-task training on {', '.join(ENV_IDS)} ({train_env.num_envs} workers) ---")
+    model.learn(
+        total_timesteps=TRAINING_STEPS,
+        callback=[PerTaskSuccessCallback(env_tasks, TASK_NAMES), ThroughputCallback()],
+    )
+    model.logger.close()
+    model.save(MODEL_FILENAME)
+    print(f"--- Training Complete. Model saved to {MODEL_FILENAME} ---")
+    train_env.close()
@@ -1,10 +1,24 @@
 
-import gymnasium as gym
+import os
+import sys
+
+# Make the repo's src package importable when run as `python src/Fetch/Fetch_train_slide.py`
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir, os.pardir)))
+
+from src.resource_manager import configure_process_from_env
+
+# Learner process only: SubprocVecEnv workers re-import this module
+if __name__ == "__main__":
+    configure_process_from_env()
+
 import gymnasium_robotics
-# FIX 2A: Import DDPG AND HerReplayBuffer
-from stable_baselines3 import DDPG, HerReplayBuffer
-from stable_baselines3.common.noise import NormalActionNoise
-import numpy as np
+from src.callbacks import ThroughputCallback
+from src.checkpointing import IncrementalCheckpointCallback, load_checkpoint
+from src.exploration import BatchedActionNoise, ExploringDDPG
+from src.metrics import make_sb3_logger
+# FIX 2A: Import HerReplayBuffer (DDPG comes in as ExploringDDPG)
+from stable_baselines3 import HerReplayBuffer
+from stable_baselines3.common.env_util import make_vec_env
 
 # --- Configuration ---
 # FIX 1: Use the v3 version of the environment
@@ -12,9 +26,23 @@ ENV_ID = "FetchSlide-v3"
 MODEL_FILENAME = "fetch_slide_model.zip"
 LOG_DIR = "./her_fetch_slide_tensorboard/"
 TRAINING_STEPS = 1_000_000
+# Each TensorBoard point is the mean/min/max over this many steps
+LOG_WINDOW_STEPS = 10_000
+N_ENVS = 1
+# Exploration: Gaussian noise, optionally with epsilon-random actions. Set
+# NOISE_DECAY_STEPS (e.g. to TRAINING_STEPS) to decay both linearly to
+# NOISE_FINAL_SCALE of their initial value
+ACTION_NOISE_SIGMA = 0.1
+RANDOM_ACTION_EPS = 0.0
+NOISE_DECAY_STEPS = None
+NOISE_FINAL_SCALE = 0.2
+# Weights, optimizer state and replay buffer are checkpointed here; a restarted
+# run resumes from the last checkpoint
+CHECKPOINT_DIR = "./checkpoints/fetch_slide/"
+CHECKPOINT_FREQ = 50_000
 
 # --- Environment and Model Setup ---
-train_env = gym.make(ENV_ID)
+train_env = make_vec_env(ENV_ID, n_envs=N_ENVS)
 
 # FIX 2B: Use the HerReplayBuffer class directly, not the string "her"
 replay_buffer_class = HerReplayBuffer
@@ -24,21 +52,41 @@ replay_buffer_kwargs = dict(
     #max_episode_length=50 # This should match the environment's time limit
 )
 n_actions = train_env.action_space.shape[-1]
-action_noise = NormalActionNoise(mean=np.zeros(n_actions), sigma=0.1 * np.ones(n_actions))
-
-model = DDPG(
-    "MultiInputPolicy",
-    train_env,
-    replay_buffer_class=replay_buffer_class,
-    replay_buffer_kwargs=replay_buffer_kwargs,
-    action_noise=action_noise,
-    verbose=1,
-    tensorboard_log=LOG_DIR,
+action_noise = BatchedActionNoise(
+    N_ENVS,
+    n_actions,
+    sigma=ACTION_NOISE_SIGMA,
+    epsilon=RANDOM_ACTION_EPS,
+    decay_steps=NOISE_DECAY_STEPS,
+    final_scale=NOISE_FINAL_SCALE,
 )
 
+model = load_checkpoint(ExploringDDPG, CHECKPOINT_DIR, env=train_env)
+resumed = model is not None
+if not resumed:
+    model = ExploringDDPG(
+        "MultiInputPolicy",
+        train_env,
+        replay_buffer_class=replay_buffer_class,
+        replay_buffer_kwargs=replay_buffer_kwargs,
+        action_noise=action_noise,
+        verbose=0,
+    )
+# Buffered TensorBoard logging instead of the default per-dump writer and stdout table
+model.set_logger(make_sb3_logger(LOG_DIR + "DDPG", window_steps=LOG_WINDOW_STEPS))
+
 # --- Training ---
-print(f"--- Starting training for {ENV_ID} ---")
-model.learn(total_timesteps=TRAINING_STEPS)
+checkpoint_callback = IncrementalCheckpointCallback(CHECKPOINT_FREQ // N_ENVS, CHECKPOINT_DIR)
+if resumed:
+    print(f"--- Resuming training for {ENV_ID} from step {model.num_timesteps} ---")
+else:
+    print(f"--- Starting training for {ENV_ID} ---")
+model.learn(
+    total_timesteps=max(TRAINING_STEPS - model.num_timesteps, 0),
+    callback=[checkpoint_callback, ThroughputCallback()],
+    reset_num_timesteps=not resumed,
+)
+model.logger.close()
 model.save(MODEL_FILENAME)
 print(f"--- Training Complete. Model saved to {MODEL_FILENAME} ---")
 train_env.close()
\ No newline at end of file
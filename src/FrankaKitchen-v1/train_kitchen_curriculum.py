@@ -0,0 +1,111 @@
+import os
+import sys
+
+# Make the repo's src package importable when run as `python src/FrankaKitchen-v1/train_kitchen_curriculum.py`
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir, os.pardir)))
+
+from src.resource_manager import configure_process_from_env, pinned_env_fn
+
+# Learner process only: SubprocVecEnv workers re-import this module
+# Env workers are pinned to allocation["env_workers"] (see ENV_WORKERS)
+if __name__ == "__main__":
+    allocation = configure_process_from_env()
+
+import gymnasium as gym
+import gymnasium_robotics
+from src.callbacks import ThroughputCallback
+from src.curriculum import CurriculumCallback, KitchenCurriculumWrapper, latest_stage_checkpoint
+from src.metrics import make_sb3_logger
+from stable_baselines3 import SAC
+from stable_baselines3.common.monitor import Monitor
+from stable_baselines3.common.vec_env import SubprocVecEnv
+from gymnasium.wrappers import FlattenObservation
+
+# --- Configuration ---
+ENV_ID = "FrankaKitchen-v1"
+# Tasks are added to the curriculum in this order
+TASK_SEQUENCE = ["microwave", "kettle", "light switch", "slide cabinet"]
+# Rolling success rate that moves the curriculum to the next stage
+SUCCESS_THRESHOLD = 0.8
+N_ENVS = 4
+MODEL_FILENAME = "kitchen_curriculum_model"
+TRAINING_STEPS = 3_000_000
+LOG_DIR = "./logs/curriculum/"
+MODEL_DIR = "./models/curriculum/"
+# Each TensorBoard point is the mean/min/max over this many steps
+LOG_WINDOW_STEPS = 10_000
+
+# --- Environment Setup ---
+def make_env():
+    # Built with the whole sequence so the observation shape is the same in every stage
+    env = gym.make(ENV_ID, tasks_to_complete=TASK_SEQUENCE, render_mode=None)
+    env = KitchenCurriculumWrapper(env, TASK_SEQUENCE)
+    # Flatten the observation space to handle nested Dict spaces
+    env = FlattenObservation(env)
+    return Monitor(env)
+
+
+if __name__ == "__main__":
+    os.makedirs(LOG_DIR, exist_ok=True)
+    os.makedirs(MODEL_DIR, exist_ok=True)
+
+    # --- Model Setup (warm-started from the last completed stage if there is one) ---
+    checkpoint = latest_stage_checkpoint(MODEL_DIR)
+    start_stage = 0
+    if checkpoint is not None:
+        completed_stage, model_path, buffer_path = checkpoint
+        if completed_stage >= len(TASK_SEQUENCE) - 1:
+            print(f"--- All {len(TASK_SEQUENCE)} curriculum stages are already complete ({model_path}) ---")
+            sys.exit(0)
+        start_stage = completed_stage + 1
+
+    worker_cores = allocation["env_workers"]
+    env_fns = [pinned_env_fn(make_env, worker_cores[i % len(worker_cores)]) if worker_cores else make_env
+               for i in range(N_ENVS)]
+    env = SubprocVecEnv(env_fns)
+
+    if checkpoint is not None:
+        print(f"--- Resuming from {model_path} (stage {completed_stage} completed) ---")
+        model = SAC.load(model_path, env=env, device="cuda")
+        if buffer_path is not None:
+            model.load_replay_buffer(buffer_path)
+    else:
+        model = SAC(
+            "MlpPolicy",
+            env,
+            learning_rate=1e-3,
+            buffer_size=1_000_000,
+            learning_starts=1000,
+            batch_size=256,
+            tau=0.05,
+            gamma=0.95,
+            train_freq=1,
+            gradient_steps=1,
+            verbose=0,
+            device="cuda",
+        )
+    model.set_logger(make_sb3_logger(os.path.join(LOG_DIR, "SAC"), window_steps=LOG_WINDOW_STEPS))
+
+    curriculum_callback = CurriculumCallback(
+        TASK_SEQUENCE,
+        success_threshold=SUCCESS_THRESHOLD,
+        checkpoint_dir=MODEL_DIR,
+        start_stage=start_stage,
+    )
+
+    # --- Training ---
+    print(f"--- Curriculum training on {TASK_SEQUENCE} ---")
+    model.learn(
+        total_timesteps=max(TRAINING_STEPS - model.num_timesteps, 0),
+        callback=[curriculum_callback, ThroughputCallback()],
+        # Dump every few episodes (~280 steps each) so each LOG_WINDOW_STEPS window aggregates several points
+        log_interval=4,
+        reset_num_timesteps=checkpoint is None,
+    )
+    model.logger.close()
+
+    model.save(os.path.join(MODEL_DIR, MODEL_FILENAME))
+    for stage, timestep in curriculum_callback.stage_timesteps:
+        print(f"Stage {stage} {TASK_SEQUENCE[:stage + 1]} completed at step {timestep:,}")
+    print(f"--- Training complete. Model saved to {MODEL_DIR}{MODEL_FILENAME} ---")
+    env.close()
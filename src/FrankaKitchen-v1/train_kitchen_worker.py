@@ -1,13 +1,27 @@
+import os
+import sys
+
+# Make the repo's src package importable when run as `python src/FrankaKitchen-v1/train_kitchen_worker.py`
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir, os.pardir)))
+
+from src.resource_manager import configure_process_from_env
+
+# Learner process only: SubprocVecEnv workers re-import this module
+if __name__ == "__main__":
+    configure_process_from_env()
+
 import gymnasium as gym
 import gymnasium_robotics
+from src.callbacks import LiveRewardPlotCallback, ThroughputCallback
+from src.checkpointing import IncrementalCheckpointCallback, load_checkpoint
+from src.metrics import make_sb3_logger
 from stable_baselines3 import SAC
 from stable_baselines3.her.her_replay_buffer import HerReplayBuffer
-from stable_baselines3.common.callbacks import EvalCallback, CheckpointCallback
+from stable_baselines3.common.callbacks import EvalCallback
 from stable_baselines3.common.monitor import Monitor
 from stable_baselines3.common.vec_env import DummyVecEnv
 from gymnasium.wrappers import FlattenObservation
 import numpy as np
-import os
 
 # --- Configuration ---
 ENV_ID = "FrankaKitchen-v1"
@@ -15,10 +29,10 @@ MODEL_FILENAME = "kitchen_microwave_model"
 TRAINING_STEPS = 1_000_000
 LOG_DIR = "./logs/"
 MODEL_DIR = "./models/"
-
-# Create directories
-os.makedirs(LOG_DIR, exist_ok=True)
-os.makedirs(MODEL_DIR, exist_ok=True)
+# Weights, optimizer state and replay buffer; a restarted run resumes from here
+CHECKPOINT_DIR = os.path.join(MODEL_DIR, "checkpoint")
+# Each TensorBoard point is the mean/min/max over this many steps
+LOG_WINDOW_STEPS = 10_000
 
 # --- Environment Setup ---
 def make_env():
@@ -31,10 +45,8 @@ def make_env():
     env = FlattenObservation(env)
     return env
 
-env = make_env()
-env = Monitor(env, LOG_DIR)
 
-# Create evaluation environment
+# Evaluation environment
 def make_eval_env():
     eval_env = gym.make(
         ENV_ID,
@@ -44,57 +56,78 @@ def make_eval_env():
     eval_env = FlattenObservation(eval_env)
     return eval_env
 
-eval_env = make_eval_env()
-eval_env = Monitor(eval_env, LOG_DIR + "eval/")
-
-# --- Model Setup ---
-# For flattened environments, we can't use HER directly
-# Use standard SAC without HER for now
-model = SAC(
-    "MlpPolicy",  # Changed from MultiInputPolicy to MlpPolicy for flattened obs
-    env,
-    learning_rate=1e-3,
-    buffer_size=1_000_000,
-    learning_starts=1000,
-    batch_size=256,
-    tau=0.05,
-    gamma=0.95,
-    train_freq=1,
-    gradient_steps=1,
-    verbose=1,
-    device="cuda",
-    tensorboard_log=LOG_DIR
-)
-
-# --- Callbacks ---
-eval_callback = EvalCallback(
-    eval_env,
-    best_model_save_path=MODEL_DIR,
-    log_path=LOG_DIR,
-    eval_freq=10000,
-    deterministic=True,
-    render=False
-)
-
-checkpoint_callback = CheckpointCallback(
-    save_freq=50000,
-    save_path=MODEL_DIR,
-    name_prefix=MODEL_FILENAME
-)
-
-# --- Training ---
-print(f"--- Training agent for task: 'microwave' ---")
-print(f"Total timesteps: {TRAINING_STEPS}")
-
-model.learn(
-    total_timesteps=TRAINING_STEPS,
-    callback=[eval_callback, checkpoint_callback],
-    log_interval=1000
-)
-
-# Save final model
-model.save(os.path.join(MODEL_DIR, MODEL_FILENAME))
-print(f"--- Training complete. Model saved to {MODEL_DIR}{MODEL_FILENAME} ---")
-
-env.close()
-eval_env.close()
\ No newline at end of file
+
+# The reward plot renderer is a spawned process, which re-imports this script
+if __name__ == "__main__":
+    # Create directories
+    os.makedirs(LOG_DIR, exist_ok=True)
+    os.makedirs(MODEL_DIR, exist_ok=True)
+
+    # --- Environment Setup ---
+    env = make_env()
+    env = Monitor(env, LOG_DIR)
+
+    eval_env = make_eval_env()
+    eval_env = Monitor(eval_env, LOG_DIR + "eval/")
+
+    # --- Model Setup ---
+    # For flattened environments, we can't use HER directly
+    # Use standard SAC without HER for now
+    model = load_checkpoint(SAC, CHECKPOINT_DIR, env=env, device="cuda")
+    resumed = model is not None
+    if not resumed:
+        model = SAC(
+            "MlpPolicy",  # Changed from MultiInputPolicy to MlpPolicy for flattened obs
+            env,
+            learning_rate=1e-3,
+            buffer_size=1_000_000,
+            learning_starts=1000,
+            batch_size=256,
+            tau=0.05,
+            gamma=0.95,
+            train_freq=1,
+            gradient_steps=1,
+            verbose=0,
+            device="cuda",
+        )
+    # Buffered TensorBoard logging instead of the default per-dump writer and stdout table
+    model.set_logger(make_sb3_logger(os.path.join(LOG_DIR, "SAC"), window_steps=LOG_WINDOW_STEPS))
+
+    # --- Callbacks ---
+    eval_callback = EvalCallback(
+        eval_env,
+        best_model_save_path=MODEL_DIR,
+        log_path=LOG_DIR,
+        eval_freq=10000,
+        deterministic=True,
+        render=False
+    )
+
+    # Redraws LOG_DIR/rewards.png in a background process as episodes finish
+    reward_plot_callback = LiveRewardPlotCallback(os.path.join(LOG_DIR, "rewards.png"), plot_freq=10000)
+
+    # Writes only the replay buffer rows added since the previous checkpoint
+    checkpoint_callback = IncrementalCheckpointCallback(save_freq=50000, checkpoint_dir=CHECKPOINT_DIR)
+
+    # --- Training ---
+    print(f"--- Training agent for task: 'microwave' ---")
+    print(f"Total timesteps: {TRAINING_STEPS}")
+    if resumed:
+        print(f"Resuming from step {model.num_timesteps}")
+
+    model.learn(
+        total_timesteps=max(TRAINING_STEPS - model.num_timesteps, 0),
+        callback=[eval_callback, checkpoint_callback, reward_plot_callback, ThroughputCallback()],
+        # Dump every few episodes (~280 steps each) so each LOG_WINDOW_STEPS window aggregates several points
+        log_interval=4,
+        reset_num_timesteps=not resumed,
+    )
+
+    model.logger.close()
+
+    # Save final model
+    model.save(os.path.join(MODEL_DIR, MODEL_FILENAME))
+    print(f"--- Training complete. Model saved to {MODEL_DIR}{MODEL_FILENAME} ---")
+
+    env.close()
+    eval_env.close()
@@ -0,0 +1,777 @@
+"""
+Distributed actor-learner training around Stable-Baselines3 off-policy models.
+
+One learner process owns the model and its replay buffer. It listens on a
+TCP port (``multiprocessing.connection``, authenticated with a shared key;
+loopback only unless ``ACTOR_LEARNER_AUTHKEY`` is set), which also serves as
+the broker actors connect to. Actor processes, on this node or others,
+receive the env spec and policy from the learner, step their own vector env
+and stream transitions back in batched binary messages (a JSON header
+followed by raw numpy arrays). The learner writes those batches
+straight into the buffer arrays, trains, and broadcasts the actor network's
+weights every ``broadcast_every`` gradient steps.
+
+For goal-conditioned envs, actors relabel every finished episode with HER
+("future" goals) before sending it, so the learner uses a plain replay buffer.
+
+Throughput is logged per actor (``actors/<id>/...``) and for the learner
+(``learner/...``).
+
+Usage:
+    python -m src.actor_learner local --env FetchSlide-v3 --algo SAC --actors 4 --steps 1000000
+    ACTOR_LEARNER_AUTHKEY=<secret> python -m src.actor_learner learner --env FetchSlide-v3 --algo SAC --host 0.0.0.0 --port 6000
+    python -m src.actor_learner actor --connect learner-host:6000 --n-envs 2 --actor-id 3
+"""
+
+import argparse
+import io
+import ipaddress
+import json
+import multiprocessing as mp
+import os
+import queue
+import socket
+import struct
+import threading
+import time
+from collections import deque
+from multiprocessing.connection import Client, Connection, Listener
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.resource_manager import configure_process, plan_runs
+
+AUTHKEY_ENV = "ACTOR_LEARNER_AUTHKEY"
+DEFAULT_PORT = 6000
+
+MSG_HELLO = b"H"
+MSG_POLICY = b"P"
+MSG_WEIGHTS = b"W"
+MSG_BATCH = b"B"
+MSG_CLOSE = b"C"
+
+
+def default_authkey() -> bytes:
+    """
+    Shared key from ``ACTOR_LEARNER_AUTHKEY`` (set the same value on every node).
+
+    Without the variable this is a fixed, publicly known key, which the
+    learner only accepts when it listens on a loopback address.
+    """
+    return os.environ.get(AUTHKEY_ENV, "actor-learner").encode("utf-8")
+
+
+def _is_loopback(host: str) -> bool:
+    try:
+        return ipaddress.ip_address(socket.gethostbyname(host)).is_loopback
+    except (OSError, ValueError):
+        return False
+
+
+def pack_message(tag: bytes, header: Dict[str, Any], payload: bytes = b"") -> bytes:
+    """One-byte tag, 4-byte header length, JSON header, raw payload."""
+    header_bytes = json.dumps(header).encode("utf-8")
+    return b"".join((tag, struct.pack("<I", len(header_bytes)), header_bytes, payload))
+
+
+def unpack_message(data: bytes) -> Tuple[bytes, Dict[str, Any], memoryview]:
+    """Inverse of ``pack_message``; the payload is a view into ``data``."""
+    view = memoryview(data)
+    (header_length,) = struct.unpack_from("<I", view, 1)
+    header = json.loads(bytes(view[5:5 + header_length]))
+    return bytes(view[:1]), header, view[5 + header_length:]
+
+
+def encode_batch(arrays: Dict[str, np.ndarray], meta: Dict[str, Any]) -> bytes:
+    """
+    Encode named arrays and metadata as one batch message.
+
+    Args:
+        arrays: Arrays to send (e.g. ``obs.observation``, ``actions``, ``rewards``)
+        meta: JSON-serializable metadata (actor id, step counts, episode stats)
+
+    Returns:
+        Message bytes
+    """
+    arrays = {name: np.ascontiguousarray(array) for name, array in arrays.items()}
+    header = {"meta": meta, "arrays": [[name, array.dtype.str, list(array.shape)] for name, array in arrays.items()]}
+    return pack_message(MSG_BATCH, header, b"".join(array.tobytes() for array in arrays.values()))
+
+
+def decode_batch(header: Dict[str, Any], payload: memoryview) -> Dict[str, np.ndarray]:
+    """Arrays of a batch message, as read-only views into its payload."""
+    arrays, offset = {}, 0
+    for name, dtype, shape in header["arrays"]:
+        dtype = np.dtype(dtype)
+        if dtype.hasobject:
+            raise ValueError(f"Array {name} has a non-numeric dtype {dtype}")
+        count = int(np.prod(shape))
+        if count < 0 or offset + count * dtype.itemsize > len(payload):
+            raise ValueError(f"Array {name} of shape {shape} does not fit in the payload")
+        arrays[name] = np.frombuffer(payload, dtype=dtype, count=count, offset=offset).reshape(shape)
+        offset += count * dtype.itemsize
+    if offset != len(payload):
+        raise ValueError(f"{len(payload) - offset} trailing payload bytes")
+    return arrays
+
+
+def make_env_fn(env_id: str, env_kwargs: Optional[Dict[str, Any]] = None, flatten: bool = False) -> Callable:
+    """Env factory for learner and actors (``flatten`` for FrankaKitchen's nested observations)."""
+    def _init():
+        import gymnasium as gym
+        import gymnasium_robotics
+        from gymnasium.wrappers import FlattenObservation
+
+        gym.register_envs(gymnasium_robotics)
+        env = gym.make(env_id, **(env_kwargs or {}))
+        return FlattenObservation(env) if flatten else env
+
+    return _init
+
+
+def _state_dict_bytes(module) -> bytes:
+    import torch as th
+
+    buffer = io.BytesIO()
+    th.save({key: value.cpu() for key, value in module.state_dict().items()}, buffer)
+    return buffer.getvalue()
+
+
+# --- Actor ---
+
+def _index_obs(obs, i: int):
+    return {key: value[i] for key, value in obs.items()} if isinstance(obs, dict) else obs[i]
+
+
+def _stack_obs(items: List) -> Any:
+    if isinstance(items[0], dict):
+        return {key: np.stack([item[key] for item in items]) for key in items[0]}
+    return np.stack(items)
+
+
+def her_relabel(episode: Dict[str, Any], compute_reward: Callable, n_sampled_goal: int,
+                rng: np.random.Generator) -> Dict[str, Any]:
+    """
+    Add ``n_sampled_goal`` "future" relabellings of every transition of one episode.
+
+    Args:
+        episode: Stacked ``obs``/``next_obs`` dicts and ``actions``, ``rewards``, ``dones``, ``timeouts``, ``infos``
+        compute_reward: The env's ``compute_reward(achieved_goal, desired_goal, infos)``
+        n_sampled_goal: Relabelled copies per transition
+        rng: Random generator
+
+    Returns:
+        Episode with the relabelled transitions appended
+    """
+    length = len(episode["actions"])
+    t = np.repeat(np.arange(length), n_sampled_goal)
+    # Inclusive of the transition itself, as in SB3's HerReplayBuffer
+    future = rng.integers(t, length)
+    goals = episode["next_obs"]["achieved_goal"][future]
+    rewards = compute_reward(episode["next_obs"]["achieved_goal"][t], goals, [episode["infos"][i] for i in t])
+
+    relabelled = {}
+    for name in ("obs", "next_obs"):
+        relabelled[name] = {key: np.concatenate([value, value[t]]) for key, value in episode[name].items()}
+        relabelled[name]["desired_goal"][length:] = goals
+    relabelled["actions"] = np.concatenate([episode["actions"], episode["actions"][t]])
+    relabelled["rewards"] = np.concatenate([episode["rewards"], np.asarray(rewards, dtype=np.float32)])
+    for name in ("dones", "timeouts"):
+        relabelled[name] = np.concatenate([episode[name], episode[name][t]])
+    return relabelled
+
+
+def run_actor(
+    address: Tuple[str, int],
+    actor_id: int = 0,
+    n_envs: int = 1,
+    send_every: int = 256,
+    action_noise_sigma: float = 0.1,
+    random_action_eps: float = 0.0,
+    random_steps: int = 1000,
+    cores: Optional[List[int]] = None,
+    authkey: Optional[bytes] = None,
+    seed: Optional[int] = None,
+) -> None:
+    """
+    Connect to a learner and stream transitions until it closes the connection.
+
+    Args:
+        address: (host, port) of the learner
+        actor_id: Identifier used in the learner's per-actor metrics
+        n_envs: Envs stepped in this actor (one ``DummyVecEnv``)
+        send_every: Transitions (including HER relabellings) per batch message
+        action_noise_sigma: Gaussian exploration noise, in [-1, 1] action units
+        random_action_eps: Probability of a uniform random action
+        random_steps: Steps per env with uniform random actions before using the policy
+        cores: Cores to pin this actor to
+        authkey: Shared key (defaults to ``default_authkey()``)
+        seed: Seed of the envs and the exploration noise
+    """
+    if cores is not None:
+        configure_process(cores, num_threads=1)
+    from importlib import import_module
+
+    import torch as th
+    from gymnasium import spaces
+    from stable_baselines3.common.vec_env import DummyVecEnv
+
+    from src.exploration import BatchedActionNoise
+
+    conn = Client(tuple(address), authkey=authkey or default_authkey())
+    conn.send_bytes(pack_message(MSG_HELLO, {"actor_id": actor_id, "n_envs": n_envs}))
+    tag, spec, payload = unpack_message(conn.recv_bytes())
+    if tag == MSG_CLOSE:
+        raise RuntimeError(f"Learner refused actor {actor_id}: {spec.get('reason')}")
+    if tag != MSG_POLICY:
+        raise RuntimeError(f"Expected the policy from the learner, got message {tag!r}")
+    module_name, class_name = spec["policy_class"].rsplit(".", 1)
+    policy = getattr(import_module(module_name), class_name).load(io.BytesIO(bytes(payload)), device="cpu")
+    policy.set_training_mode(False)
+    weights_version = spec["version"]
+
+    env = DummyVecEnv([make_env_fn(spec["env_id"], spec["env_kwargs"], spec["flatten"])] * n_envs)
+    if seed is not None:
+        env.seed(seed)
+    her_k = spec["her_k"] if isinstance(env.observation_space, spaces.Dict) else 0
+    act_dim = env.action_space.shape[-1]
+    noise = BatchedActionNoise(n_envs, act_dim, sigma=action_noise_sigma, epsilon=random_action_eps, seed=seed)
+    rng = np.random.default_rng(seed)
+
+    episodes = [[] for _ in range(n_envs)]
+    returns = np.zeros(n_envs)
+    lengths = np.zeros(n_envs, dtype=np.int64)
+    outgoing: List[Dict[str, Any]] = []
+    outgoing_transitions = 0
+    finished_episodes: List[List[float]] = []
+    env_steps = total_steps = 0
+    last_send = time.time()
+
+    def send() -> None:
+        nonlocal outgoing, outgoing_transitions, finished_episodes, env_steps, last_send
+        if not outgoing:
+            return
+        arrays = {}
+        for name in ("obs", "next_obs"):
+            if isinstance(outgoing[0][name], dict):
+                for key in outgoing[0][name]:
+                    arrays[f"{name}.{key}"] = np.concatenate([episode[name][key] for episode in outgoing])
+            else:
+                arrays[name] = np.concatenate([episode[name] for episode in outgoing])
+        for name in ("actions", "rewards", "dones", "timeouts"):
+            arrays[name] = np.concatenate([episode[name] for episode in outgoing])
+        now = time.time()
+        meta = {
+            "actor_id": actor_id,
+            "env_steps": env_steps,
+            "seconds": now - last_send,
+            "episodes": finished_episodes,
+            "weights_version": weights_version,
+        }
+        conn.send_bytes(encode_batch(arrays, meta))
+        outgoing, outgoing_transitions, finished_episodes, env_steps, last_send = [], 0, [], 0, now
+
+    obs = env.reset()
+    try:
+        while True:
+            latest = None
+            while conn.poll():
+                message = conn.recv_bytes()
+                if message[:1] == MSG_CLOSE:
+                    return
+                latest = message
+            if latest is not None:
+                _, header, payload = unpack_message(latest)
+                policy.actor.load_state_dict(th.load(io.BytesIO(bytes(payload)), weights_only=True))
+                weights_version = header["version"]
+
+            if total_steps < random_steps:
+                scaled = rng.uniform(-1.0, 1.0, size=(n_envs, act_dim)).astype(np.float32)
+            else:
+                action, _ = policy.predict(obs, deterministic=False)
+                scaled = np.clip(policy.scale_action(action) + noise(), -1.0, 1.0)
+                scaled, _ = noise.apply(scaled)
+            next_obs, rewards, dones, infos = env.step(policy.unscale_action(scaled))
+            total_steps += 1
+            env_steps += n_envs
+
+            for i in range(n_envs):
+                real_next = infos[i]["terminal_observation"] if dones[i] else _index_obs(next_obs, i)
+                timeout = bool(infos[i].get("TimeLimit.truncated", False))
+                episodes[i].append((_index_obs(obs, i), real_next, scaled[i], rewards[i], dones[i], timeout, infos[i]))
+                returns[i] += rewards[i]
+                lengths[i] += 1
+                if not dones[i]:
+                    continue
+
+                steps = episodes[i]
+                episode = {
+                    "obs": _stack_obs([step[0] for step in steps]),
+                    "next_obs": _stack_obs([step[1] for step in steps]),
+                    "actions": np.stack([step[2] for step in steps]).astype(np.float32),
+                    "rewards": np.array([step[3] for step in steps], dtype=np.float32),
+                    "dones": np.array([step[4] for step in steps], dtype=np.float32),
+                    "timeouts": np.array([step[5] for step in steps], dtype=np.float32),
+                    "infos": [step[6] for step in steps],
+                }
+                if her_k > 0:
+                    compute_reward = lambda achieved, desired, step_infos, i=i: env.env_method(
+                        "compute_reward", achieved, desired, step_infos, indices=[i])[0]
+                    episode = her_relabel(episode, compute_reward, her_k, rng)
+                episode.pop("infos", None)
+                outgoing.append(episode)
+                outgoing_transitions += len(episode["actions"])
+                finished_episodes.append([float(returns[i]), int(lengths[i]), float(infos[i].get("is_success", np.nan))])
+                episodes[i], returns[i], lengths[i] = [], 0.0, 0
+                noise.reset([i])
+
+            if outgoing_transitions >= send_every:
+                send()
+            obs = next_obs
+    except (EOFError, ConnectionError, OSError):
+        # The learner went away
+        pass
+    finally:
+        env.close()
+        conn.close()
+
+
+# --- Learner ---
+
+class _ActorStats:
+    __slots__ = ("env_steps", "transitions", "seconds", "window_steps", "window_start", "weights_version")
+
+    def __init__(self):
+        self.env_steps = 0
+        self.transitions = 0
+        self.seconds = 0.0
+        self.window_steps = 0
+        self.window_start = time.time()
+        self.weights_version = 0
+
+
+class Learner:
+    """
+    Central replay buffer and trainer for remote actors.
+
+    Args:
+        model: Off-policy SB3 model (its env is only used for spaces); must not use HER
+        env_spec: ``env_id``, ``env_kwargs``, ``flatten`` and ``her_k`` sent to actors
+        address: (host, port) to listen on; a non-loopback host needs ``authkey`` or ``ACTOR_LEARNER_AUTHKEY``
+        authkey: Shared key (defaults to ``default_authkey()``)
+        updates_per_step: Gradient steps per env step received (SB3's gradient_steps / train_freq)
+        broadcast_every: Gradient steps between weight broadcasts
+        train_chunk: Gradient steps per ``model.train`` call
+        max_queued_batches: Batches buffered before actors are slowed down (TCP backpressure)
+        log_every_secs: Period of the throughput metrics
+    """
+    def __init__(
+        self,
+        model,
+        env_spec: Dict[str, Any],
+        address: Tuple[str, int] = ("127.0.0.1", DEFAULT_PORT),
+        authkey: Optional[bytes] = None,
+        updates_per_step: float = 1.0,
+        broadcast_every: int = 200,
+        train_chunk: int = 64,
+        max_queued_batches: int = 256,
+        log_every_secs: float = 10.0,
+    ):
+        from stable_baselines3.her import HerReplayBuffer
+
+        if isinstance(model.replay_buffer, HerReplayBuffer):
+            raise ValueError("Actors relabel episodes themselves; build the learner model without HerReplayBuffer")
+        if model.replay_buffer.optimize_memory_usage:
+            raise ValueError("optimize_memory_usage is not supported by the actor-learner buffer writes")
+        self.model = model
+        self.env_spec = dict(env_spec)
+        self.updates_per_step = updates_per_step
+        self.broadcast_every = broadcast_every
+        self.train_chunk = train_chunk
+        self.log_every_secs = log_every_secs
+        if authkey is None and AUTHKEY_ENV not in os.environ and not _is_loopback(address[0]):
+            raise ValueError(f"Listening on {address[0]} lets other hosts connect: set {AUTHKEY_ENV} "
+                             f"to a secret shared with the actors, or listen on 127.0.0.1")
+        self.authkey = authkey or default_authkey()
+        self._row_shapes = self._expected_row_shapes()
+        self.listener = Listener(tuple(address), authkey=self.authkey)
+        self.address = self.listener.address
+
+        self._batches: "queue.Queue[Tuple[int, Dict[str, Any], Dict[str, np.ndarray]]]" = queue.Queue(
+            maxsize=max_queued_batches)
+        self._connections: Dict[int, Connection] = {}
+        self._lock = threading.Lock()
+        self._closing = threading.Event()
+        self.actor_stats: Dict[int, _ActorStats] = {}
+        self.weights_version = 0
+        self.n_updates = 0
+        self.transitions = 0
+        self.episode_returns = deque(maxlen=100)
+        self.episode_successes = deque(maxlen=100)
+
+    # Networking
+
+    def _accept_loop(self) -> None:
+        while not self._closing.is_set():
+            try:
+                conn = self.listener.accept()
+            except (OSError, EOFError):
+                if self._closing.is_set():
+                    return
+                continue
+            except Exception as e:  # failed authentication, garbage on the port
+                print(f"Rejected connection: {e}")
+                continue
+            threading.Thread(target=self._receive_loop, args=(conn,), daemon=True).start()
+
+    def _policy_message(self) -> bytes:
+        buffer = io.BytesIO()
+        self.model.policy.save(buffer)
+        policy_class = type(self.model.policy)
+        header = dict(self.env_spec, policy_class=f"{policy_class.__module__}.{policy_class.__qualname__}",
+                      version=self.weights_version)
+        return pack_message(MSG_POLICY, header, buffer.getvalue())
+
+    def _receive_loop(self, conn: Connection) -> None:
+        actor_id = None
+        try:
+            tag, header, _ = unpack_message(conn.recv_bytes())
+            if tag != MSG_HELLO:
+                raise ValueError(f"expected a hello message, got {tag!r}")
+            actor_id = int(header["actor_id"])
+            with self._lock:
+                if actor_id in self._connections:
+                    reason = f"actor id {actor_id} is already connected"
+                    print(f"Refusing actor {actor_id}: {reason}")
+                    conn.send_bytes(pack_message(MSG_CLOSE, {"reason": reason}))
+                    return
+                conn.send_bytes(self._policy_message())
+                self._connections[actor_id] = conn
+                self.actor_stats.setdefault(actor_id, _ActorStats())
+            print(f"Actor {actor_id} connected ({header['n_envs']} envs)")
+            while not self._closing.is_set():
+                data = conn.recv_bytes()
+                if data[:1] == MSG_BATCH:
+                    # Decoded and checked here, so a bad batch never reaches the training loop
+                    self._batches.put((actor_id, *self._decode_batch(data)))
+        except (EOFError, OSError):
+            pass
+        except (ValueError, KeyError, TypeError, struct.error) as e:
+            print(f"Disconnecting actor {actor_id}: malformed message ({e})")
+        finally:
+            with self._lock:
+                for actor_id, known in list(self._connections.items()):
+                    if known is conn:
+                        del self._connections[actor_id]
+                        print(f"Actor {actor_id} disconnected")
+            conn.close()
+
+    def broadcast_weights(self) -> None:
+        """Send the current actor network to every connected actor."""
+        self.weights_version += 1
+        message = pack_message(MSG_WEIGHTS, {"version": self.weights_version},
+                               _state_dict_bytes(self.model.policy.actor))
+        with self._lock:
+            connections = list(self._connections.items())
+        for actor_id, conn in connections:
+            try:
+                conn.send_bytes(message)
+            except OSError:
+                pass
+
+    # Replay buffer
+
+    def _expected_row_shapes(self) -> Dict[str, Tuple[int, ...]]:
+        # Per-transition shape of every array a batch must contain
+        buffer = self.model.replay_buffer
+        shapes = {}
+        if isinstance(buffer.observations, dict):
+            for key, array in buffer.observations.items():
+                shapes[f"obs.{key}"] = shapes[f"next_obs.{key}"] = array.shape[2:]
+        else:
+            shapes["obs"] = shapes["next_obs"] = buffer.observations.shape[2:]
+        shapes["actions"] = buffer.actions.shape[2:]
+        for name in ("rewards", "dones", "timeouts"):
+            shapes[name] = ()
+        return shapes
+
+    def _decode_batch(self, data: bytes) -> Tuple[Dict[str, Any], Dict[str, np.ndarray]]:
+        """Decode a batch message and check it against the replay buffer, raising ValueError if it does not fit."""
+        _, header, payload = unpack_message(data)
+        arrays = decode_batch(header, payload)
+        if set(arrays) != set(self._row_shapes):
+            raise ValueError(f"batch arrays {sorted(arrays)} do not match the buffer's {sorted(self._row_shapes)}")
+        n = len(arrays["actions"])
+        if n == 0:
+            raise ValueError("empty batch")
+        for name, row_shape in self._row_shapes.items():
+            array = arrays[name]
+            if array.shape != (n, *row_shape):
+                raise ValueError(f"{name} has shape {array.shape}, expected {(n, *row_shape)}")
+            if array.dtype.kind not in "biuf" or not np.all(np.isfinite(array)):
+                raise ValueError(f"{name} is not finite numeric data")
+
+        meta = header["meta"]
+        for name in ("env_steps", "weights_version"):
+            if not isinstance(meta[name], int) or meta[name] < 0:
+                raise ValueError(f"meta {name} must be a non-negative integer")
+        if not isinstance(meta["seconds"], (int, float)):
+            raise ValueError("meta seconds must be a number")
+        episodes = meta["episodes"]
+        if not isinstance(episodes, list) or not all(
+                isinstance(episode, list) and len(episode) == 3
+                and all(isinstance(value, (int, float)) for value in episode) for episode in episodes):
+            raise ValueError("meta episodes must be [return, length, success] triples")
+        return meta, arrays
+
+    def _insert(self, arrays: Dict[str, np.ndarray]) -> int:
+        buffer = self.model.replay_buffer
+        n = len(arrays["actions"])
+        skip = max(n - buffer.buffer_size, 0)
+        rows = (buffer.pos + np.arange(n - skip)) % buffer.buffer_size
+        if isinstance(buffer.observations, dict):
+            for key in buffer.observations:
+                buffer.observations[key][rows, 0] = arrays[f"obs.{key}"][skip:]
+                buffer.next_observations[key][rows, 0] = arrays[f"next_obs.{key}"][skip:]
+        else:
+            buffer.observations[rows, 0] = arrays["obs"][skip:].reshape((len(rows), *buffer.obs_shape))
+            buffer.next_observations[rows, 0] = arrays["next_obs"][skip:].reshape((len(rows), *buffer.obs_shape))
+        buffer.actions[rows, 0] = arrays["actions"][skip:].reshape(len(rows), -1)
+        buffer.rewards[rows, 0] = arrays["rewards"][skip:]
+        buffer.dones[rows, 0] = arrays["dones"][skip:]
+        if buffer.handle_timeout_termination:
+            buffer.timeouts[rows, 0] = arrays["timeouts"][skip:]
+        end = buffer.pos + len(rows)
+        buffer.full = buffer.full or end >= buffer.buffer_size
+        buffer.pos = end % buffer.buffer_size
+        return n
+
+    def _consume(self, actor_id: int, meta: Dict[str, Any], arrays: Dict[str, np.ndarray]) -> None:
+        n = self._insert(arrays)
+        self.transitions += n
+        self.model.num_timesteps += meta["env_steps"]
+
+        stats = self.actor_stats.setdefault(actor_id, _ActorStats())
+        stats.env_steps += meta["env_steps"]
+        stats.transitions += n
+        stats.seconds += meta["seconds"]
+        stats.window_steps += meta["env_steps"]
+        stats.weights_version = meta["weights_version"]
+        for episode_return, _, success in meta["episodes"]:
+            self.episode_returns.append(episode_return)
+            if not np.isnan(success):
+                self.episode_successes.append(success)
+
+    # Metrics
+
+    def _log(self, elapsed: float, window_updates: int, window_transitions: int, window_env_steps: int) -> None:
+        logger = self.model.logger
+        logger.record("learner/updates_per_sec", window_updates / elapsed)
+        logger.record("learner/transitions_per_sec", window_transitions / elapsed)
+        logger.record("learner/env_steps_per_sec", window_env_steps / elapsed)
+        logger.record("learner/queued_batches", self._batches.qsize())
+        logger.record("learner/actors", len(self._connections))
+        logger.record("learner/n_updates", self.n_updates)
+        now = time.time()
+        with self._lock:
+            # Receive threads add actors as they connect
+            actor_stats = sorted(self.actor_stats.items())
+        for actor_id, stats in actor_stats:
+            logger.record(f"actors/{actor_id}/env_steps_per_sec", stats.window_steps / max(now - stats.window_start, 1e-9))
+            logger.record(f"actors/{actor_id}/weights_lag", self.weights_version - stats.weights_version)
+            stats.window_steps, stats.window_start = 0, now
+        if self.episode_returns:
+            logger.record("rollout/ep_rew_mean", float(np.mean(self.episode_returns)))
+        if self.episode_successes:
+            logger.record("rollout/success_rate", float(np.mean(self.episode_successes)))
+        logger.dump(step=self.model.num_timesteps)
+
+    # Main loop
+
+    def learn(self, total_timesteps: int, learning_starts: Optional[int] = None) -> None:
+        """
+        Serve actors and train until ``total_timesteps`` env steps were received.
+
+        Args:
+            total_timesteps: Env steps (summed over all actors) to train for
+            learning_starts: Env steps before the first update (defaults to the model's)
+        """
+        model = self.model
+        learning_starts = model.learning_starts if learning_starts is None else learning_starts
+        total_timesteps, _ = model._setup_learn(total_timesteps, callback=None, reset_num_timesteps=True)
+        threading.Thread(target=self._accept_loop, daemon=True).start()
+        print(f"Learner listening on {self.address[0]}:{self.address[1]}")
+
+        start = last_log = time.time()
+        log_updates, log_transitions, log_steps = self.n_updates, self.transitions, model.num_timesteps
+        try:
+            while model.num_timesteps < total_timesteps:
+                target_updates = int(max(model.num_timesteps - learning_starts, 0) * self.updates_per_step)
+                steps = min(target_updates - self.n_updates, self.train_chunk)
+                try:
+                    # Wait for data only when there is nothing to train on
+                    self._consume(*self._batches.get(block=steps <= 0, timeout=1.0))
+                    while True:
+                        self._consume(*self._batches.get_nowait())
+                except queue.Empty:
+                    pass
+
+                if steps > 0 and model.replay_buffer.size() > 0:
+                    model._update_current_progress_remaining(model.num_timesteps, total_timesteps)
+                    model.train(gradient_steps=steps, batch_size=model.batch_size)
+                    previous = self.n_updates
+                    self.n_updates += steps
+                    if self.n_updates // self.broadcast_every > previous // self.broadcast_every:
+                        self.broadcast_weights()
+
+                now = time.time()
+                if now - last_log >= self.log_every_secs:
+                    self._log(now - last_log, self.n_updates - log_updates, self.transitions - log_transitions,
+                              model.num_timesteps - log_steps)
+                    last_log = now
+                    log_updates, log_transitions, log_steps = self.n_updates, self.transitions, model.num_timesteps
+        finally:
+            elapsed = time.time() - start
+            print(f"Learner: {model.num_timesteps} env steps, {self.transitions} transitions, "
+                  f"{self.n_updates} updates in {elapsed:.1f}s "
+                  f"({model.num_timesteps / elapsed:.1f} env steps/sec, {self.n_updates / elapsed:.1f} updates/sec)")
+
+    def close(self) -> None:
+        """Tell every actor to stop and stop listening."""
+        self._closing.set()
+        with self._lock:
+            connections = list(self._connections.values())
+        for conn in connections:
+            try:
+                conn.send_bytes(pack_message(MSG_CLOSE, {}))
+            except OSError:
+                pass
+        self.listener.close()
+
+
+def build_learner_model(algo: str, env_fn: Callable, hyperparameters: Optional[Dict[str, Any]] = None,
+                        device: str = "auto"):
+    """
+    Create the learner's model on a single (never stepped) env used for its spaces.
+
+    Args:
+        algo: "SAC", "TD3" or "DDPG"
+        env_fn: Env factory
+        hyperparameters: Extra keyword arguments for the algorithm
+        device: Torch device
+
+    Returns:
+        The model
+    """
+    import stable_baselines3
+    from gymnasium import spaces
+    from stable_baselines3.common.vec_env import DummyVecEnv
+
+    env = DummyVecEnv([env_fn])
+    policy = "MultiInputPolicy" if isinstance(env.observation_space, spaces.Dict) else "MlpPolicy"
+    return getattr(stable_baselines3, algo)(policy, env, device=device, verbose=0, **(hyperparameters or {}))
+
+
+def _run_learner(args, cores: Optional[List[int]] = None) -> None:
+    configure_process(cores, num_threads=args.threads)
+    from src.metrics import make_sb3_logger
+
+    env_spec = {"env_id": args.env, "env_kwargs": json.loads(args.env_kwargs), "flatten": args.flatten,
+                "her_k": 0 if args.flatten else args.her_k}
+    env_fn = make_env_fn(args.env, env_spec["env_kwargs"], args.flatten)
+    model = build_learner_model(args.algo, env_fn, json.loads(args.hyperparameters), device=args.device)
+    model.set_logger(make_sb3_logger(os.path.join(args.log_dir, args.algo), window_steps=args.log_window_steps))
+    learner = Learner(model, env_spec, address=(args.host, args.port), broadcast_every=args.broadcast_every,
+                      log_every_secs=args.log_every_secs)
+    try:
+        learner.learn(args.steps)
+    finally:
+        learner.close()
+        model.logger.close()
+    model.save(args.model_path)
+    print(f"Model saved to {args.model_path}")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Distributed actor-learner training for Fetch/Kitchen")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    def add_learner_args(command_parser):
+        command_parser.add_argument("--env", required=True, help="Gymnasium env id, e.g. FetchSlide-v3")
+        command_parser.add_argument("--env-kwargs", default="{}", help="JSON keyword arguments for gym.make")
+        command_parser.add_argument("--flatten", action="store_true", help="Flatten observations (FrankaKitchen)")
+        command_parser.add_argument("--algo", default="SAC", choices=["SAC", "TD3", "DDPG"])
+        command_parser.add_argument("--hyperparameters", default="{}", help="JSON keyword arguments for the algorithm")
+        command_parser.add_argument("--her-k", type=int, default=4, help="HER goals per transition (0 to disable)")
+        command_parser.add_argument("--steps", type=int, default=1_000_000, help="Total env steps over all actors")
+        command_parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+        command_parser.add_argument("--broadcast-every", type=int, default=200, help="Gradient steps between weight broadcasts")
+        command_parser.add_argument("--threads", type=int, default=None, help="Learner torch threads")
+        command_parser.add_argument("--device", default="auto")
+        command_parser.add_argument("--log-dir", default="./logs/actor_learner/")
+        command_parser.add_argument("--log-window-steps", type=int, default=10_000)
+        command_parser.add_argument("--log-every-secs", type=float, default=10.0)
+        command_parser.add_argument("--model-path", default="actor_learner_model.zip")
+
+    learner_parser = commands.add_parser("learner", help="Run the learner and wait for actors")
+    add_learner_args(learner_parser)
+    learner_parser.add_argument("--host", default="127.0.0.1",
+                                help=f"Interface to listen on (other than loopback, {AUTHKEY_ENV} must be set)")
+
+    actor_parser = commands.add_parser("actor", help="Run one actor against a learner")
+    actor_parser.add_argument("--connect", required=True, help="Learner address, host:port")
+    actor_parser.add_argument("--actor-id", type=int, default=0)
+    actor_parser.add_argument("--n-envs", type=int, default=1)
+    actor_parser.add_argument("--noise", type=float, default=0.1, help="Gaussian action noise sigma")
+    actor_parser.add_argument("--epsilon", type=float, default=0.0, help="Random action probability")
+    actor_parser.add_argument("--seed", type=int, default=None)
+
+    local_parser = commands.add_parser("local", help="Run a learner and its actors on this node")
+    add_learner_args(local_parser)
+    local_parser.add_argument("--actors", type=int, default=2)
+    local_parser.add_argument("--n-envs", type=int, default=1, help="Envs per actor")
+
+    args = parser.parse_args(argv)
+    if args.command == "actor":
+        host, port = args.connect.rsplit(":", 1)
+        run_actor((host, int(port)), actor_id=args.actor_id, n_envs=args.n_envs, action_noise_sigma=args.noise,
+                  random_action_eps=args.epsilon, seed=args.seed)
+    elif args.command == "learner":
+        _run_learner(args)
+    else:
+        # One core per actor, the rest for the learner
+        allocation = plan_runs(1, env_workers=args.actors)[0]
+        args.host = "127.0.0.1"
+        ctx = mp.get_context("spawn")
+        actors = [
+            ctx.Process(target=run_actor, kwargs=dict(
+                address=(args.host, args.port), actor_id=i, n_envs=args.n_envs,
+                cores=allocation["env_workers"][i], seed=i), daemon=True)
+            for i in range(args.actors)
+        ]
+        # Actors retry until the learner listens
+        threading.Thread(target=_start_when_listening, args=(actors, args.host, args.port), daemon=True).start()
+        try:
+            _run_learner(args, cores=allocation["learner"])
+        finally:
+            for process in actors:
+                process.join(timeout=10)
+                if process.is_alive():
+                    process.terminate()
+
+
+def _start_when_listening(processes: List[mp.Process], host: str, port: int, timeout: float = 120.0) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            socket.create_connection((host, port), timeout=1.0).close()
+            break
+        except OSError:
+            time.sleep(0.2)
+    for process in processes:
+        process.start()
+
+
+if __name__ == "__main__":
+    main()
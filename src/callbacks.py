@@ -0,0 +1,121 @@
+"""
+Stable-Baselines3 callbacks shared by the Fetch and FrankaKitchen training scripts.
+"""
+
+import time
+
+import numpy as np
+from stable_baselines3.common.callbacks import BaseCallback
+
+from src.resource_manager import available_cores, format_core_list
+from src.reward_plots import BackgroundRenderer, StreamingRewardSeries
+
+
+class ThroughputCallback(BaseCallback):
+    """
+    Log environment steps per second during ``model.learn``.
+
+    Writes ``time/steps_per_sec`` (over the last ``log_freq`` calls) to the
+    SB3 logger and prints the run's overall throughput when training ends.
+    """
+    def __init__(self, log_freq: int = 1000, verbose: int = 0):
+        super().__init__(verbose)
+        self.log_freq = log_freq
+        self.steps_per_sec = 0.0
+        self._start_time = 0.0
+        self._start_steps = 0
+        self._window_time = 0.0
+        self._window_steps = 0
+
+    def _on_training_start(self) -> None:
+        self._start_time = self._window_time = time.perf_counter()
+        self._start_steps = self._window_steps = self.num_timesteps
+
+    def _on_step(self) -> bool:
+        if self.n_calls % self.log_freq == 0:
+            now = time.perf_counter()
+            rate = (self.num_timesteps - self._window_steps) / max(now - self._window_time, 1e-9)
+            self.logger.record("time/steps_per_sec", rate)
+            self._window_time, self._window_steps = now, self.num_timesteps
+        return True
+
+    def _on_training_end(self) -> None:
+        elapsed = max(time.perf_counter() - self._start_time, 1e-9)
+        self.steps_per_sec = (self.num_timesteps - self._start_steps) / elapsed
+        cores = format_core_list(available_cores())
+        print(f"Throughput: {self.steps_per_sec:.1f} steps/sec on cores {cores}")
+
+
+class LiveRewardPlotCallback(BaseCallback):
+    """
+    Keep an episode-reward plot up to date while ``model.learn`` runs.
+
+    Episode rewards come from the ``episode`` entry that ``Monitor`` adds to
+    ``info``. Every ``plot_freq`` calls the current summary is handed to a
+    background renderer, so training never waits on matplotlib.
+    """
+    def __init__(self, save_path: str, plot_freq: int = 10_000, rolling_window: int = 100, verbose: int = 0):
+        super().__init__(verbose)
+        self.save_path = save_path
+        self.plot_freq = plot_freq
+        self.series = StreamingRewardSeries(rolling_window=rolling_window)
+        self._renderer = None
+        self._new_rewards = []
+
+    def _on_training_start(self) -> None:
+        self._renderer = BackgroundRenderer()
+
+    def _on_step(self) -> bool:
+        for info in self.locals.get("infos", []):
+            episode = info.get("episode")
+            if episode is not None:
+                self._new_rewards.append(episode["r"])
+        if self.n_calls % self.plot_freq == 0:
+            self._submit()
+        return True
+
+    def _submit(self) -> None:
+        if self._new_rewards:
+            self.series.extend(np.asarray(self._new_rewards))
+            self._new_rewards = []
+        self._renderer.submit(self.series.snapshot(), self.save_path)
+
+    def _on_training_end(self) -> None:
+        self._submit()
+        self._renderer.close()
+
+
+class SuccessThresholdCallback(BaseCallback):
+    """
+    Record the rollout success rate and the timestep at which it first
+    reaches ``threshold``.
+
+    The success rate is the mean of the model's ``ep_success_buffer`` (the
+    last 100 episodes by default), sampled every ``check_freq`` calls once
+    ``min_episodes`` episodes have finished. Training stops at the threshold
+    when ``stop_on_threshold`` is set.
+    """
+    def __init__(self, threshold: float, check_freq: int = 1000, min_episodes: int = 20,
+                 stop_on_threshold: bool = False, verbose: int = 0):
+        super().__init__(verbose)
+        self.threshold = threshold
+        self.check_freq = check_freq
+        self.min_episodes = min_episodes
+        self.stop_on_threshold = stop_on_threshold
+        self.history = []
+        self.threshold_timestep = None
+
+    def _on_step(self) -> bool:
+        if self.n_calls % self.check_freq != 0:
+            return True
+        successes = self.model.ep_success_buffer
+        if len(successes) < self.min_episodes:
+            return True
+        success_rate = float(np.mean(successes))
+        self.history.append((self.num_timesteps, success_rate))
+        if self.threshold_timestep is None and success_rate >= self.threshold:
+            self.threshold_timestep = self.num_timesteps
+            if self.verbose > 0:
+                print(f"Success rate {success_rate:.2f} reached at {self.num_timesteps} steps")
+            return not self.stop_on_threshold
+        return True
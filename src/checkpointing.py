@@ -0,0 +1,467 @@
+"""
+Crash-safe, incremental checkpoints of an off-policy model and its replay buffer.
+
+A checkpoint directory holds:
+
+* ``model_<steps>.zip``: weights and optimizer state (``model.save``), written
+  to a temporary file, fsynced and renamed into place.
+* ``buffer/<array>.npy``: one preallocated ``.npy`` file per replay-buffer
+  array (observations, actions, rewards, ...). Each checkpoint only writes the
+  rows added since the previous one, handling ring-buffer wrap-around.
+* ``buffer/rows_<steps>.npz``: those new rows, written before the manifest is
+  committed and copied into the ``.npy`` files only afterwards, so the rows of
+  the last committed checkpoint are never modified in place. Resuming copies
+  the segment into the ``.npy`` files again before mapping them, which
+  completes an interrupted copy on disk.
+* ``buffer/episodes_<steps>.npz``: HER episode bookkeeping (``ep_start``,
+  ``ep_length``), written in full because finishing an episode updates rows
+  saved by earlier checkpoints.
+* ``buffer/infos_<n>.pkl``: pickled segments of the HER info dicts, only
+  when the buffer was created with ``copy_info_dict=True``.
+* ``manifest.json``: the commit point, replaced atomically.
+
+Resuming memory-maps the ``.npy`` files copy-on-write, so a 1M-transition
+buffer is back in place without reading it all from disk.
+"""
+
+import glob
+import json
+import os
+import pickle
+import time
+from typing import Any, Dict, List, Optional, Tuple, Type
+
+import numpy as np
+from stable_baselines3.common.base_class import BaseAlgorithm
+from stable_baselines3.common.callbacks import BaseCallback
+
+MANIFEST_FILENAME = "manifest.json"
+BUFFER_DIRNAME = "buffer"
+# Buffer arrays rewritten in full at every checkpoint (see module docstring)
+EPISODE_ARRAYS = ("ep_start", "ep_length")
+
+
+def _fsync_dir(path: str) -> None:
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _atomic_write(path: str, write_fn) -> None:
+    # write_fn(file) writes the content; the file is fsynced before the rename
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        write_fn(f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    _fsync_dir(os.path.dirname(os.path.abspath(path)))
+
+
+def _write_manifest(checkpoint_dir: str, manifest: Dict[str, Any]) -> None:
+    _atomic_write(
+        os.path.join(checkpoint_dir, MANIFEST_FILENAME),
+        lambda f: f.write(json.dumps(manifest, indent=2).encode("utf-8")),
+    )
+
+
+def read_manifest(checkpoint_dir: str) -> Optional[Dict[str, Any]]:
+    """Manifest of the last committed checkpoint in ``checkpoint_dir``, or None."""
+    path = os.path.join(checkpoint_dir, MANIFEST_FILENAME)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def _row_arrays(buffer) -> Dict[str, np.ndarray]:
+    """Buffer arrays indexed by buffer row, keyed by attribute name (``observations.<key>`` for dicts)."""
+    arrays = {}
+    for name, value in vars(buffer).items():
+        if isinstance(value, dict):
+            items = [(f"{name}.{key}", array) for key, array in value.items()]
+        else:
+            items = [(name, value)]
+        for key, array in items:
+            if (isinstance(array, np.ndarray) and array.dtype != object
+                    and array.ndim >= 1 and array.shape[0] == buffer.buffer_size):
+                arrays[key] = array
+    return arrays
+
+
+def _set_row_array(buffer, key: str, array: np.ndarray) -> None:
+    name, _, sub_key = key.partition(".")
+    if sub_key:
+        getattr(buffer, name)[sub_key] = array
+    else:
+        setattr(buffer, name, array)
+
+
+def _row_ranges(start: int, count: int, size: int) -> List[Tuple[int, int]]:
+    """Split ``count`` rows from ``start`` in a ring of ``size`` rows into contiguous ranges."""
+    if count >= size:
+        return [(0, size)]
+    end = start + count
+    if end <= size:
+        return [(start, end)] if count > 0 else []
+    return [(start, size), (0, end - size)]
+
+
+def _range_rows(ranges: List[Tuple[int, int]]) -> np.ndarray:
+    return np.concatenate([np.arange(a, b) for a, b in ranges]) if ranges else np.arange(0)
+
+
+class IncrementalCheckpointer:
+    """
+    Write checkpoints of one model into ``checkpoint_dir``.
+
+    Keep one instance per training run: it remembers what the previous
+    checkpoint wrote so the next one only adds the new buffer rows.
+
+    Args:
+        checkpoint_dir: Directory of the checkpoint (created if needed)
+        save_replay_buffer: Also checkpoint the replay buffer
+    """
+    def __init__(self, checkpoint_dir: str, save_replay_buffer: bool = True):
+        self.checkpoint_dir = checkpoint_dir
+        self.buffer_dir = os.path.join(checkpoint_dir, BUFFER_DIRNAME)
+        self.save_replay_buffer = save_replay_buffer
+        os.makedirs(self.buffer_dir, exist_ok=True)
+        self._memmaps: Dict[str, np.ndarray] = {}
+        self._manifest = read_manifest(checkpoint_dir)
+
+    def _open_memmap(self, key: str, array: np.ndarray) -> np.ndarray:
+        memmap = self._memmaps.get(key)
+        if memmap is not None and memmap.shape == array.shape and memmap.dtype == array.dtype:
+            return memmap
+        path = os.path.join(self.buffer_dir, f"{key}.npy")
+        if os.path.exists(path):
+            memmap = np.load(path, mmap_mode="r+")
+        if memmap is None or memmap.shape != array.shape or memmap.dtype != array.dtype:
+            memmap = np.lib.format.open_memmap(path, mode="w+", dtype=array.dtype, shape=array.shape)
+        self._memmaps[key] = memmap
+        return memmap
+
+    def _rows_to_write(self, buffer, num_timesteps: int) -> Tuple[int, int]:
+        """(first row, number of rows) changed since the previous checkpoint."""
+        size = buffer.buffer_size
+        previous = (self._manifest or {}).get("buffer")
+        if previous is not None and previous["buffer_size"] == size and previous["n_envs"] == buffer.n_envs:
+            # Checkpoints are taken once every step so far is stored (see
+            # IncrementalCheckpointCallback), so the step count matches the rows
+            # added; it only resolves wrap-around
+            added = (num_timesteps - self._manifest["num_timesteps"]) // buffer.n_envs
+            if 0 <= added < size - 1 and added == (buffer.pos - previous["pos"]) % size:
+                # One extra row: with optimize_memory_usage, add() also writes the row after pos
+                return previous["pos"], added + 1
+        return (0, size) if buffer.full else (0, buffer.pos + 1)
+
+    def _write_rows(self, arrays: Dict[str, np.ndarray], keys: List[str], ranges: List[Tuple[int, int]]) -> None:
+        for key in keys:
+            array = arrays[key]
+            memmap = self._open_memmap(key, array)
+            for a, b in ranges:
+                memmap[a:b] = array[a:b]
+            memmap.flush()
+
+    def _write_infos(self, buffer, ranges: List[Tuple[int, int]], segments: List[Dict[str, Any]],
+                     stamp: int) -> List[Dict[str, Any]]:
+        rows = _range_rows(ranges)
+        # Once the segments hold more rows than the buffer, replace them by one full snapshot
+        if sum(segment["rows"] for segment in segments) + len(rows) > 2 * buffer.buffer_size:
+            rows = np.arange(buffer.buffer_size)
+            segments = []
+        filename = f"infos_{stamp}.pkl"
+        _atomic_write(
+            os.path.join(self.buffer_dir, filename),
+            lambda f: pickle.dump({"rows": rows, "infos": buffer.infos[rows]}, f, protocol=pickle.HIGHEST_PROTOCOL),
+        )
+        return segments + [{"file": filename, "rows": int(len(rows))}]
+
+    def save(self, model: BaseAlgorithm) -> Dict[str, Any]:
+        """
+        Write a checkpoint of ``model`` (and its replay buffer).
+
+        Returns:
+            The committed manifest
+        """
+        start_time = time.time()
+        stamp = int(model.num_timesteps)
+        previous = self._manifest or {}
+        manifest: Dict[str, Any] = {"version": 1, "num_timesteps": stamp, "algo": type(model).__name__}
+
+        buffer = getattr(model, "replay_buffer", None) if self.save_replay_buffer else None
+        redo = None
+        if buffer is not None:
+            first_row, n_rows = self._rows_to_write(buffer, stamp)
+            ranges = _row_ranges(first_row, n_rows, buffer.buffer_size)
+            arrays = _row_arrays(buffer)
+            row_keys = sorted(key for key in arrays if key not in EPISODE_ARRAYS)
+
+            redo_file = None
+            if previous.get("buffer") is not None:
+                # The .npy files back the committed checkpoint: stage the new rows in a
+                # segment of their own and copy them in place only after the commit
+                redo_file = f"rows_{stamp}.npz"
+                rows = _range_rows(ranges)
+                _atomic_write(
+                    os.path.join(self.buffer_dir, redo_file),
+                    lambda f: np.savez(f, rows=rows, **{key: arrays[key][rows] for key in row_keys}),
+                )
+                redo = (arrays, row_keys, ranges)
+            else:
+                # Nothing committed to protect yet
+                self._write_rows(arrays, row_keys, ranges)
+
+            episodes_file = None
+            if all(name in arrays for name in EPISODE_ARRAYS):
+                episodes_file = f"episodes_{stamp}.npz"
+                _atomic_write(
+                    os.path.join(self.buffer_dir, episodes_file),
+                    lambda f: np.savez(f, _current_ep_start=buffer._current_ep_start,
+                                       **{name: arrays[name] for name in EPISODE_ARRAYS}),
+                )
+
+            segments = list(previous.get("buffer", {}).get("info_segments", []))
+            if getattr(buffer, "copy_info_dict", False):
+                segments = self._write_infos(buffer, ranges, segments, stamp)
+
+            manifest["buffer"] = {
+                "class": type(buffer).__name__,
+                "buffer_size": int(buffer.buffer_size),
+                "n_envs": int(buffer.n_envs),
+                "pos": int(buffer.pos),
+                "full": bool(buffer.full),
+                "arrays": row_keys,
+                "rows": redo_file,
+                "episodes": episodes_file,
+                "info_segments": segments,
+                "rows_written": int(min(n_rows, buffer.buffer_size)),
+            }
+
+        model_file = f"model_{stamp}.zip"
+        _atomic_write(os.path.join(self.checkpoint_dir, model_file), model.save)
+        manifest["model"] = model_file
+
+        _write_manifest(self.checkpoint_dir, manifest)
+        self._manifest = manifest
+        if redo is not None:
+            self._write_rows(*redo)
+        self._remove_stale_files(manifest)
+        manifest["save_seconds"] = time.time() - start_time
+        return manifest
+
+    def _remove_stale_files(self, manifest: Dict[str, Any]) -> None:
+        keep = {manifest["model"]}
+        buffer_manifest = manifest.get("buffer", {})
+        for name in ("episodes", "rows"):
+            if buffer_manifest.get(name):
+                keep.add(buffer_manifest[name])
+        keep.update(segment["file"] for segment in buffer_manifest.get("info_segments", []))
+        patterns = [os.path.join(self.checkpoint_dir, "model_*.zip")] + [
+            os.path.join(self.buffer_dir, pattern) for pattern in ("episodes_*.npz", "infos_*.pkl", "rows_*.npz")
+        ]
+        for pattern in patterns:
+            for path in glob.glob(pattern):
+                if os.path.basename(path) not in keep:
+                    os.remove(path)
+
+
+def load_checkpoint(
+    algo_class: Type[BaseAlgorithm],
+    checkpoint_dir: str,
+    env=None,
+    **load_kwargs,
+) -> Optional[BaseAlgorithm]:
+    """
+    Restore a model and its replay buffer from ``checkpoint_dir``.
+
+    Buffer arrays are memory-mapped copy-on-write: pages are read on first
+    access and changes stay in memory until the next checkpoint writes them.
+
+    Args:
+        algo_class: Algorithm class, e.g. ``DDPG``
+        checkpoint_dir: Directory written by ``IncrementalCheckpointer``
+        env: Environment to attach (required to keep training, and for HER)
+        load_kwargs: Passed on to ``algo_class.load``
+
+    Returns:
+        The restored model, or None if the directory holds no checkpoint
+    """
+    manifest = read_manifest(checkpoint_dir)
+    if manifest is None:
+        return None
+    model = algo_class.load(os.path.join(checkpoint_dir, manifest["model"]), env=env, **load_kwargs)
+
+    buffer_manifest = manifest.get("buffer")
+    buffer = getattr(model, "replay_buffer", None)
+    if buffer_manifest is None or buffer is None:
+        return model
+    if buffer.buffer_size != buffer_manifest["buffer_size"] or buffer.n_envs != buffer_manifest["n_envs"]:
+        raise ValueError(
+            f"Checkpointed buffer is {buffer_manifest['buffer_size']} x {buffer_manifest['n_envs']} envs, "
+            f"the model's is {buffer.buffer_size} x {buffer.n_envs}"
+        )
+
+    buffer_dir = os.path.join(checkpoint_dir, BUFFER_DIRNAME)
+    if buffer_manifest.get("rows"):
+        # Rows committed with this checkpoint; their in-place copy may not have
+        # finished, and later checkpoints only write rows added after them
+        with np.load(os.path.join(buffer_dir, buffer_manifest["rows"])) as redo:
+            rows = redo["rows"]
+            for key in buffer_manifest["arrays"]:
+                memmap = np.load(os.path.join(buffer_dir, f"{key}.npy"), mmap_mode="r+")
+                memmap[rows] = redo[key]
+                memmap.flush()
+                del memmap
+    for key in buffer_manifest["arrays"]:
+        memmap = np.load(os.path.join(buffer_dir, f"{key}.npy"), mmap_mode="c")
+        # Plain ndarray view of the mapping, so the buffer still pickles normally
+        _set_row_array(buffer, key, np.asarray(memmap))
+    buffer.pos = buffer_manifest["pos"]
+    buffer.full = buffer_manifest["full"]
+
+    if buffer_manifest.get("episodes"):
+        with np.load(os.path.join(buffer_dir, buffer_manifest["episodes"])) as episodes:
+            for name in EPISODE_ARRAYS:
+                setattr(buffer, name, episodes[name].copy())
+            buffer._current_ep_start = episodes["_current_ep_start"].copy()
+        # Transitions of an unfinished episode cannot be continued by the new env episodes
+        buffer._current_ep_start[:] = buffer.pos
+
+    for segment in buffer_manifest.get("info_segments", []):
+        with open(os.path.join(buffer_dir, segment["file"]), "rb") as f:
+            data = pickle.load(f)
+        buffer.infos[data["rows"]] = data["infos"]
+    return model
+
+
+class IncrementalCheckpointCallback(BaseCallback):
+    """
+    Checkpoint the model and replay buffer every ``save_freq`` calls, and at the end of training.
+
+    Drop-in replacement for SB3's ``CheckpointCallback``; resume with
+    ``load_checkpoint``. ``_on_step`` runs before SB3 stores the current
+    transition, so the checkpoint is taken at the end of that rollout, when
+    ``num_timesteps`` and the buffer agree.
+
+    Args:
+        save_freq: Calls (vector steps) between checkpoints
+        checkpoint_dir: Directory of the checkpoint
+        save_replay_buffer: Also checkpoint the replay buffer
+        verbose: Verbosity level
+    """
+    def __init__(self, save_freq: int, checkpoint_dir: str, save_replay_buffer: bool = True, verbose: int = 0):
+        super().__init__(verbose)
+        self.save_freq = save_freq
+        self.checkpoint_dir = checkpoint_dir
+        self.save_replay_buffer = save_replay_buffer
+        self.checkpointer: Optional[IncrementalCheckpointer] = None
+        self._save_pending = False
+
+    def _init_callback(self) -> None:
+        self.checkpointer = IncrementalCheckpointer(self.checkpoint_dir, save_replay_buffer=self.save_replay_buffer)
+
+    def _save(self) -> None:
+        manifest = self.checkpointer.save(self.model)
+        self.logger.record("time/checkpoint_secs", manifest["save_seconds"])
+        if self.verbose > 0:
+            rows = manifest.get("buffer", {}).get("rows_written", 0)
+            print(f"Checkpoint at step {self.num_timesteps}: {rows} buffer rows written "
+                  f"in {manifest['save_seconds']:.2f}s")
+
+    def _on_step(self) -> bool:
+        if self.n_calls % self.save_freq == 0:
+            self._save_pending = True
+        return True
+
+    def _on_rollout_end(self) -> None:
+        if self._save_pending:
+            self._save_pending = False
+            self._save()
+
+    def _on_training_end(self) -> None:
+        self._save()
+
+
+def benchmark(
+    env_id: str = "FetchSlide-v3",
+    buffer_size: int = 1_000_000,
+    new_rows: int = 10_000,
+    checkpoint_dir: str = "./checkpoints/benchmark/",
+    seed: int = 0,
+) -> Dict[str, float]:
+    """
+    Time a full checkpoint, an incremental one and a resume for a full SAC replay buffer.
+
+    The buffer is filled with random transitions instead of being collected,
+    and ``new_rows`` more rows (wrapping around) are added before the
+    incremental checkpoint.
+
+    Args:
+        env_id: Env that defines the observation and action spaces
+        buffer_size: Replay buffer rows
+        new_rows: Rows added between the two checkpoints
+        checkpoint_dir: Scratch directory (its previous contents are removed)
+        seed: Seed of the random transitions
+
+    Returns:
+        Seconds taken by ``full_save``, ``incremental_save`` and ``resume``
+    """
+    import shutil
+
+    import gymnasium as gym
+    import gymnasium_robotics
+    from gymnasium import spaces
+    from stable_baselines3 import SAC
+
+    gym.register_envs(gymnasium_robotics)
+    shutil.rmtree(checkpoint_dir, ignore_errors=True)
+    env = gym.make(env_id)
+    policy = "MultiInputPolicy" if isinstance(env.observation_space, spaces.Dict) else "MlpPolicy"
+    model = SAC(policy, env, buffer_size=buffer_size, device="cpu", verbose=0)
+    buffer = model.replay_buffer
+    rng = np.random.default_rng(seed)
+
+    def fill(rows: np.ndarray) -> None:
+        for array in _row_arrays(buffer).values():
+            array[rows] = rng.standard_normal((len(rows), *array.shape[1:])).astype(array.dtype)
+
+    fill(np.arange(buffer_size))
+    buffer.pos, buffer.full = 0, True
+    model.num_timesteps = buffer_size
+    checkpointer = IncrementalCheckpointer(checkpoint_dir)
+    results = {"full_save": checkpointer.save(model)["save_seconds"]}
+
+    fill(np.arange(new_rows) % buffer_size)
+    buffer.pos = new_rows % buffer_size
+    model.num_timesteps += new_rows
+    results["incremental_save"] = checkpointer.save(model)["save_seconds"]
+
+    start = time.time()
+    load_checkpoint(SAC, checkpoint_dir, env=env, device="cpu")
+    results["resume"] = time.time() - start
+    env.close()
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark incremental replay buffer checkpoints")
+    parser.add_argument("--env", default="FetchSlide-v3", help="Env that defines the buffer's spaces")
+    parser.add_argument("--buffer-size", type=int, default=1_000_000)
+    parser.add_argument("--new-rows", type=int, default=10_000, help="Rows added before the incremental save")
+    parser.add_argument("--dir", default="./checkpoints/benchmark/", help="Scratch checkpoint directory")
+    args = parser.parse_args(argv)
+
+    results = benchmark(args.env, args.buffer_size, args.new_rows, args.dir)
+    print(f"Full checkpoint of {args.buffer_size:,} rows: {results['full_save']:.2f}s")
+    print(f"Incremental checkpoint of {args.new_rows:,} rows: {results['incremental_save']:.3f}s")
+    print(f"Resume: {results['resume']:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+"""
+Curriculum training for FrankaKitchen task sequences.
+
+Instead of training the full kitchen sequence from scratch, the set of active
+tasks grows one task at a time: stage 0 trains the first task of the
+sequence, stage 1 the first two, and so on. A stage ends once the rolling
+success rate on its tasks crosses a threshold.
+
+Every env is built once with the whole sequence as ``tasks_to_complete``, so
+observation and goal shapes never change, and ``KitchenCurriculumWrapper``
+restricts rewards, termination and ``is_success`` to the active subset. The
+subset is switched in place inside the running (subprocess) envs through
+``env_method``, so workers are never re-spawned, and the same model and replay
+buffer carry over from one stage to the next. The observation includes a
+multi-hot ``active_tasks`` entry so transitions collected under earlier
+stages stay distinguishable in the shared buffer.
+"""
+
+import glob
+import os
+import re
+from collections import deque
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import gymnasium as gym
+import numpy as np
+from gymnasium import spaces
+from stable_baselines3.common.callbacks import BaseCallback
+
+ACTIVE_TASKS_KEY = "active_tasks"
+
+
+class KitchenCurriculumWrapper(gym.Wrapper):
+    """
+    Restrict a FrankaKitchen env built with the full task sequence to its active tasks.
+
+    Only active tasks are rewarded, the episode terminates once all active
+    tasks are completed, and ``info["is_success"]`` reports exactly that.
+    Changes made with ``set_active_tasks`` apply from the next reset.
+
+    Args:
+        env: ``FrankaKitchen-v1`` env created with ``tasks_to_complete=all_tasks``
+        all_tasks: Every task the curriculum can activate
+        active_tasks: Tasks active in the first episode (defaults to the first task)
+    """
+    def __init__(self, env: gym.Env, all_tasks: Sequence[str], active_tasks: Optional[Sequence[str]] = None):
+        super().__init__(env)
+        self.all_tasks = list(all_tasks)
+        missing = set(self.all_tasks) - set(env.unwrapped.goal)
+        if missing:
+            raise ValueError(f"The env was not created with tasks {sorted(missing)}")
+        self.active_tasks: List[str] = []
+        self._episode_tasks: List[str] = []
+        self._mask = np.zeros(len(self.all_tasks), dtype=np.float64)
+        self.set_active_tasks(active_tasks or self.all_tasks[:1])
+
+        observation_spaces = dict(env.observation_space.spaces)
+        observation_spaces[ACTIVE_TASKS_KEY] = spaces.Box(0.0, 1.0, shape=(len(self.all_tasks),), dtype=np.float64)
+        self.observation_space = spaces.Dict(observation_spaces)
+
+    def set_active_tasks(self, tasks: Sequence[str]) -> None:
+        """Activate ``tasks`` from the next episode on."""
+        unknown = set(tasks) - set(self.all_tasks)
+        if unknown:
+            raise ValueError(f"Unknown curriculum tasks {sorted(unknown)}")
+        self.active_tasks = list(tasks)
+
+    def _observation(self, obs: Dict[str, Any]) -> Dict[str, Any]:
+        obs = dict(obs)
+        obs[ACTIVE_TASKS_KEY] = self._mask.copy()
+        return obs
+
+    def reset(self, **kwargs):
+        obs, info = self.env.reset(**kwargs)
+        self._episode_tasks = list(self.active_tasks)
+        self._mask = np.array([task in self._episode_tasks for task in self.all_tasks], dtype=np.float64)
+        # The kitchen env only rewards (and tracks completions of) tasks in this set
+        self.env.unwrapped.tasks_to_complete = set(self._episode_tasks)
+        info["tasks_to_complete"] = list(self._episode_tasks)
+        return self._observation(obs), info
+
+    def step(self, action):
+        obs, reward, terminated, truncated, info = self.env.step(action)
+        success = set(self._episode_tasks).issubset(info["episode_task_completions"])
+        info["is_success"] = float(success)
+        info["n_active_tasks"] = len(self._episode_tasks)
+        return self._observation(obs), reward, terminated or success, truncated, info
+
+
+def stage_tasks(task_sequence: Sequence[str], stage: int) -> List[str]:
+    """Active tasks at ``stage``: the first ``stage + 1`` tasks of the sequence."""
+    return list(task_sequence[:stage + 1])
+
+
+def latest_stage_checkpoint(checkpoint_dir: str) -> Optional[Tuple[int, str, Optional[str]]]:
+    """
+    Latest checkpoint written by ``CurriculumCallback``.
+
+    Args:
+        checkpoint_dir: Directory given to the callback
+
+    Returns:
+        Tuple of (completed stage, model path, replay buffer path or None), or None
+    """
+    checkpoints = []
+    for path in glob.glob(os.path.join(checkpoint_dir, "stage_*_model.zip")):
+        match = re.search(r"stage_(\d+)_model\.zip$", path)
+        if match:
+            checkpoints.append((int(match.group(1)), path))
+    if not checkpoints:
+        return None
+    stage, model_path = max(checkpoints)
+    buffer_path = model_path.replace("_model.zip", "_replay_buffer.pkl")
+    return stage, model_path, buffer_path if os.path.exists(buffer_path) else None
+
+
+class CurriculumCallback(BaseCallback):
+    """
+    Advance the kitchen curriculum when the current stage's success rate crosses its threshold.
+
+    Only episodes played entirely under the current stage count towards its
+    success rate. At every stage boundary the model (and optionally the replay
+    buffer) is saved to ``checkpoint_dir`` as ``stage_<k>_model.zip``, so a run
+    can later restart from any completed stage.
+
+    Args:
+        task_sequence: Tasks in the order they are added
+        success_threshold: Success rate that completes a stage (one value, or one per stage)
+        window: Episodes in the rolling success rate
+        min_episodes: Episodes a stage needs before it can complete
+        checkpoint_dir: Directory for stage checkpoints (None to skip them)
+        save_replay_buffer: Save the replay buffer along with stage checkpoints
+        start_stage: Stage to start from (e.g. after loading a stage checkpoint)
+        stop_at_end: Stop training once the last stage is completed
+        verbose: Verbosity level
+    """
+    def __init__(
+        self,
+        task_sequence: Sequence[str],
+        success_threshold: Any = 0.8,
+        window: int = 100,
+        min_episodes: int = 50,
+        checkpoint_dir: Optional[str] = None,
+        save_replay_buffer: bool = True,
+        start_stage: int = 0,
+        stop_at_end: bool = True,
+        verbose: int = 1,
+    ):
+        super().__init__(verbose)
+        self.task_sequence = list(task_sequence)
+        n_stages = len(self.task_sequence)
+        if np.isscalar(success_threshold):
+            success_threshold = [success_threshold] * n_stages
+        if len(success_threshold) != n_stages:
+            raise ValueError(f"Expected {n_stages} success thresholds, got {len(success_threshold)}")
+        if not 0 <= start_stage < n_stages:
+            raise ValueError(f"start_stage must be in [0, {n_stages - 1}]")
+        self.thresholds = [float(threshold) for threshold in success_threshold]
+        self.window = window
+        self.min_episodes = min_episodes
+        self.checkpoint_dir = checkpoint_dir
+        self.save_replay_buffer = save_replay_buffer
+        self.stage = start_stage
+        self.stop_at_end = stop_at_end
+        self.successes = deque(maxlen=window)
+        self.finished = False
+        # (stage, timestep at which it was completed)
+        self.stage_timesteps: List[Tuple[int, int]] = []
+
+    @property
+    def active_tasks(self) -> List[str]:
+        return stage_tasks(self.task_sequence, self.stage)
+
+    def _apply_stage(self) -> None:
+        self.training_env.env_method("set_active_tasks", self.active_tasks)
+        self.successes.clear()
+        self.logger.record("curriculum/stage", self.stage)
+        if self.verbose > 0:
+            print(f"Curriculum stage {self.stage}: {self.active_tasks} (from step {self.num_timesteps})")
+
+    def _on_training_start(self) -> None:
+        self._apply_stage()
+
+    def _save_stage_checkpoint(self) -> None:
+        if self.checkpoint_dir is None:
+            return
+        os.makedirs(self.checkpoint_dir, exist_ok=True)
+        prefix = os.path.join(self.checkpoint_dir, f"stage_{self.stage}")
+        self.model.save(f"{prefix}_model.zip")
+        if self.save_replay_buffer and hasattr(self.model, "save_replay_buffer"):
+            self.model.save_replay_buffer(f"{prefix}_replay_buffer.pkl")
+
+    def _on_step(self) -> bool:
+        if self.finished:
+            return True
+        n_active = len(self.active_tasks)
+        for idx, done in enumerate(self.locals["dones"]):
+            info = self.locals["infos"][idx]
+            # Episodes started before the last stage change still run the old task set
+            if done and info.get("n_active_tasks") == n_active:
+                self.successes.append(info["is_success"])
+        if len(self.successes) < max(self.min_episodes, 1):
+            return True
+
+        success_rate = float(np.mean(self.successes))
+        self.logger.record("curriculum/success_rate", success_rate)
+        if success_rate < self.thresholds[self.stage]:
+            return True
+
+        if self.verbose > 0:
+            print(f"Curriculum stage {self.stage} completed at step {self.num_timesteps} "
+                  f"(success rate {success_rate:.2f})")
+        self.stage_timesteps.append((self.stage, self.num_timesteps))
+        self._save_stage_checkpoint()
+        if self.stage == len(self.task_sequence) - 1:
+            self.finished = True
+            self.successes.clear()
+            return not self.stop_at_end
+        self.stage += 1
+        self._apply_stage()
+        return True
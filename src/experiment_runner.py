@@ -0,0 +1,387 @@
+"""
+Config-driven experiment runner for the Fetch and FrankaKitchen training scripts.
+
+A grid file (YAML or TOML) lists environments, algorithms, hyperparameters and
+seeds. Every combination becomes one run that is scheduled on a local process
+pool, checkpointed while it trains, and recorded in a results index.
+
+Usage:
+    python -m src.experiment_runner configs/fetch_grid.yaml --workers 4
+"""
+
+import argparse
+import glob
+import hashlib
+import itertools
+import json
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import asdict, dataclass, field
+from multiprocessing import get_context
+from typing import Any, Dict, List, Optional
+
+from src.resource_manager import available_cores, configure_process, format_core_list, plan_runs
+
+ALGORITHMS = ("DDPG", "TD3", "SAC")
+INDEX_FILENAME = "results_index.json"
+FINAL_MODEL_FILENAME = "final_model.zip"
+
+DEFAULTS: Dict[str, Any] = {
+    "total_timesteps": 1_000_000,
+    "log_dir": "./runs/",
+    "threads_per_run": 1,
+    "device": "cpu",
+    "checkpoint_freq": 50_000,
+    "log_window_steps": 10_000,
+    "her": False,
+    "flatten_obs": False,
+    "action_noise_sigma": None,
+    "policy": "MultiInputPolicy",
+    "env_kwargs": {},
+}
+
+
+@dataclass
+class RunSpec:
+    """A single (env, algo, hyperparameters, seed) combination from the grid."""
+    env_id: str
+    algo: str
+    seed: int
+    hyperparameters: Dict[str, Any] = field(default_factory=dict)
+    env_kwargs: Dict[str, Any] = field(default_factory=dict)
+    policy: str = "MultiInputPolicy"
+    her: bool = False
+    flatten_obs: bool = False
+    action_noise_sigma: Optional[float] = None
+    total_timesteps: int = 1_000_000
+    threads_per_run: int = 1
+    device: str = "cpu"
+    checkpoint_freq: int = 50_000
+    log_window_steps: int = 10_000
+    log_dir: str = "./runs/"
+
+    @property
+    def run_id(self) -> str:
+        """Stable identifier derived from the run's configuration."""
+        payload = json.dumps(
+            [self.hyperparameters, self.env_kwargs, self.policy, self.her,
+             self.flatten_obs, self.action_noise_sigma, self.total_timesteps],
+            sort_keys=True,
+        )
+        digest = hashlib.sha1(payload.encode("utf-8")).hexdigest()[:8]
+        env_slug = re.sub(r"[^A-Za-z0-9]+", "_", self.env_id).strip("_")
+        return f"{env_slug}-{self.algo}-{digest}-s{self.seed}"
+
+    @property
+    def run_dir(self) -> str:
+        return os.path.join(self.log_dir, self.run_id)
+
+
+def load_grid(path: str) -> Dict[str, Any]:
+    """
+    Load a grid file. The format is chosen from the file extension.
+
+    Args:
+        path: Path to a .yaml/.yml or .toml grid file
+
+    Returns:
+        The parsed grid as a dictionary
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension in (".yaml", ".yml"):
+        try:
+            import yaml
+        except ImportError as e:
+            raise ImportError("YAML grids require PyYAML: pip install pyyaml") from e
+        with open(path, "r") as f:
+            return yaml.safe_load(f) or {}
+    if extension == ".toml":
+        try:
+            import tomllib
+        except ImportError:
+            try:
+                import tomli as tomllib
+            except ImportError as e:
+                raise ImportError("TOML grids require Python 3.11+ or tomli: pip install tomli") from e
+        with open(path, "rb") as f:
+            return tomllib.load(f)
+    raise ValueError(f"Unsupported grid format '{extension}', expected .yaml, .yml or .toml")
+
+
+def expand_grid(grid: Dict[str, Any]) -> List[RunSpec]:
+    """
+    Expand a grid into individual runs.
+
+    Each entry under ``runs`` is merged over ``defaults`` and multiplied out
+    over the cartesian product of its ``grid`` section and its ``seeds``.
+
+    Args:
+        grid: Parsed grid dictionary (see ``load_grid``)
+
+    Returns:
+        List of run specifications, in grid order
+    """
+    defaults = dict(DEFAULTS)
+    defaults.update(grid.get("defaults", {}))
+
+    specs = []
+    for entry in grid.get("runs", []):
+        merged = dict(defaults)
+        merged.update(entry)
+        if "env_id" not in merged or "algo" not in merged:
+            raise ValueError(f"Every run needs 'env_id' and 'algo': {entry}")
+        algo = merged["algo"].upper()
+        if algo not in ALGORITHMS:
+            raise ValueError(f"Algorithm must be one of {ALGORITHMS}, got {merged['algo']}")
+
+        seeds = merged.pop("seeds", [merged.pop("seed", 0)])
+        sweep = merged.pop("grid", {}) or {}
+        fixed = merged.pop("hyperparameters", {}) or {}
+        keys = sorted(sweep)
+        for values in itertools.product(*(sweep[key] for key in keys)):
+            hyperparameters = dict(fixed)
+            hyperparameters.update(zip(keys, values))
+            for seed in seeds:
+                specs.append(RunSpec(
+                    env_id=merged["env_id"],
+                    algo=algo,
+                    seed=int(seed),
+                    hyperparameters=hyperparameters,
+                    env_kwargs=dict(merged["env_kwargs"]),
+                    policy=merged["policy"],
+                    her=bool(merged["her"]),
+                    flatten_obs=bool(merged["flatten_obs"]),
+                    action_noise_sigma=merged["action_noise_sigma"],
+                    total_timesteps=int(merged["total_timesteps"]),
+                    threads_per_run=int(merged["threads_per_run"]),
+                    device=merged["device"],
+                    checkpoint_freq=int(merged["checkpoint_freq"]),
+                    log_window_steps=int(merged["log_window_steps"]),
+                    log_dir=merged["log_dir"],
+                ))
+    return specs
+
+
+def latest_checkpoint(run_dir: str) -> Optional[str]:
+    """
+    Find the most recent CheckpointCallback file in a run directory.
+
+    Args:
+        run_dir: Directory of a single run
+
+    Returns:
+        Path to the checkpoint with the most timesteps, or None
+    """
+    pattern = os.path.join(run_dir, "checkpoints", "model_*_steps.zip")
+    checkpoints = glob.glob(pattern)
+    if not checkpoints:
+        return None
+    return max(checkpoints, key=lambda p: int(re.search(r"_(\d+)_steps\.zip$", p).group(1)))
+
+
+# Core allocation claimed by a pool worker process when it starts
+_worker_allocation: Optional[Dict[str, List]] = None
+
+
+def _claim_allocation(allocations) -> None:
+    global _worker_allocation
+    _worker_allocation = allocations.get()
+
+
+def _make_env(spec: RunSpec, resume: bool = False):
+    import gymnasium as gym
+    import gymnasium_robotics
+    from gymnasium.wrappers import FlattenObservation
+    from stable_baselines3.common.monitor import Monitor
+
+    gym.register_envs(gymnasium_robotics)
+    env = gym.make(spec.env_id, **spec.env_kwargs)
+    if spec.flatten_obs:
+        env = FlattenObservation(env)
+    # A resumed run keeps its episode history and appends to it
+    monitor_path = os.path.join(spec.run_dir, "monitor.csv")
+    return Monitor(env, monitor_path, override_existing=not (resume and os.path.exists(monitor_path)))
+
+
+def train_run(spec: RunSpec) -> Dict[str, Any]:
+    """
+    Train a single run, resuming from its latest checkpoint when present.
+
+    Runs in a pool worker process. A run whose final model already exists is
+    reported as finished without training again.
+
+    Args:
+        spec: The run to train
+
+    Returns:
+        Results index entry for the run
+    """
+    final_path = os.path.join(spec.run_dir, FINAL_MODEL_FILENAME)
+    entry = {"run_id": spec.run_id, "spec": asdict(spec), "model_path": final_path}
+    if os.path.exists(final_path):
+        entry.update(status="finished", resumed=False)
+        return entry
+
+    cores = _worker_allocation["learner"] if _worker_allocation is not None else None
+    cores = list(cores) if cores is not None else available_cores()
+    # More threads than cores would oversubscribe the run's slot again
+    cores = configure_process(cores, num_threads=min(spec.threads_per_run, len(cores)))
+    print(f"[{spec.run_id}] Running on cores {format_core_list(cores)}")
+    import numpy as np
+    import stable_baselines3
+    from stable_baselines3 import HerReplayBuffer
+    from stable_baselines3.common.callbacks import CheckpointCallback
+    from stable_baselines3.common.noise import NormalActionNoise
+
+    from src.metrics import make_sb3_logger
+
+    os.makedirs(spec.run_dir, exist_ok=True)
+    with open(os.path.join(spec.run_dir, "spec.json"), "w") as f:
+        json.dump(asdict(spec), f, indent=2)
+
+    algo_class = getattr(stable_baselines3, spec.algo)
+    checkpoint = latest_checkpoint(spec.run_dir)
+    env = _make_env(spec, resume=checkpoint is not None)
+    start = time.time()
+
+    if checkpoint is not None:
+        print(f"[{spec.run_id}] Resuming from {checkpoint}")
+        model = algo_class.load(checkpoint, env=env, device=spec.device)
+        checkpoint_dir, checkpoint_name = os.path.split(checkpoint)
+        buffer_name = checkpoint_name.replace("model_", "model_replay_buffer_", 1).replace(".zip", ".pkl")
+        buffer_path = os.path.join(checkpoint_dir, buffer_name)
+        if os.path.exists(buffer_path):
+            model.load_replay_buffer(buffer_path)
+    else:
+        kwargs = dict(spec.hyperparameters)
+        if spec.her:
+            kwargs.setdefault("replay_buffer_class", HerReplayBuffer)
+            kwargs.setdefault("replay_buffer_kwargs", dict(n_sampled_goal=4, goal_selection_strategy="future"))
+        if spec.action_noise_sigma is not None:
+            n_actions = env.action_space.shape[-1]
+            kwargs["action_noise"] = NormalActionNoise(
+                mean=np.zeros(n_actions), sigma=spec.action_noise_sigma * np.ones(n_actions)
+            )
+        model = algo_class(
+            spec.policy,
+            env,
+            seed=spec.seed,
+            device=spec.device,
+            verbose=0,
+            **kwargs,
+        )
+    model.set_logger(make_sb3_logger(os.path.join(spec.run_dir, spec.algo), window_steps=spec.log_window_steps))
+
+    checkpoint_callback = CheckpointCallback(
+        save_freq=spec.checkpoint_freq,
+        save_path=os.path.join(spec.run_dir, "checkpoints"),
+        name_prefix="model",
+        save_replay_buffer=True,
+    )
+    remaining = max(spec.total_timesteps - model.num_timesteps, 0)
+    model.learn(
+        total_timesteps=remaining,
+        callback=checkpoint_callback,
+        reset_num_timesteps=checkpoint is None,
+    )
+    model.logger.close()
+    model.save(final_path)
+    env.close()
+
+    entry.update(
+        status="finished",
+        resumed=checkpoint is not None,
+        timesteps=int(model.num_timesteps),
+        wall_time_s=time.time() - start,
+    )
+    if len(model.ep_success_buffer) > 0:
+        entry["success_rate"] = float(np.mean(model.ep_success_buffer))
+    if len(model.ep_info_buffer) > 0:
+        entry["mean_reward"] = float(np.mean([info["r"] for info in model.ep_info_buffer]))
+    return entry
+
+
+def write_index(path: str, entries: Dict[str, Dict[str, Any]]) -> None:
+    """
+    Atomically write the results index.
+
+    Args:
+        path: Destination JSON file
+        entries: Index entries keyed by run id
+    """
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(sorted(entries.values(), key=lambda e: e["run_id"]), f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def run_grid(grid_path: str, workers: int = 1) -> Dict[str, Dict[str, Any]]:
+    """
+    Train every run of a grid on a local process pool.
+
+    Args:
+        grid_path: Path to the grid file
+        workers: Number of runs trained concurrently
+
+    Returns:
+        Results index entries keyed by run id
+    """
+    specs = expand_grid(load_grid(grid_path))
+    if not specs:
+        print(f"No runs found in {grid_path}")
+        return {}
+
+    log_dirs = {spec.log_dir for spec in specs}
+    index_path = os.path.join(specs[0].log_dir, INDEX_FILENAME)
+    if len(log_dirs) > 1:
+        print(f"Runs use several log directories, writing the index to {index_path}")
+    os.makedirs(specs[0].log_dir, exist_ok=True)
+
+    entries: Dict[str, Dict[str, Any]] = {}
+    if os.path.exists(index_path):
+        with open(index_path, "r") as f:
+            entries = {entry["run_id"]: entry for entry in json.load(f)}
+
+    print(f"Scheduling {len(specs)} runs on {workers} workers")
+    # Spawned workers start without inherited torch/OpenMP thread pools, and
+    # each one claims a disjoint core set for all the runs it trains
+    ctx = get_context("spawn")
+    allocations = ctx.Queue()
+    for allocation in plan_runs(workers):
+        allocations.put(allocation)
+    with ProcessPoolExecutor(
+        max_workers=workers, mp_context=ctx, initializer=_claim_allocation, initargs=(allocations,)
+    ) as pool:
+        futures = {pool.submit(train_run, spec): spec for spec in specs}
+        for future in as_completed(futures):
+            spec = futures[future]
+            try:
+                entry = future.result()
+            except Exception as e:
+                entry = {"run_id": spec.run_id, "spec": asdict(spec), "status": "failed", "error": repr(e)}
+            entries[spec.run_id] = entry
+            write_index(index_path, entries)
+            print(f"[{spec.run_id}] {entry['status']}")
+
+    print(f"Results index written to {index_path}")
+    return entries
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Run a grid of training experiments")
+    parser.add_argument("grid", help="Path to a YAML or TOML grid file")
+    parser.add_argument("--workers", type=int, default=1, help="Number of concurrent runs")
+    parser.add_argument("--dry-run", action="store_true", help="List the runs without training")
+    args = parser.parse_args(argv)
+
+    if args.dry_run:
+        for spec in expand_grid(load_grid(args.grid)):
+            print(f"{spec.run_id}: {spec.hyperparameters}")
+        return
+    run_grid(args.grid, workers=args.workers)
+
+
+if __name__ == "__main__":
+    main()
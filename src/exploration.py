@@ -0,0 +1,195 @@
+"""
+Batched exploration noise for off-policy training on vector envs.
+
+``BatchedActionNoise`` draws the noise of all envs, shape ``(n_envs, act_dim)``,
+in one call from a single generator instead of one ``ActionNoise`` object and
+one RNG call per env. It supports Gaussian and Ornstein-Uhlenbeck noise plus
+epsilon-random actions, keeps the OU state of each env separately (reset on
+that env's episode end) and scales sigma and epsilon with a decay schedule
+driven by the number of environment steps taken.
+
+Additive noise works with any SB3 off-policy algorithm through the usual
+``action_noise`` argument. Epsilon-random actions replace the policy action
+rather than perturb it, which needs the algorithm's action sampling hook: use
+``ExploringDDPG``, ``ExploringTD3`` or ``ExploringSAC`` (or mix
+``BatchedExplorationMixin`` into another algorithm).
+"""
+
+from typing import Iterable, Optional, Tuple
+
+import numpy as np
+from stable_baselines3 import DDPG, SAC, TD3
+from stable_baselines3.common.noise import VectorizedActionNoise
+
+NOISE_KINDS = ("gaussian", "ou", "none")
+DECAY_KINDS = ("linear", "exponential")
+
+
+class BatchedActionNoise(VectorizedActionNoise):
+    """
+    Gaussian, OU and epsilon-random exploration for all envs at once.
+
+    Subclasses ``VectorizedActionNoise`` so SB3 uses it as-is for vector envs
+    instead of wrapping it in per-env copies.
+
+    Args:
+        n_envs: Number of envs in the vector env
+        act_dim: Action dimension
+        kind: Additive noise, "gaussian", "ou" or "none"
+        sigma: Noise scale, in the policy's [-1, 1] action space
+        epsilon: Probability of replacing an env's action by a uniform random one
+        theta: OU mean-reversion rate
+        dt: OU time step
+        decay_steps: Env steps over which sigma and epsilon decay (None: no decay)
+        final_scale: Fraction of sigma and epsilon left after ``decay_steps``
+        decay: "linear" or "exponential"
+        seed: Seed of the noise generator
+        dtype: Dtype of the returned noise
+    """
+    def __init__(
+        self,
+        n_envs: int,
+        act_dim: int,
+        kind: str = "gaussian",
+        sigma: float = 0.1,
+        epsilon: float = 0.0,
+        theta: float = 0.15,
+        dt: float = 1e-2,
+        decay_steps: Optional[int] = None,
+        final_scale: float = 0.0,
+        decay: str = "linear",
+        seed: Optional[int] = None,
+        dtype=np.float32,
+    ):
+        # VectorizedActionNoise.__init__ builds per-env noise objects, which is what we avoid
+        if kind not in NOISE_KINDS:
+            raise ValueError(f"kind must be one of {NOISE_KINDS}, got '{kind}'")
+        if decay not in DECAY_KINDS:
+            raise ValueError(f"decay must be one of {DECAY_KINDS}, got '{decay}'")
+        if decay_steps is not None and decay_steps <= 0:
+            raise ValueError(f"decay_steps must be positive or None, got {decay_steps}")
+        if decay == "exponential" and decay_steps is not None and final_scale <= 0:
+            raise ValueError("Exponential decay needs final_scale > 0")
+        self.n_envs = int(n_envs)
+        self.act_dim = int(act_dim)
+        self.kind = kind
+        self.sigma = float(sigma)
+        self.epsilon = float(epsilon)
+        self.theta = float(theta)
+        self.dt = float(dt)
+        self.decay_steps = decay_steps
+        self.final_scale = float(final_scale)
+        self.decay = decay
+        self.dtype = np.dtype(dtype)
+        self.num_timesteps = 0
+        self._rng = np.random.default_rng(seed)
+        self._ou_state = np.zeros((self.n_envs, self.act_dim), dtype=self.dtype)
+
+    def scale(self, num_timesteps: Optional[int] = None) -> float:
+        """
+        Fraction of sigma and epsilon in use after ``num_timesteps`` env steps.
+
+        Args:
+            num_timesteps: Env steps (defaults to the steps taken so far)
+
+        Returns:
+            Scale between ``final_scale`` and 1
+        """
+        if self.decay_steps is None:
+            return 1.0
+        t = self.num_timesteps if num_timesteps is None else num_timesteps
+        progress = min(t / self.decay_steps, 1.0)
+        if self.decay == "linear":
+            return 1.0 + (self.final_scale - 1.0) * progress
+        return self.final_scale ** progress
+
+    @property
+    def current_sigma(self) -> float:
+        return self.sigma * self.scale()
+
+    @property
+    def current_epsilon(self) -> float:
+        return self.epsilon * self.scale()
+
+    def set_timesteps(self, num_timesteps: int) -> None:
+        """Move the decay schedule to ``num_timesteps`` (e.g. after loading a checkpoint)."""
+        self.num_timesteps = int(num_timesteps)
+
+    def __call__(self) -> np.ndarray:
+        """Noise for one vector step, shape (n_envs, act_dim)."""
+        sigma = self.current_sigma
+        self.num_timesteps += self.n_envs
+        if self.kind == "none" or sigma == 0.0:
+            return np.zeros((self.n_envs, self.act_dim), dtype=self.dtype)
+        normal = self._rng.standard_normal((self.n_envs, self.act_dim), dtype=np.float32).astype(self.dtype, copy=False)
+        if self.kind == "gaussian":
+            return sigma * normal
+        self._ou_state += -self.theta * self._ou_state * self.dt + sigma * np.sqrt(self.dt) * normal
+        return self._ou_state.copy()
+
+    def apply(self, actions: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Replace the actions of randomly chosen envs by uniform random actions.
+
+        Args:
+            actions: Scaled actions in [-1, 1], shape (n_envs, act_dim)
+
+        Returns:
+            Tuple of (actions, boolean mask of the envs that were replaced)
+        """
+        epsilon = self.current_epsilon
+        if epsilon <= 0.0:
+            return actions, np.zeros(len(actions), dtype=bool)
+        replaced = self._rng.random(len(actions)) < epsilon
+        if replaced.any():
+            actions = actions.copy()
+            actions[replaced] = self._rng.uniform(-1.0, 1.0, size=(int(replaced.sum()), actions.shape[-1]))
+        return actions, replaced
+
+    def reset(self, indices: Optional[Iterable[int]] = None) -> None:
+        """
+        Reset the noise state of the envs in ``indices`` (all envs if None).
+
+        SB3 calls this with the index of each env whose episode ended.
+        """
+        if indices is None:
+            self._ou_state[:] = 0.0
+        else:
+            self._ou_state[list(indices)] = 0.0
+
+    def __repr__(self) -> str:
+        return (f"BatchedActionNoise(kind={self.kind}, n_envs={self.n_envs}, sigma={self.sigma}, "
+                f"epsilon={self.epsilon}, scale={self.scale():.3f})")
+
+
+class BatchedExplorationMixin:
+    """
+    Apply the epsilon-random part of a ``BatchedActionNoise`` when sampling actions.
+
+    Mix in before an SB3 off-policy algorithm class. During warm-up
+    (``learning_starts``) actions are already random and are left alone.
+    """
+    def _sample_action(self, learning_starts: int, action_noise=None, n_envs: int = 1):
+        action, buffer_action = super()._sample_action(learning_starts, action_noise, n_envs)
+        if isinstance(action_noise, BatchedActionNoise) and self.num_timesteps >= learning_starts:
+            buffer_action, replaced = action_noise.apply(buffer_action)
+            if replaced.any():
+                action = self.policy.unscale_action(buffer_action)
+        return action, buffer_action
+
+    def _on_step(self) -> None:
+        super()._on_step()
+        if isinstance(self.action_noise, BatchedActionNoise):
+            self.logger.record("exploration/noise_scale", self.action_noise.scale())
+
+
+class ExploringDDPG(BatchedExplorationMixin, DDPG):
+    """DDPG with batched exploration (see ``BatchedExplorationMixin``)."""
+
+
+class ExploringTD3(BatchedExplorationMixin, TD3):
+    """TD3 with batched exploration (see ``BatchedExplorationMixin``)."""
+
+
+class ExploringSAC(BatchedExplorationMixin, SAC):
+    """SAC with batched exploration (see ``BatchedExplorationMixin``)."""
@@ -0,0 +1,291 @@
+"""
+Buffered metrics logging for training scripts, and compact summaries of
+existing TensorBoard runs.
+
+``BufferedMetricsSink`` keeps scalars in memory, reduces them over step
+windows (mean/min/max) and writes the reduced points to a TensorBoard event
+file from a background thread, so the training loop never blocks on disk and
+event files stay small. ``make_sb3_logger`` plugs the sink into a
+Stable-Baselines3 model in place of its default TensorBoard and stdout output.
+
+Usage (summarize existing runs, no TensorFlow needed):
+    python -m src.metrics her_fetch_slide_tensorboard/ --output slide_summary.csv
+"""
+
+import argparse
+import csv
+import os
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from src.tb_events import EventFileWriter, find_event_files, iter_scalars
+
+REDUCTIONS = ("mean", "min", "max")
+
+
+class _Window:
+    __slots__ = ("count", "total", "minimum", "maximum", "last_step")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.minimum = float("inf")
+        self.maximum = float("-inf")
+        self.last_step = 0
+
+    def add(self, value: float, step: int) -> None:
+        self.count += 1
+        self.total += value
+        self.minimum = min(self.minimum, value)
+        self.maximum = max(self.maximum, value)
+        self.last_step = step
+
+
+class BufferedMetricsSink:
+    """
+    Aggregate scalars in memory and flush them to TensorBoard in the background.
+
+    Every tag accumulates values until ``window_steps`` steps have passed since
+    its window opened; the window is then reduced to one point per entry of
+    ``reductions`` (logged as ``tag``, ``tag/min``, ``tag/max``). A
+    ``downsample`` factor keeps only every n-th closed window of each tag.
+    """
+    def __init__(
+        self,
+        log_dir: str,
+        window_steps: int = 1000,
+        reductions: Sequence[str] = REDUCTIONS,
+        downsample: int = 1,
+        flush_secs: float = 10.0,
+    ):
+        unknown = set(reductions) - set(REDUCTIONS)
+        if unknown:
+            raise ValueError(f"Reductions must be among {REDUCTIONS}, got {sorted(unknown)}")
+        if downsample < 1:
+            raise ValueError("downsample must be at least 1")
+        self.log_dir = log_dir
+        self.window_steps = window_steps
+        self.reductions = tuple(reductions)
+        self.downsample = downsample
+        self.flush_secs = flush_secs
+
+        self._windows: Dict[str, Tuple[int, _Window]] = {}
+        self._closed_counts: Dict[str, int] = {}
+        self._pending: List[Tuple[int, Dict[str, float]]] = []
+        self._lock = threading.Lock()
+        # EventFileWriter is not thread-safe; the flush thread and flush() share it
+        self._write_lock = threading.Lock()
+        self._writer = EventFileWriter(log_dir)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._flush_loop, name="metrics-sink", daemon=True)
+        self._thread.start()
+
+    def record(self, tag: str, value: float, step: int) -> None:
+        """
+        Add a scalar to the current window of ``tag``.
+
+        Args:
+            tag: Metric name
+            value: Scalar value
+            step: Global step the value belongs to
+        """
+        with self._lock:
+            start, window = self._windows.get(tag, (step, None))
+            if window is not None and step - start >= self.window_steps:
+                self._close(tag, window)
+                start, window = step, None
+            if window is None:
+                window = _Window()
+                self._windows[tag] = (start, window)
+            window.add(float(value), step)
+
+    def record_dict(self, scalars: Dict[str, float], step: int) -> None:
+        """Record several scalars at the same step."""
+        for tag, value in scalars.items():
+            self.record(tag, value, step)
+
+    def _close(self, tag: str, window: _Window) -> None:
+        # Called with the lock held
+        index = self._closed_counts.get(tag, 0)
+        self._closed_counts[tag] = index + 1
+        if index % self.downsample:
+            return
+        points = {}
+        if "mean" in self.reductions:
+            points[tag] = window.total / window.count
+        if "min" in self.reductions:
+            points[f"{tag}/min"] = window.minimum
+        if "max" in self.reductions:
+            points[f"{tag}/max"] = window.maximum
+        self._pending.append((window.last_step, points))
+
+    def _write_pending(self) -> None:
+        with self._write_lock:
+            with self._lock:
+                pending, self._pending = self._pending, []
+            for step, points in pending:
+                self._writer.add_scalars(step, points)
+            if pending:
+                self._writer.flush()
+
+    def _flush_loop(self) -> None:
+        while not self._stop.wait(self.flush_secs):
+            self._write_pending()
+
+    def flush(self, close_windows: bool = False) -> None:
+        """
+        Write reduced points to disk now.
+
+        Args:
+            close_windows: Also reduce the windows that are still open
+        """
+        if close_windows:
+            with self._lock:
+                for tag, (_, window) in self._windows.items():
+                    self._close(tag, window)
+                self._windows.clear()
+        self._write_pending()
+
+    def close(self) -> None:
+        """Close all open windows, flush them and stop the background thread."""
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        self._thread.join()
+        self.flush(close_windows=True)
+        with self._write_lock:
+            self._writer.close()
+
+
+try:
+    from stable_baselines3.common.logger import KVWriter
+except ImportError:  # stable-baselines3 is only needed for the logger integration
+    KVWriter = object
+
+
+class SinkOutputFormat(KVWriter):
+    """SB3 logger output format that forwards numeric values to a ``BufferedMetricsSink``."""
+    def __init__(self, sink: BufferedMetricsSink):
+        self.sink = sink
+
+    def write(self, key_values: Dict[str, Any], key_excluded: Dict[str, Tuple[str, ...]], step: int = 0) -> None:
+        for key, value in key_values.items():
+            excluded = key_excluded.get(key)
+            if excluded is not None and "tensorboard" in excluded:
+                continue
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                self.sink.record(key, value, step)
+            elif hasattr(value, "item") and getattr(value, "size", 1) == 1:
+                self.sink.record(key, value.item(), step)
+
+    def close(self) -> None:
+        self.sink.close()
+
+
+def make_sb3_logger(
+    log_dir: str,
+    window_steps: int = 1000,
+    downsample: int = 1,
+    flush_secs: float = 10.0,
+    stdout: bool = False,
+) -> "Logger":
+    """
+    Build an SB3 logger that writes through a ``BufferedMetricsSink``.
+
+    Use with ``model.set_logger(...)`` instead of passing ``tensorboard_log``.
+
+    Args:
+        log_dir: Directory for the event file
+        window_steps: Steps reduced into each logged point
+        downsample: Keep every n-th reduced point
+        flush_secs: Background flush period
+        stdout: Also print SB3's progress table
+
+    Returns:
+        Configured logger
+    """
+    try:
+        from stable_baselines3.common.logger import Logger, make_output_format
+    except ImportError as e:
+        raise ImportError("The SB3 logger requires stable-baselines3: pip install stable-baselines3") from e
+    sink = BufferedMetricsSink(log_dir, window_steps=window_steps, downsample=downsample, flush_secs=flush_secs)
+    output_formats = [SinkOutputFormat(sink)]
+    if stdout:
+        output_formats.append(make_output_format("stdout", log_dir))
+    return Logger(folder=log_dir, output_formats=output_formats)
+
+
+def summarize_runs(root: str, bucket_steps: int = 10_000, verify_crc: bool = True) -> List[Dict[str, Any]]:
+    """
+    Reduce every scalar of every run below ``root`` to one row per step bucket.
+
+    A run is a directory containing event files, named relative to ``root``.
+
+    Args:
+        root: Directory holding one or more runs (e.g. ``her_fetch_tensorboard/``)
+        bucket_steps: Width of the step buckets
+        verify_crc: Check record checksums while reading
+
+    Returns:
+        Rows with run, tag, step (bucket start), count, mean, min, max and last
+    """
+    buckets: Dict[Tuple[str, str, int], List[float]] = {}
+    for path in find_event_files(root):
+        run = os.path.relpath(os.path.dirname(path), root) if os.path.isdir(root) else os.path.dirname(path)
+        for tag, step, value, _ in iter_scalars(path, verify_crc=verify_crc):
+            key = (run, tag, step // bucket_steps * bucket_steps)
+            stats = buckets.get(key)
+            if stats is None:
+                buckets[key] = [1, value, value, value, value]
+            else:
+                stats[0] += 1
+                stats[1] += value
+                stats[2] = min(stats[2], value)
+                stats[3] = max(stats[3], value)
+                stats[4] = value
+
+    return [
+        {"run": run, "tag": tag, "step": step, "count": count,
+         "mean": total / count, "min": minimum, "max": maximum, "last": last}
+        for (run, tag, step), (count, total, minimum, maximum, last) in sorted(buckets.items())
+    ]
+
+
+def write_summary(rows: Iterable[Dict[str, Any]], output: str) -> None:
+    """
+    Write summary rows as CSV, or as parquet when ``output`` ends in ``.parquet``.
+
+    Args:
+        rows: Rows from ``summarize_runs``
+        output: Destination path
+    """
+    rows = list(rows)
+    if output.endswith(".parquet"):
+        try:
+            import pandas as pd
+        except ImportError as e:
+            raise ImportError("Parquet output requires pandas and pyarrow: pip install pandas pyarrow") from e
+        pd.DataFrame(rows).to_parquet(output, index=False)
+        return
+    fieldnames = ["run", "tag", "step", "count", "mean", "min", "max", "last"]
+    with open(output, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Summarize TensorBoard event directories into CSV/parquet")
+    parser.add_argument("root", help="Directory of runs, a single run, or an event file")
+    parser.add_argument("--output", default="tb_summary.csv", help="Output .csv or .parquet file")
+    parser.add_argument("--bucket-steps", type=int, default=10_000, help="Steps per summary row")
+    parser.add_argument("--no-crc", action="store_true", help="Skip record checksum verification")
+    args = parser.parse_args(argv)
+
+    rows = summarize_runs(args.root, bucket_steps=args.bucket_steps, verify_crc=not args.no_crc)
+    write_summary(rows, args.output)
+    print(f"Wrote {len(rows)} rows to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,7 +6,7 @@ import gymnasium as gym
 import numpy as np
 import os
 import matplotlib.pyplot as plt
-from typing import List, Tuple, Dict, Any, Optional
+from typing import Tuple, Dict, Any, Optional, Sequence, Union
 
 def create_mujoco_env(env_id: str, render_mode: str = "human") -> gym.Env:
     """
@@ -114,24 +114,57 @@ def evaluate_policy(env: gym.Env, policy_fn, num_episodes: int = 10) -> Dict[str
         "episode_lengths": episode_lengths
     }
 
-def visualize_rewards(rewards: List[float], title: str = "Episode Rewards", save_path: Optional[str] = None) -> None:
+def visualize_rewards(
+    rewards: Union[Sequence[float], Dict[str, Sequence[float]]],
+    title: str = "Episode Rewards",
+    save_path: Optional[str] = None,
+    steps: Optional[Union[Sequence[float], Dict[str, Sequence[float]]]] = None,
+    xlabel: str = "Episode",
+    ylabel: str = "Total Reward",
+    max_points: int = 5000,
+    block: bool = True,
+) -> None:
     """
     Visualize rewards over episodes.
     
+    Long series are downsampled (keeping each bucket's min and max) before
+    plotting. For Monitor logs with millions of episodes or live runs, use
+    ``src.reward_plots`` instead, which streams the data and renders headlessly.
+    
     Args:
-        rewards: List of episode rewards
+        rewards: List or array of episode rewards, or a mapping from run name
+            to rewards to compare several runs on one plot
         title: Plot title
         save_path: Path to save the figure (if None, will display instead)
+        steps: x values for the rewards (same structure as ``rewards``);
+            defaults to episode numbers
+        xlabel: x-axis label
+        ylabel: y-axis label
+        max_points: Maximum number of points drawn per series
+        block: Whether displaying the figure waits for the window to close
     """
+    from src.reward_plots import downsample
+
+    series = rewards if isinstance(rewards, dict) else {None: rewards}
     plt.figure(figsize=(10, 6))
-    plt.plot(range(1, len(rewards) + 1), rewards, marker='o')
-    plt.xlabel("Episode")
-    plt.ylabel("Total Reward")
+    for name, values in series.items():
+        values = np.asarray(values, dtype=np.float64)
+        x = steps if name is None else (steps[name] if steps is not None else None)
+        x = np.arange(1, len(values) + 1) if x is None else np.asarray(x)
+        x, values = downsample(x, values, max_points)
+        # Markers only help when individual episodes are distinguishable
+        marker = 'o' if len(values) <= 200 else None
+        plt.plot(x, values, marker=marker, label=name)
+    if isinstance(rewards, dict):
+        plt.legend()
+    plt.xlabel(xlabel)
+    plt.ylabel(ylabel)
     plt.title(title)
     plt.grid(True)
     
     if save_path:
         plt.savefig(save_path)
+        plt.close()
         print(f"Figure saved to {save_path}")
     else:
-        plt.show()
+        plt.show(block=block)
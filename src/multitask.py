@@ -0,0 +1,278 @@
+"""
+Multi-task Fetch training with one learner.
+
+A single ``SubprocVecEnv`` runs workers for several Fetch tasks side by side.
+Every observation gets a one-hot ``task_id`` entry (and ``observation`` is
+zero-padded to the largest task's size), so one policy with shared weights
+can act in all of them. ``TaskBalancedHerReplayBuffer`` treats the buffer
+columns of each task's workers as that task's shard and samples every batch
+evenly across tasks, and ``PerTaskSuccessCallback`` logs the success rate of
+each task separately.
+"""
+
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import gymnasium as gym
+import numpy as np
+import torch as th
+from gymnasium import spaces
+from stable_baselines3 import HerReplayBuffer
+from stable_baselines3.common.callbacks import BaseCallback
+from stable_baselines3.common.type_aliases import DictReplayBufferSamples
+from stable_baselines3.common.vec_env import SubprocVecEnv, VecNormalize
+
+from src.resource_manager import pinned_env_fn
+
+TASK_KEY = "task_id"
+
+
+class TaskIdWrapper(gym.ObservationWrapper):
+    """
+    Add a one-hot task id to a goal-conditioned observation.
+
+    Args:
+        env: Goal-conditioned env with a dict observation space
+        task_index: Index of this env's task
+        n_tasks: Number of tasks trained together
+        obs_dim: Size ``observation`` is zero-padded to (defaults to its own size)
+    """
+    def __init__(self, env: gym.Env, task_index: int, n_tasks: int, obs_dim: Optional[int] = None):
+        super().__init__(env)
+        obs_space = env.observation_space.spaces["observation"]
+        self.obs_dim = obs_dim or obs_space.shape[0]
+        if self.obs_dim < obs_space.shape[0]:
+            raise ValueError(f"obs_dim={self.obs_dim} is smaller than the env's observation ({obs_space.shape[0]})")
+        self._padding = self.obs_dim - obs_space.shape[0]
+        self._task_id = np.zeros(n_tasks, dtype=np.float32)
+        self._task_id[task_index] = 1.0
+
+        observation_spaces = dict(env.observation_space.spaces)
+        observation_spaces["observation"] = spaces.Box(-np.inf, np.inf, shape=(self.obs_dim,), dtype=obs_space.dtype)
+        observation_spaces[TASK_KEY] = spaces.Box(0.0, 1.0, shape=(n_tasks,), dtype=np.float32)
+        self.observation_space = spaces.Dict(observation_spaces)
+
+    def observation(self, observation: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        observation = dict(observation)
+        if self._padding:
+            observation["observation"] = np.pad(observation["observation"], (0, self._padding))
+        observation[TASK_KEY] = self._task_id.copy()
+        return observation
+
+
+def _observation_dim(env_id: str) -> int:
+    import gymnasium_robotics
+
+    gym.register_envs(gymnasium_robotics)
+    env = gym.make(env_id)
+    obs_dim = env.observation_space.spaces["observation"].shape[0]
+    env.close()
+    return obs_dim
+
+
+def make_multitask_vec_env(
+    env_ids: Sequence[str],
+    envs_per_task: int = 1,
+    worker_cores: Optional[Sequence[Sequence[int]]] = None,
+    wrapper: Optional[Callable[[gym.Env], gym.Env]] = None,
+) -> Tuple[SubprocVecEnv, List[int]]:
+    """
+    Build one subprocess vector env with workers for several Fetch tasks.
+
+    Workers are laid out task by task: ``envs_per_task`` workers for the
+    first task, then for the second, and so on.
+
+    Args:
+        env_ids: Gymnasium ids of the tasks (e.g. ``["FetchSlide-v3", "FetchPush-v3"]``)
+        envs_per_task: Worker processes per task
+        worker_cores: Core lists for the workers (e.g. ``allocation["env_workers"]``), used round-robin
+        wrapper: Extra wrapper applied to each env after the task id (e.g. ``Monitor``)
+
+    Returns:
+        Tuple of (vector env, task index of each worker)
+    """
+    obs_dim = max(_observation_dim(env_id) for env_id in env_ids)
+    env_tasks = [task for task in range(len(env_ids)) for _ in range(envs_per_task)]
+
+    def make_env_fn(task: int) -> Callable[[], gym.Env]:
+        env_id = env_ids[task]
+
+        def _init() -> gym.Env:
+            import gymnasium_robotics
+
+            gym.register_envs(gymnasium_robotics)
+            env = TaskIdWrapper(gym.make(env_id), task, len(env_ids), obs_dim)
+            return wrapper(env) if wrapper is not None else env
+
+        return _init
+
+    env_fns = []
+    for worker, task in enumerate(env_tasks):
+        env_fn = make_env_fn(task)
+        if worker_cores:
+            env_fn = pinned_env_fn(env_fn, worker_cores[worker % len(worker_cores)])
+        env_fns.append(env_fn)
+    return SubprocVecEnv(env_fns), env_tasks
+
+
+class TaskBalancedHerReplayBuffer(HerReplayBuffer):
+    """
+    HER replay buffer with one shard per task and task-balanced sampling.
+
+    The buffer stores one column per env worker, so the columns of a task's
+    workers form that task's shard. Each batch is split evenly between the
+    tasks that have complete episodes, whatever their share of the data, and
+    relabelled rewards are computed by an env of the transition's own task.
+
+    Args:
+        env_tasks: Task index of each env worker, as returned by ``make_multitask_vec_env``
+        All other arguments are those of ``HerReplayBuffer``.
+    """
+    def __init__(self, *args, env_tasks: Sequence[int], **kwargs):
+        super().__init__(*args, **kwargs)
+        if len(env_tasks) != self.n_envs:
+            raise ValueError(f"Got {len(env_tasks)} task indices for {self.n_envs} envs")
+        self.env_tasks = np.asarray(env_tasks, dtype=np.int64)
+        self.task_columns = [np.flatnonzero(self.env_tasks == task) for task in range(self.env_tasks.max() + 1)]
+
+    def shard_sizes(self) -> List[int]:
+        """Number of sampleable transitions in each task's shard."""
+        is_valid = self.ep_length > 0
+        return [int(is_valid[:, columns].sum()) for columns in self.task_columns]
+
+    def _sample_balanced_indices(self, batch_size: int) -> Tuple[np.ndarray, np.ndarray]:
+        is_valid = self.ep_length > 0
+        shards = []
+        for columns in self.task_columns:
+            valid = np.flatnonzero(is_valid[:, columns])
+            if len(valid):
+                shards.append((columns, valid))
+        if not shards:
+            raise RuntimeError(
+                "Unable to sample before the end of the first episode. We recommend choosing a value "
+                "for learning_starts that is greater than the maximum number of timesteps in the environment."
+            )
+
+        counts = np.full(len(shards), batch_size // len(shards))
+        counts[np.random.choice(len(shards), batch_size % len(shards), replace=False)] += 1
+        batch_indices, env_indices = [], []
+        for (columns, valid), count in zip(shards, counts):
+            sampled = np.random.choice(valid, size=count, replace=True)
+            rows, shard_columns = np.unravel_index(sampled, (self.buffer_size, len(columns)))
+            batch_indices.append(rows)
+            env_indices.append(columns[shard_columns])
+        # Shuffle so the real/virtual split below does not depend on the task
+        order = np.random.permutation(batch_size)
+        return np.concatenate(batch_indices)[order], np.concatenate(env_indices)[order]
+
+    def sample(self, batch_size: int, env: Optional[VecNormalize] = None) -> DictReplayBufferSamples:
+        batch_indices, env_indices = self._sample_balanced_indices(batch_size)
+
+        nb_virtual = int(self.her_ratio * batch_size)
+        virtual_batch_indices, real_batch_indices = np.split(batch_indices, [nb_virtual])
+        virtual_env_indices, real_env_indices = np.split(env_indices, [nb_virtual])
+        real_data = self._get_real_samples(real_batch_indices, real_env_indices, env)
+        virtual_data = self._get_virtual_samples(virtual_batch_indices, virtual_env_indices, env)
+
+        return DictReplayBufferSamples(
+            observations={
+                key: th.cat((real_data.observations[key], virtual_data.observations[key]))
+                for key in virtual_data.observations.keys()
+            },
+            actions=th.cat((real_data.actions, virtual_data.actions)),
+            next_observations={
+                key: th.cat((real_data.next_observations[key], virtual_data.next_observations[key]))
+                for key in virtual_data.next_observations.keys()
+            },
+            dones=th.cat((real_data.dones, virtual_data.dones)),
+            rewards=th.cat((real_data.rewards, virtual_data.rewards)),
+        )
+
+    def _compute_rewards(
+        self,
+        achieved_goal: np.ndarray,
+        desired_goal: np.ndarray,
+        infos: List[Dict[str, Any]],
+        env_indices: np.ndarray,
+    ) -> np.ndarray:
+        # One env_method call per task, on the first worker of that task
+        rewards = np.empty(len(env_indices), dtype=np.float32)
+        tasks = self.env_tasks[env_indices]
+        for task, columns in enumerate(self.task_columns):
+            mask = tasks == task
+            if not mask.any():
+                continue
+            task_infos = [info for info, selected in zip(infos, mask) if selected]
+            rewards[mask] = self.env.env_method(
+                "compute_reward", achieved_goal[mask], desired_goal[mask], task_infos, indices=[int(columns[0])]
+            )[0]
+        return rewards
+
+    def _get_virtual_samples(
+        self,
+        batch_indices: np.ndarray,
+        env_indices: np.ndarray,
+        env: Optional[VecNormalize] = None,
+    ) -> DictReplayBufferSamples:
+        # Same as HerReplayBuffer._get_virtual_samples, except that rewards come from each task's own env
+        obs = {key: obs[batch_indices, env_indices, :] for key, obs in self.observations.items()}
+        next_obs = {key: obs[batch_indices, env_indices, :] for key, obs in self.next_observations.items()}
+        if self.copy_info_dict:
+            infos = list(self.infos[batch_indices, env_indices])
+        else:
+            infos = [{} for _ in range(len(batch_indices))]
+        new_goals = self._sample_goals(batch_indices, env_indices)
+        obs["desired_goal"] = new_goals
+        next_obs["desired_goal"] = new_goals
+
+        assert self.env is not None, "TaskBalancedHerReplayBuffer needs the VecEnv to compute rewards"
+        rewards = self._compute_rewards(next_obs["achieved_goal"], new_goals, infos, env_indices)
+        obs = self._normalize_obs(obs, env)
+        next_obs = self._normalize_obs(next_obs, env)
+
+        return DictReplayBufferSamples(
+            observations={key: self.to_torch(value) for key, value in obs.items()},
+            actions=self.to_torch(self.actions[batch_indices, env_indices]),
+            next_observations={key: self.to_torch(value) for key, value in next_obs.items()},
+            dones=self.to_torch(
+                self.dones[batch_indices, env_indices] * (1 - self.timeouts[batch_indices, env_indices])
+            ).reshape(-1, 1),
+            rewards=self.to_torch(self._normalize_reward(rewards.reshape(-1, 1), env)),
+        )
+
+
+class PerTaskSuccessCallback(BaseCallback):
+    """
+    Log the rolling success rate of each task as ``rollout/success_rate/<task>``.
+
+    Args:
+        env_tasks: Task index of each env worker
+        task_names: Name of each task, used in the logged keys
+        window: Episodes averaged per task
+    """
+    def __init__(self, env_tasks: Sequence[int], task_names: Sequence[str], window: int = 100, verbose: int = 0):
+        super().__init__(verbose)
+        self.env_tasks = list(env_tasks)
+        self.task_names = list(task_names)
+        self.successes = [deque(maxlen=window) for _ in self.task_names]
+
+    def _on_step(self) -> bool:
+        for idx, done in enumerate(self.locals["dones"]):
+            if not done:
+                continue
+            success = self.locals["infos"][idx].get("is_success")
+            if success is None:
+                continue
+            task = self.env_tasks[idx]
+            self.successes[task].append(float(success))
+            self.logger.record(f"rollout/success_rate/{self.task_names[task]}", np.mean(self.successes[task]))
+        return True
+
+    def success_rates(self) -> Dict[str, float]:
+        """Current rolling success rate of every task that has finished an episode."""
+        return {name: float(np.mean(buf)) for name, buf in zip(self.task_names, self.successes) if buf}
+
+    def _on_training_end(self) -> None:
+        for name, buf in zip(self.task_names, self.successes):
+            if buf:
+                print(f"{name}: success rate {np.mean(buf):.2f} over the last {len(buf)} episodes")
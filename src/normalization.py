@@ -0,0 +1,233 @@
+"""
+Goal-aware observation normalization for the Fetch HER scripts.
+
+Each env worker keeps Welford running statistics of what it observes
+(``RunningStatsWrapper``). ``VecGoalNormalize`` collects and merges those
+statistics once every ``sync_every`` vector steps, i.e. one ``env_method``
+round trip per rollout chunk instead of a synchronization on every step, and
+normalizes observations with the merged statistics. ``achieved_goal`` and
+``desired_goal`` share one set of goal statistics, as in the original HER
+setup, so relabelled goals are normalized consistently.
+
+``VecGoalNormalize`` is a ``VecNormalize``, so SB3 stores raw observations in
+the (HER) replay buffer, computes relabelled rewards on raw goals and
+normalizes sampled batches with the current statistics.
+"""
+
+from typing import Callable, Dict, Optional, Tuple, Type
+
+import gymnasium as gym
+import numpy as np
+from stable_baselines3.common.base_class import BaseAlgorithm
+from stable_baselines3.common.running_mean_std import RunningMeanStd
+from stable_baselines3.common.vec_env import DummyVecEnv, SubprocVecEnv, VecEnv, VecNormalize
+
+GOAL_KEYS = ("achieved_goal", "desired_goal")
+STATS_SUFFIX = "_vecnormalize.pkl"
+
+
+class WelfordStats:
+    """Running count, mean and sum of squared deviations (Welford's algorithm)."""
+    def __init__(self, shape: Tuple[int, ...]):
+        self.count = 0
+        self.mean = np.zeros(shape, dtype=np.float64)
+        self.m2 = np.zeros(shape, dtype=np.float64)
+
+    def update(self, x: np.ndarray) -> None:
+        """Add one sample."""
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (x - self.mean)
+
+    def pop(self) -> Tuple[int, np.ndarray, np.ndarray]:
+        """Return (count, mean, variance) and start over."""
+        moments = (self.count, self.mean.copy(), self.m2 / max(self.count, 1))
+        self.count = 0
+        self.mean[:] = 0.0
+        self.m2[:] = 0.0
+        return moments
+
+
+class RunningStatsWrapper(gym.Wrapper):
+    """
+    Accumulate observation and goal statistics inside an env worker.
+
+    Observations pass through unchanged; normalization happens in
+    ``VecGoalNormalize`` once the statistics of all workers are merged.
+    """
+    def __init__(self, env: gym.Env):
+        super().__init__(env)
+        spaces = env.observation_space.spaces
+        self.collect = True
+        self._stats = {"observation": WelfordStats(spaces["observation"].shape),
+                       "goal": WelfordStats(spaces["desired_goal"].shape)}
+
+    def _accumulate(self, obs: Dict[str, np.ndarray]) -> None:
+        if not self.collect:
+            return
+        self._stats["observation"].update(obs["observation"])
+        for key in GOAL_KEYS:
+            self._stats["goal"].update(obs[key])
+
+    def reset(self, **kwargs):
+        obs, info = self.env.reset(**kwargs)
+        self._accumulate(obs)
+        return obs, info
+
+    def step(self, action):
+        obs, reward, terminated, truncated, info = self.env.step(action)
+        self._accumulate(obs)
+        return obs, reward, terminated, truncated, info
+
+    def pop_running_stats(self) -> Dict[str, Tuple[int, np.ndarray, np.ndarray]]:
+        """Statistics gathered since the previous call."""
+        return {name: stats.pop() for name, stats in self._stats.items()}
+
+    def set_stats_collection(self, collect: bool) -> None:
+        self.collect = collect
+
+
+class VecGoalNormalize(VecNormalize):
+    """
+    ``VecNormalize`` for goal-conditioned dict observations with statistics
+    gathered in the env workers and merged once per ``sync_every`` steps.
+
+    Rewards are left unnormalized (the Fetch rewards are sparse and HER
+    recomputes them). Set ``training = False`` (or call ``freeze()``) to stop
+    updating the statistics, e.g. for evaluation.
+
+    Args:
+        venv: Vector env whose sub-envs are wrapped in ``RunningStatsWrapper``
+        sync_every: Vector steps between two statistics reductions
+        clip_obs: Clipping of normalized observations
+        epsilon: Added to the variance to avoid division by zero
+    """
+    def __init__(self, venv: VecEnv, sync_every: int = 50, clip_obs: float = 5.0, epsilon: float = 1e-8):
+        super().__init__(
+            venv,
+            norm_obs=True,
+            norm_reward=False,
+            clip_obs=clip_obs,
+            epsilon=epsilon,
+            norm_obs_keys=["observation", *GOAL_KEYS],
+        )
+        goal_rms = RunningMeanStd(shape=self.observation_space.spaces["desired_goal"].shape)
+        for key in GOAL_KEYS:
+            self.obs_rms[key] = goal_rms
+        self.sync_every = sync_every
+        self._steps_since_sync = 0
+
+    def sync_stats(self) -> None:
+        """Merge the statistics gathered by every worker since the last sync."""
+        for worker_stats in self.venv.env_method("pop_running_stats"):
+            for name, (count, mean, var) in worker_stats.items():
+                if count == 0:
+                    continue
+                rms = self.obs_rms["observation"] if name == "observation" else self.obs_rms["desired_goal"]
+                rms.update_from_moments(mean, var, count)
+        self._steps_since_sync = 0
+
+    def freeze(self) -> None:
+        """Stop collecting and merging statistics."""
+        self.training = False
+        self.venv.env_method("set_stats_collection", False)
+
+    def reset(self):
+        obs = self.venv.reset()
+        self.old_obs = obs
+        self.returns = np.zeros(self.num_envs)
+        if self.training:
+            self.sync_stats()
+        return self.normalize_obs(obs)
+
+    def step_wait(self):
+        obs, rewards, dones, infos = self.venv.step_wait()
+        self.old_obs = obs
+        self.old_reward = rewards
+
+        if self.training:
+            self._steps_since_sync += 1
+            if self._steps_since_sync >= self.sync_every:
+                self.sync_stats()
+
+        for idx, done in enumerate(dones):
+            if done and "terminal_observation" in infos[idx]:
+                infos[idx]["terminal_observation"] = self.normalize_obs(infos[idx]["terminal_observation"])
+        return self.normalize_obs(obs), rewards, dones, infos
+
+
+def make_normalized_vec_env(
+    env_fn: Callable[[], gym.Env],
+    n_envs: int = 1,
+    vec_env_cls: Optional[Type[VecEnv]] = None,
+    sync_every: int = 50,
+) -> VecGoalNormalize:
+    """
+    Build a normalized vector env from an env factory.
+
+    Args:
+        env_fn: Zero-argument function creating one goal-conditioned env
+        n_envs: Number of env workers
+        vec_env_cls: ``DummyVecEnv`` or ``SubprocVecEnv`` (default: subprocesses when n_envs > 1)
+        sync_every: Vector steps between statistics reductions
+
+    Returns:
+        Normalizing vector env
+    """
+    if vec_env_cls is None:
+        vec_env_cls = SubprocVecEnv if n_envs > 1 else DummyVecEnv
+
+    def _make():
+        return RunningStatsWrapper(env_fn())
+
+    return VecGoalNormalize(vec_env_cls([_make] * n_envs), sync_every=sync_every)
+
+
+def save_with_stats(model: BaseAlgorithm, path: str) -> str:
+    """
+    Save a model together with the frozen statistics of its normalizing env.
+
+    Args:
+        model: Trained model whose env is wrapped in ``VecGoalNormalize``
+        path: Model path (``.zip``); statistics go next to it
+
+    Returns:
+        Path of the statistics file
+    """
+    normalizer = model.get_vec_normalize_env()
+    if normalizer is None:
+        raise ValueError("The model's env is not wrapped in VecGoalNormalize")
+    model.save(path)
+    stats_path = path[:-4] + STATS_SUFFIX if path.endswith(".zip") else path + STATS_SUFFIX
+    normalizer.save(stats_path)
+    return stats_path
+
+
+def load_with_stats(
+    algo_class: Type[BaseAlgorithm],
+    path: str,
+    env: gym.Env,
+    **load_kwargs,
+) -> Tuple[BaseAlgorithm, VecNormalize]:
+    """
+    Load a model saved by ``save_with_stats`` with its statistics frozen.
+
+    Observations from ``env`` must be normalized with the returned
+    normalizer (``normalizer.normalize_obs(obs)``) before ``model.predict``.
+
+    Args:
+        algo_class: Algorithm class, e.g. ``DDPG``
+        path: Model path given to ``save_with_stats``
+        env: Evaluation env (needed for HER models)
+        load_kwargs: Passed on to ``algo_class.load``
+
+    Returns:
+        Tuple of (model, frozen normalizer)
+    """
+    stats_path = path[:-4] + STATS_SUFFIX if path.endswith(".zip") else path + STATS_SUFFIX
+    normalizer = VecNormalize.load(stats_path, DummyVecEnv([lambda: env]))
+    normalizer.training = False
+    model = algo_class.load(path, env=normalizer, **load_kwargs)
+    return model, normalizer
+
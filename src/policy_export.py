@@ -0,0 +1,340 @@
+"""
+Export trained DDPG/TD3/SAC actors to TorchScript or ONNX for fast CPU inference.
+
+``model.predict`` spends most of a Fetch evaluation step on overhead around a
+tiny MLP: observation dict preprocessing, tensor creation and device transfer.
+The exported graph contains only the deterministic actor (features, network,
+tanh squashing and rescaling to the env's action bounds). Dict observations
+are passed as one positional input per key, in the sorted key order of the
+observation space.
+
+``ExportedPolicy`` loads an exported file and exposes the same
+``predict(observation, deterministic=True) -> (action, None)`` call as the SB3
+model, so evaluation loops can use either one.
+
+Usage:
+    python -m src.policy_export fetch_slide_model.zip --algo DDPG --out-dir exported/ --benchmark
+"""
+
+import argparse
+import inspect
+import json
+import os
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import torch as th
+from gymnasium import spaces
+from torch import nn
+
+METADATA_KEY = "sb3_export"
+BACKENDS = {".pt": "torchscript", ".onnx": "onnx"}
+
+
+class DeterministicActor(nn.Module):
+    """
+    Deterministic action of an SB3 DDPG/TD3/SAC policy as a plain module.
+
+    Args:
+        policy: The model's policy (``model.policy``)
+    """
+    def __init__(self, policy):
+        super().__init__()
+        self.actor = policy.actor
+        self.observation_space = policy.observation_space
+        self.obs_keys = sorted(self.observation_space.spaces) if isinstance(self.observation_space, spaces.Dict) else []
+        # SAC's actor outputs the mean before squashing, DDPG/TD3's mu ends with tanh already
+        self.is_sac = hasattr(self.actor, "latent_pi")
+        low, high = policy.action_space.low, policy.action_space.high
+        self.register_buffer("action_low", th.as_tensor(low, dtype=th.float32))
+        self.register_buffer("action_range", th.as_tensor(high - low, dtype=th.float32))
+
+    def forward(self, *observations: th.Tensor) -> th.Tensor:
+        if self.obs_keys:
+            obs = {key: tensor for key, tensor in zip(self.obs_keys, observations)}
+        else:
+            obs = observations[0]
+        features = self.actor.extract_features(obs, self.actor.features_extractor)
+        if self.is_sac:
+            action = th.tanh(self.actor.mu(self.actor.latent_pi(features)))
+        else:
+            action = self.actor.mu(features)
+        return self.action_low + 0.5 * (action + 1.0) * self.action_range
+
+
+def _input_specs(observation_space: spaces.Space) -> List[Tuple[str, Tuple[int, ...], str]]:
+    if isinstance(observation_space, spaces.Dict):
+        return [(key, observation_space.spaces[key].shape, observation_space.spaces[key].dtype.str)
+                for key in sorted(observation_space.spaces)]
+    return [("obs", observation_space.shape, observation_space.dtype.str)]
+
+
+def _export_metadata(model) -> Dict[str, Any]:
+    return {
+        "algo": type(model).__name__,
+        "dict_obs": isinstance(model.observation_space, spaces.Dict),
+        "inputs": [[name, list(shape), dtype] for name, shape, dtype in _input_specs(model.observation_space)],
+        "action_low": model.action_space.low.tolist(),
+        "action_high": model.action_space.high.tolist(),
+    }
+
+
+def _example_inputs(model, batch_size: int = 1) -> Tuple[th.Tensor, ...]:
+    # float32 like SB3's preprocessing, which is a cast for Box spaces
+    return tuple(th.zeros((batch_size, *shape), dtype=th.float32)
+                 for _, shape, _ in _input_specs(model.observation_space))
+
+
+def _actor_module(model) -> DeterministicActor:
+    if not hasattr(model.policy, "actor"):
+        raise ValueError(f"Only DDPG/TD3/SAC policies can be exported, got {type(model.policy).__name__}")
+    return DeterministicActor(model.policy).to("cpu").eval()
+
+
+def export_torchscript(model, path: str) -> str:
+    """
+    Trace the model's deterministic actor to a TorchScript file.
+
+    Args:
+        model: Trained DDPG, TD3 or SAC model
+        path: Output path (``.pt``)
+
+    Returns:
+        The output path
+    """
+    module = _actor_module(model)
+    with th.no_grad():
+        traced = th.jit.trace(module, _example_inputs(model))
+    traced = th.jit.freeze(traced)
+    th.jit.save(traced, path, _extra_files={f"{METADATA_KEY}.json": json.dumps(_export_metadata(model))})
+    return path
+
+
+def export_onnx(model, path: str, opset_version: int = 17) -> str:
+    """
+    Export the model's deterministic actor to ONNX with a dynamic batch dimension.
+
+    Args:
+        model: Trained DDPG, TD3 or SAC model
+        path: Output path (``.onnx``)
+        opset_version: ONNX opset
+
+    Returns:
+        The output path
+    """
+    try:
+        import onnx
+    except ImportError as e:
+        raise ImportError("ONNX export requires onnx: pip install onnx") from e
+
+    module = _actor_module(model)
+    input_names = [name for name, _, _ in _input_specs(model.observation_space)]
+    # The TorchScript-based exporter, which newer torch versions no longer use by default
+    legacy = {"dynamo": False} if "dynamo" in inspect.signature(th.onnx.export).parameters else {}
+    with th.no_grad():
+        th.onnx.export(
+            module,
+            _example_inputs(model, batch_size=2),
+            path,
+            input_names=input_names,
+            output_names=["action"],
+            dynamic_axes={name: {0: "batch"} for name in input_names + ["action"]},
+            opset_version=opset_version,
+            **legacy,
+        )
+    exported = onnx.load(path)
+    entry = exported.metadata_props.add()
+    entry.key, entry.value = METADATA_KEY, json.dumps(_export_metadata(model))
+    onnx.save(exported, path)
+    return path
+
+
+def export_policy(model, path: str) -> str:
+    """Export to TorchScript (``.pt``) or ONNX (``.onnx``) depending on the file extension."""
+    backend = BACKENDS.get(os.path.splitext(path)[1])
+    if backend is None:
+        raise ValueError(f"Unknown export format for {path}, expected one of {sorted(BACKENDS)}")
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    return export_torchscript(model, path) if backend == "torchscript" else export_onnx(model, path)
+
+
+class ExportedPolicy:
+    """
+    Drop-in replacement for ``model.predict`` backed by an exported actor.
+
+    Args:
+        path: File written by ``export_policy`` (``.pt`` or ``.onnx``)
+        num_threads: Intra-op threads of the runtime (defaults to the runtime's choice)
+    """
+    def __init__(self, path: str, num_threads: Optional[int] = None):
+        self.path = path
+        self.backend = BACKENDS.get(os.path.splitext(path)[1])
+        if self.backend == "torchscript":
+            extra_files = {f"{METADATA_KEY}.json": ""}
+            self._module = th.jit.load(path, map_location="cpu", _extra_files=extra_files)
+            self.metadata = json.loads(extra_files[f"{METADATA_KEY}.json"])
+            self._run = self._run_torchscript
+        elif self.backend == "onnx":
+            try:
+                import onnxruntime as ort
+            except ImportError as e:
+                raise ImportError("ONNX inference requires onnxruntime: pip install onnxruntime") from e
+            options = ort.SessionOptions()
+            if num_threads is not None:
+                options.intra_op_num_threads = num_threads
+                options.inter_op_num_threads = 1
+            self._session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+            self.metadata = json.loads(self._session.get_modelmeta().custom_metadata_map[METADATA_KEY])
+            self._run = self._run_onnx
+        else:
+            raise ValueError(f"Unknown export format for {path}, expected one of {sorted(BACKENDS)}")
+        self.inputs = [(name, tuple(shape)) for name, shape, _ in self.metadata["inputs"]]
+        self.dict_obs = self.metadata["dict_obs"]
+        self.action_low = np.asarray(self.metadata["action_low"], dtype=np.float32)
+        self.action_high = np.asarray(self.metadata["action_high"], dtype=np.float32)
+
+    def _run_torchscript(self, arrays: List[np.ndarray]) -> np.ndarray:
+        with th.inference_mode():
+            return self._module(*[th.from_numpy(array) for array in arrays]).numpy()
+
+    def _run_onnx(self, arrays: List[np.ndarray]) -> np.ndarray:
+        return self._session.run(None, {name: array for (name, _), array in zip(self.inputs, arrays)})[0]
+
+    def predict(
+        self,
+        observation: Union[np.ndarray, Dict[str, np.ndarray]],
+        state: Optional[Tuple[np.ndarray, ...]] = None,
+        episode_start: Optional[np.ndarray] = None,
+        deterministic: bool = True,
+    ) -> Tuple[np.ndarray, None]:
+        """
+        Deterministic action for a single or batched observation, like ``model.predict``.
+
+        Args:
+            observation: Observation (dict of arrays for ``MultiInputPolicy`` models)
+            state: Unused, the exported policies are not recurrent
+            episode_start: Unused
+            deterministic: Must be True, the exported graph has no sampling
+
+        Returns:
+            Tuple of (action, None)
+        """
+        if not deterministic:
+            raise ValueError("Exported policies only compute deterministic actions")
+        if self.dict_obs:
+            arrays = [np.asarray(observation[name], dtype=np.float32) for name, _ in self.inputs]
+        else:
+            arrays = [np.asarray(observation, dtype=np.float32)]
+        vectorized = arrays[0].ndim > len(self.inputs[0][1])
+        if not vectorized:
+            arrays = [array[None] for array in arrays]
+        actions = np.clip(self._run(arrays), self.action_low, self.action_high)
+        return (actions if vectorized else actions[0]), None
+
+
+def _sample_observations(observation_space: spaces.Space, batch_size: int, seed: int = 0):
+    observation_space.seed(seed)
+    samples = [observation_space.sample() for _ in range(batch_size)]
+    if isinstance(observation_space, spaces.Dict):
+        return {key: np.stack([sample[key] for sample in samples]).astype(np.float32) for key in observation_space.spaces}
+    return np.stack(samples).astype(np.float32)
+
+
+def benchmark_latency(
+    predictors: Dict[str, Any],
+    observation_space: spaces.Space,
+    batch_sizes: Sequence[int] = (1, 64),
+    n_calls: int = 1000,
+    warmup: int = 50,
+) -> Dict[str, Dict[int, Dict[str, float]]]:
+    """
+    Per-action latency of ``predict`` for several predictors.
+
+    Args:
+        predictors: Name -> object with ``predict(obs, deterministic=True)`` (SB3 model or ``ExportedPolicy``)
+        observation_space: Observation space the inputs are sampled from
+        batch_sizes: Batch sizes to time (batch 1 uses an unbatched observation)
+        n_calls: Timed calls per predictor and batch size
+        warmup: Untimed calls before timing
+
+    Returns:
+        Name -> batch size -> ``p50_us``/``p99_us`` (microseconds per action)
+    """
+    results = {name: {} for name in predictors}
+    for batch_size in batch_sizes:
+        obs = _sample_observations(observation_space, batch_size)
+        if batch_size == 1:
+            obs = {key: value[0] for key, value in obs.items()} if isinstance(obs, dict) else obs[0]
+        for name, predictor in predictors.items():
+            for _ in range(warmup):
+                predictor.predict(obs, deterministic=True)
+            timings = np.empty(n_calls)
+            for i in range(n_calls):
+                start = time.perf_counter()
+                predictor.predict(obs, deterministic=True)
+                timings[i] = time.perf_counter() - start
+            per_action = timings * 1e6 / batch_size
+            results[name][batch_size] = {
+                "p50_us": float(np.percentile(per_action, 50)),
+                "p99_us": float(np.percentile(per_action, 99)),
+            }
+    return results
+
+
+def print_latency_table(results: Dict[str, Dict[int, Dict[str, float]]]) -> None:
+    """Print ``benchmark_latency`` results, with the speedup over the first predictor."""
+    baseline = next(iter(results.values()))
+    print(f"{'predictor':<14} {'batch':>5} {'p50 us/action':>14} {'p99 us/action':>14} {'p50 speedup':>12}")
+    for name, by_batch in results.items():
+        for batch_size, stats in by_batch.items():
+            speedup = baseline[batch_size]["p50_us"] / stats["p50_us"]
+            print(f"{name:<14} {batch_size:>5} {stats['p50_us']:>14.1f} {stats['p99_us']:>14.1f} {speedup:>11.2f}x")
+
+
+def check_export(model, predictor: ExportedPolicy, batch_size: int = 64, atol: float = 1e-4) -> float:
+    """Largest absolute difference between ``model.predict`` and the exported policy on random observations."""
+    obs = _sample_observations(model.observation_space, batch_size, seed=1)
+    expected, _ = model.predict(obs, deterministic=True)
+    actual, _ = predictor.predict(obs, deterministic=True)
+    error = float(np.max(np.abs(expected - actual)))
+    if error > atol:
+        raise RuntimeError(f"{predictor.path} differs from model.predict by {error:.2e}")
+    return error
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Export a DDPG/TD3/SAC actor to TorchScript and ONNX")
+    parser.add_argument("model", help="Saved SB3 model (.zip)")
+    parser.add_argument("--algo", default="DDPG", choices=["DDPG", "TD3", "SAC"])
+    parser.add_argument("--out-dir", default="./exported/")
+    parser.add_argument("--formats", nargs="+", default=["torchscript", "onnx"], choices=["torchscript", "onnx"])
+    parser.add_argument("--threads", type=int, default=1, help="Inference threads for the benchmark")
+    parser.add_argument("--benchmark", action="store_true", help="Time against model.predict at batch 1 and 64")
+    parser.add_argument("--calls", type=int, default=1000, help="Timed calls per batch size")
+    args = parser.parse_args(argv)
+
+    import stable_baselines3
+
+    th.set_num_threads(args.threads)
+    # Only the policy is needed: skip the replay buffer, so HER models load without an env
+    model = getattr(stable_baselines3, args.algo).load(
+        args.model, device="cpu",
+        custom_objects={"replay_buffer_class": None, "replay_buffer_kwargs": {}, "buffer_size": 1},
+    )
+    name = os.path.splitext(os.path.basename(args.model))[0]
+    extensions = {backend: extension for extension, backend in BACKENDS.items()}
+    predictors = {"model.predict": model}
+    for backend in args.formats:
+        path = export_policy(model, os.path.join(args.out_dir, name + extensions[backend]))
+        predictor = ExportedPolicy(path, num_threads=args.threads)
+        error = check_export(model, predictor)
+        print(f"Exported {path} (max abs difference to model.predict: {error:.1e})")
+        predictors[backend] = predictor
+
+    if args.benchmark:
+        print_latency_table(benchmark_latency(predictors, model.observation_space, n_calls=args.calls))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,306 @@
+"""
+CPU thread and affinity management for training runs that share a node.
+
+By default torch, OpenMP and MKL each size their thread pools to every core on
+the machine, and the MuJoCo envs step in the same process. When several runs
+are packed onto one node they oversubscribe the cores and throughput collapses.
+This module splits the node's cores into disjoint sets, one per run, and inside
+a run into a learner set and one core per env worker process.
+
+Entry points call ``configure_process_from_env()`` before importing torch,
+under ``if __name__ == "__main__"`` so that subprocess env workers, which
+re-import the script, do not pin themselves to the learner's cores. The core
+set is taken from environment variables so the same script can be packed
+without edits:
+
+    RUN_CORES=0-3 python src/Fetch/Fetch_train_slide.py
+    RUN_SLOT=1 RUNS_PER_NODE=4 python src/Fetch/Fetch_train_slide.py
+
+Usage (show a plan, or measure packing on this node):
+    python -m src.resource_manager --runs 4 --env-workers 2
+    python -m src.resource_manager --runs 4 --benchmark FetchSlide-v3
+"""
+
+import argparse
+import os
+import queue
+import time
+from multiprocessing import get_context
+from typing import Callable, Dict, List, Optional, Sequence
+
+THREAD_ENV_VARS = (
+    "OMP_NUM_THREADS",
+    "MKL_NUM_THREADS",
+    "OPENBLAS_NUM_THREADS",
+    "NUMEXPR_NUM_THREADS",
+)
+
+
+def available_cores() -> List[int]:
+    """
+    Return the cores this process is allowed to run on.
+
+    Returns:
+        Sorted list of core ids
+    """
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def parse_core_list(spec: str) -> List[int]:
+    """
+    Parse a core list such as ``"0-3,8,10-11"``.
+
+    Args:
+        spec: Comma separated cores and inclusive ranges
+
+    Returns:
+        Sorted list of core ids
+    """
+    cores = set()
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            start, end = part.split("-")
+            cores.update(range(int(start), int(end) + 1))
+        else:
+            cores.add(int(part))
+    if not cores:
+        raise ValueError(f"Empty core list: '{spec}'")
+    return sorted(cores)
+
+
+def format_core_list(cores: Sequence[int]) -> str:
+    """Inverse of ``parse_core_list``, collapsing consecutive cores into ranges."""
+    parts = []
+    cores = sorted(cores)
+    start = prev = cores[0]
+    for core in cores[1:] + [None]:
+        if core is not None and core == prev + 1:
+            prev = core
+            continue
+        parts.append(str(start) if start == prev else f"{start}-{prev}")
+        if core is not None:
+            start = prev = core
+    return ",".join(parts)
+
+
+def plan_runs(n_runs: int, env_workers: int = 0, cores: Optional[Sequence[int]] = None) -> List[Dict[str, List]]:
+    """
+    Split the node's cores into disjoint per-run allocations.
+
+    Each run gets a contiguous block of cores. Within a block the env workers
+    get one core each (shared round-robin if the block is too small) and the
+    learner keeps the rest, with at least one core.
+
+    Args:
+        n_runs: Number of runs packed on the node
+        env_workers: Number of env worker processes per run (0 for in-process envs)
+        cores: Cores to distribute (defaults to ``available_cores()``)
+
+    Returns:
+        One dict per run with ``cores``, ``learner`` and ``env_workers`` entries
+    """
+    cores = list(cores) if cores is not None else available_cores()
+    if n_runs < 1:
+        raise ValueError("n_runs must be at least 1")
+    if n_runs > len(cores):
+        raise ValueError(f"Cannot pack {n_runs} runs onto {len(cores)} cores")
+
+    block, extra = divmod(len(cores), n_runs)
+    plans = []
+    start = 0
+    for run in range(n_runs):
+        size = block + (1 if run < extra else 0)
+        run_cores = cores[start:start + size]
+        start += size
+
+        n_learner = max(1, size - env_workers)
+        learner = run_cores[:n_learner]
+        worker_pool = run_cores[n_learner:] or run_cores
+        workers = [[worker_pool[i % len(worker_pool)]] for i in range(env_workers)]
+        plans.append({"cores": run_cores, "learner": learner, "env_workers": workers})
+    return plans
+
+
+def configure_process(cores: Optional[Sequence[int]] = None, num_threads: Optional[int] = None) -> List[int]:
+    """
+    Pin the current process to a core set and size its thread pools to match.
+
+    The thread environment variables only take effect for libraries that have
+    not been loaded yet, so call this before importing torch where possible.
+    torch's own pools are then sized directly as well.
+
+    Args:
+        cores: Cores to pin to (defaults to the current affinity)
+        num_threads: Thread pool size (defaults to the number of cores)
+
+    Returns:
+        The cores the process is pinned to
+    """
+    cores = list(cores) if cores is not None else available_cores()
+    if hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cores)
+    num_threads = num_threads or len(cores)
+
+    for var in THREAD_ENV_VARS:
+        os.environ[var] = str(num_threads)
+
+    try:
+        import torch as th
+    except ImportError:
+        return cores
+    th.set_num_threads(num_threads)
+    try:
+        th.set_num_interop_threads(1)
+    except RuntimeError:
+        # Only allowed once, before any inter-op parallel work has started
+        pass
+    return cores
+
+
+def allocation_from_env() -> Dict[str, List]:
+    """
+    Build this run's allocation from ``RUN_CORES`` or ``RUN_SLOT``/``RUNS_PER_NODE``.
+
+    ``ENV_WORKERS`` sets the number of env worker processes in the run. Without
+    any of these variables the run owns every available core.
+
+    Returns:
+        Allocation dict as produced by ``plan_runs``
+    """
+    env_workers = int(os.environ.get("ENV_WORKERS", 0))
+    if "RUN_CORES" in os.environ:
+        cores = parse_core_list(os.environ["RUN_CORES"])
+        return plan_runs(1, env_workers, cores)[0]
+    runs_per_node = int(os.environ.get("RUNS_PER_NODE", 1))
+    slot = int(os.environ.get("RUN_SLOT", 0))
+    return plan_runs(runs_per_node, env_workers)[slot % runs_per_node]
+
+
+def configure_process_from_env() -> Dict[str, List]:
+    """
+    Pin the learner process of an entry point according to the environment.
+
+    Call it from the main process only; env workers are pinned by ``pinned_env_fn``.
+
+    Returns:
+        The run's allocation, to pass to ``pinned_env_fn`` for env workers
+    """
+    allocation = allocation_from_env()
+    configure_process(allocation["learner"])
+    print(f"Learner pinned to cores {format_core_list(allocation['learner'])}")
+    return allocation
+
+
+def pinned_env_fn(env_fn: Callable, cores: Sequence[int]) -> Callable:
+    """
+    Wrap an env factory so the worker process that builds it is pinned first.
+
+    Intended for ``SubprocVecEnv``: each worker runs single-threaded on its
+    own core instead of inheriting the learner's thread pools.
+
+    Args:
+        env_fn: Zero-argument function that creates the environment
+        cores: Cores for the worker process
+
+    Returns:
+        Zero-argument env factory
+    """
+    cores = list(cores)
+
+    def _init():
+        configure_process(cores, num_threads=1)
+        return env_fn()
+
+    return _init
+
+
+def _benchmark_worker(env_id: str, allocation: Dict[str, List], n_steps: int, results) -> None:
+    configure_process(allocation["learner"])
+    import gymnasium as gym
+    import gymnasium_robotics
+    import torch as th
+
+    gym.register_envs(gymnasium_robotics)
+    env = gym.make(env_id)
+    env.reset(seed=0)
+    # A small MLP update per step stands in for the learner's gradient step
+    net = th.nn.Sequential(th.nn.Linear(256, 256), th.nn.ReLU(), th.nn.Linear(256, 256))
+    optimizer = th.optim.Adam(net.parameters())
+    batch = th.randn(256, 256)
+
+    start = time.perf_counter()
+    for _ in range(n_steps):
+        _, _, terminated, truncated, _ = env.step(env.action_space.sample())
+        if terminated or truncated:
+            env.reset()
+        loss = net(batch).pow(2).mean()
+        optimizer.zero_grad()
+        loss.backward()
+        optimizer.step()
+    results.put((format_core_list(allocation["cores"]), n_steps / (time.perf_counter() - start)))
+    env.close()
+
+
+def benchmark_packing(env_id: str, n_runs: int, n_steps: int = 2000) -> List[float]:
+    """
+    Measure per-run steps/sec with ``n_runs`` pinned runs sharing the node.
+
+    Args:
+        env_id: Environment stepped by every run
+        n_runs: Number of concurrent runs
+        n_steps: Env steps (each followed by one MLP update) per run
+
+    Returns:
+        Steps/sec of each run
+    """
+    ctx = get_context("spawn")
+    results = ctx.Queue()
+    processes = [
+        ctx.Process(target=_benchmark_worker, args=(env_id, allocation, n_steps, results))
+        for allocation in plan_runs(n_runs)
+    ]
+    for process in processes:
+        process.start()
+    rates = []
+    while len(rates) < len(processes):
+        try:
+            rates.append(results.get(timeout=1.0))
+        except queue.Empty:
+            if any(process.exitcode not in (None, 0) for process in processes):
+                raise RuntimeError("A benchmark run failed, see the traceback above")
+    for process in processes:
+        process.join()
+
+    for cores, rate in sorted(rates, key=lambda item: parse_core_list(item[0])[0]):
+        print(f"  cores {cores:>10}: {rate:8.1f} steps/sec")
+    return [rate for _, rate in rates]
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Plan or benchmark core allocations for packed runs")
+    parser.add_argument("--runs", type=int, default=1, help="Number of runs packed on this node")
+    parser.add_argument("--env-workers", type=int, default=0, help="Env worker processes per run")
+    parser.add_argument("--benchmark", metavar="ENV_ID", help="Measure steps/sec for 1 and --runs runs")
+    parser.add_argument("--steps", type=int, default=2000, help="Steps per run when benchmarking")
+    args = parser.parse_args(argv)
+
+    for slot, plan in enumerate(plan_runs(args.runs, args.env_workers)):
+        workers = " ".join(format_core_list(w) for w in plan["env_workers"]) or "-"
+        print(f"RUN_SLOT={slot}: cores {format_core_list(plan['cores'])}, "
+              f"learner {format_core_list(plan['learner'])}, env workers {workers}")
+
+    if args.benchmark:
+        print(f"\n1 run on {args.benchmark}:")
+        single = benchmark_packing(args.benchmark, 1, args.steps)[0]
+        print(f"\n{args.runs} runs on {args.benchmark}:")
+        packed = benchmark_packing(args.benchmark, args.runs, args.steps)
+        print(f"\nAggregate speedup: {sum(packed) / single:.2f}x for {args.runs} runs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,392 @@
+"""
+Streaming reward plots for large Monitor logs and live training runs.
+
+Episode rewards are read in chunks from SB3 Monitor CSV files (or from
+``.npy``/``.npz`` trajectory shards holding a ``rewards`` array) and folded
+into a ``StreamingRewardSeries``: a fixed number of episode buckets holding the
+rolling mean, reward quantiles and min/max, all computed with NumPy. Memory
+and plotting cost stay bounded no matter how many episodes are read.
+
+Rendering uses the Agg backend in a separate process, so neither a training
+loop nor this module's file follower ever waits on matplotlib.
+
+Usage:
+    python -m src.reward_plots logs/monitor.csv --output rewards.png
+    python -m src.reward_plots logs/monitor.csv --output rewards.png --follow
+"""
+
+import argparse
+import glob
+import io
+import os
+import queue
+import time
+from multiprocessing import get_context
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+QUANTILES = (0.1, 0.5, 0.9)
+
+
+def rolling_mean(values: np.ndarray, window: int, history: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Trailing rolling mean via cumulative sums.
+
+    Args:
+        values: New values
+        window: Window length
+        history: Up to ``window - 1`` values preceding ``values`` (for chunked input)
+
+    Returns:
+        Rolling mean for each entry of ``values``; the first entries of a
+        series average over the values available so far
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if history is None or window <= 1:
+        history = np.empty(0)
+    else:
+        history = np.asarray(history, dtype=np.float64)[-(window - 1):]
+    full = np.concatenate([history, values])
+    cumsum = np.concatenate([[0.0], np.cumsum(full)])
+    end = np.arange(len(history) + 1, len(full) + 1)
+    start = np.maximum(end - window, 0)
+    return (cumsum[end] - cumsum[start]) / (end - start)
+
+
+def downsample(x: np.ndarray, y: np.ndarray, max_points: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Reduce a series to at most ``max_points`` points, keeping each bucket's
+    min and max so spikes stay visible.
+
+    Args:
+        x: x values
+        y: y values
+        max_points: Maximum number of returned points
+
+    Returns:
+        Downsampled (x, y)
+    """
+    x, y = np.asarray(x), np.asarray(y)
+    if len(y) <= max_points:
+        return x, y
+    n_buckets = max(max_points // 2, 1)
+    bucket = -(-len(y) // n_buckets)
+    pad = n_buckets * bucket - len(y)
+    y_padded = np.concatenate([y, np.full(pad, y[-1])]).reshape(n_buckets, bucket)
+    x_padded = np.concatenate([x, np.full(pad, x[-1])]).reshape(n_buckets, bucket)
+    rows = np.arange(n_buckets)
+    low, high = y_padded.argmin(axis=1), y_padded.argmax(axis=1)
+    first, second = np.minimum(low, high), np.maximum(low, high)
+    x_out = np.stack([x_padded[rows, first], x_padded[rows, second]], axis=1).ravel()
+    y_out = np.stack([y_padded[rows, first], y_padded[rows, second]], axis=1).ravel()
+    return x_out, y_out
+
+
+def iter_monitor_chunks(path: str, chunk_rows: int = 100_000, offset: int = 0) -> Iterator[Tuple[int, np.ndarray]]:
+    """
+    Stream episode rewards from an SB3 Monitor CSV file.
+
+    Only complete lines are consumed, so a file that is still being written
+    can be followed by passing back the returned offset.
+
+    Args:
+        path: Monitor CSV (``#{json}`` line, ``r,l,t`` header, one row per episode)
+        chunk_rows: Episodes per yielded chunk
+        offset: Byte offset to resume from (0 reads the headers first)
+
+    Yields:
+        Tuples of (byte offset after the chunk, rewards of the chunk)
+    """
+    with open(path, "rb") as f:
+        f.seek(offset)
+        if offset == 0:
+            f.readline()  # JSON metadata
+            header = f.readline().decode("utf-8").strip().split(",")
+            if "r" not in header:
+                raise ValueError(f"{path} is not a Monitor CSV file (header: {header})")
+        while True:
+            start = f.tell()
+            lines = f.readlines(chunk_rows * 32)
+            if not lines:
+                return
+            if not lines[-1].endswith(b"\n"):
+                # Partial last line of a file that is still being written
+                f.seek(start + sum(len(line) for line in lines[:-1]))
+                lines = lines[:-1]
+                if not lines:
+                    return
+            # The reward is the first column of every Monitor row
+            rewards = np.loadtxt(io.BytesIO(b"".join(lines)), delimiter=",", usecols=0, ndmin=1)
+            yield f.tell(), rewards
+
+
+def iter_shard_rewards(pattern: str) -> Iterator[np.ndarray]:
+    """
+    Stream rewards from trajectory shard files.
+
+    Args:
+        pattern: Glob pattern of ``.npy`` files (reward arrays) or ``.npz`` files
+            with a ``rewards`` entry; shards are read in sorted order
+
+    Yields:
+        Rewards of each shard
+    """
+    for path in sorted(glob.glob(pattern)):
+        if path.endswith(".npz"):
+            with np.load(path) as shard:
+                yield np.asarray(shard["rewards"], dtype=np.float64).ravel()
+        else:
+            yield np.load(path, mmap_mode="r").astype(np.float64).ravel()
+
+
+class StreamingRewardSeries:
+    """
+    Bounded summary of an episode-reward series that grows chunk by chunk.
+
+    Episodes are grouped into buckets of ``bucket_size`` episodes. Each bucket
+    stores the mean of the rolling-mean curve, reward quantiles and min/max.
+    When ``2 * max_points`` buckets exist, neighbours are merged pairwise and
+    the bucket size doubles; merged quantiles are averaged, so they become
+    approximate once merging starts, while mean, min and max stay exact.
+    """
+    def __init__(self, rolling_window: int = 100, max_points: int = 2000, quantiles: Sequence[float] = QUANTILES):
+        self.rolling_window = rolling_window
+        self.max_points = max_points
+        self.quantiles = tuple(quantiles)
+        self.bucket_size = 1
+        self.n_episodes = 0
+
+        self._history = np.empty(0)
+        self._pending = np.empty(0)
+        self._pending_smooth = np.empty(0)
+        self._episode = np.empty(0)
+        self._smooth = np.empty(0)
+        self._quantiles = np.empty((0, len(self.quantiles)))
+        self._min = np.empty(0)
+        self._max = np.empty(0)
+
+    def extend(self, rewards: np.ndarray) -> None:
+        """Add the rewards of new episodes, in order."""
+        rewards = np.asarray(rewards, dtype=np.float64).ravel()
+        if len(rewards) == 0:
+            return
+        smooth = rolling_mean(rewards, self.rolling_window, self._history)
+        if self.rolling_window > 1:
+            self._history = np.concatenate([self._history, rewards])[-(self.rolling_window - 1):]
+        self.n_episodes += len(rewards)
+        self._pending = np.concatenate([self._pending, rewards])
+        self._pending_smooth = np.concatenate([self._pending_smooth, smooth])
+        self._close_full_buckets()
+
+    def _close_full_buckets(self) -> None:
+        limit = 2 * self.max_points
+        while True:
+            n_full = min(len(self._pending) // self.bucket_size, limit - len(self._episode))
+            if n_full > 0:
+                size = n_full * self.bucket_size
+                raw = self._pending[:size].reshape(n_full, self.bucket_size)
+                smooth = self._pending_smooth[:size].reshape(n_full, self.bucket_size)
+                first = self.n_episodes - len(self._pending)
+
+                self._episode = np.concatenate([self._episode, first + (np.arange(n_full) + 1) * self.bucket_size])
+                self._smooth = np.concatenate([self._smooth, smooth.mean(axis=1)])
+                self._quantiles = np.concatenate([self._quantiles, np.quantile(raw, self.quantiles, axis=1).T])
+                self._min = np.concatenate([self._min, raw.min(axis=1)])
+                self._max = np.concatenate([self._max, raw.max(axis=1)])
+                self._pending = self._pending[size:]
+                self._pending_smooth = self._pending_smooth[size:]
+            if len(self._episode) < limit:
+                return
+            self._merge_pairs()
+
+    def _merge_pairs(self) -> None:
+        # Only called with an even number of buckets
+        self._episode = self._episode[1::2]
+        self._smooth = self._smooth.reshape(-1, 2).mean(axis=1)
+        self._quantiles = self._quantiles.reshape(-1, 2, len(self.quantiles)).mean(axis=1)
+        self._min = self._min.reshape(-1, 2).min(axis=1)
+        self._max = self._max.reshape(-1, 2).max(axis=1)
+        self.bucket_size *= 2
+
+    def snapshot(self) -> Dict[str, np.ndarray]:
+        """
+        Current summary, including the partially filled last bucket.
+
+        Returns:
+            Dict of arrays: episode, rolling_mean, quantiles, min, max
+        """
+        episode, smooth, quantiles = self._episode, self._smooth, self._quantiles
+        minimum, maximum = self._min, self._max
+        if len(self._pending):
+            episode = np.append(episode, self.n_episodes)
+            smooth = np.append(smooth, self._pending_smooth.mean())
+            quantiles = np.vstack([quantiles, np.quantile(self._pending, self.quantiles)])
+            minimum = np.append(minimum, self._pending.min())
+            maximum = np.append(maximum, self._pending.max())
+        return {
+            "episode": episode,
+            "rolling_mean": smooth,
+            "quantiles": quantiles,
+            "quantile_levels": np.asarray(self.quantiles),
+            "min": minimum,
+            "max": maximum,
+        }
+
+
+def render_snapshot(snapshot: Dict[str, np.ndarray], save_path: str, title: str = "Episode Rewards") -> None:
+    """
+    Draw a ``StreamingRewardSeries`` snapshot to an image file with Agg.
+
+    The image is written to a temporary file and renamed into place, so a
+    viewer polling ``save_path`` never sees a half-written file.
+
+    Args:
+        snapshot: Output of ``StreamingRewardSeries.snapshot()``
+        save_path: Image path (format from the extension)
+        title: Plot title
+    """
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    figure = Figure(figsize=(10, 6))
+    FigureCanvasAgg(figure)
+    ax = figure.add_subplot(1, 1, 1)
+    episode = snapshot["episode"]
+    if len(episode):
+        levels = snapshot["quantile_levels"]
+        quantiles = snapshot["quantiles"]
+        ax.fill_between(episode, snapshot["min"], snapshot["max"], color="tab:blue", alpha=0.1, label="min/max")
+        if len(levels) >= 2:
+            ax.fill_between(episode, quantiles[:, 0], quantiles[:, -1], color="tab:blue", alpha=0.25,
+                            label=f"q{levels[0]:.2f}-q{levels[-1]:.2f}")
+        ax.plot(episode, snapshot["rolling_mean"], color="tab:blue", label="rolling mean")
+        ax.legend(loc="lower right")
+    ax.set_xlabel("Episode")
+    ax.set_ylabel("Total Reward")
+    ax.set_title(title)
+    ax.grid(True)
+
+    root, extension = os.path.splitext(save_path)
+    tmp_path = f"{root}.tmp{extension}"
+    figure.savefig(tmp_path)
+    os.replace(tmp_path, save_path)
+
+
+def _render_worker(requests) -> None:
+    while True:
+        request = requests.get()
+        if request is None:
+            return
+        render_snapshot(*request)
+
+
+class BackgroundRenderer:
+    """
+    Render snapshots in a separate process without blocking the caller.
+
+    Only the latest request matters: if the renderer is still busy, a newer
+    submission replaces the one waiting in the queue.
+    """
+    def __init__(self):
+        ctx = get_context("spawn")
+        self._requests = ctx.Queue(maxsize=1)
+        self._process = ctx.Process(target=_render_worker, args=(self._requests,), daemon=True)
+        self._process.start()
+
+    def submit(self, snapshot: Dict[str, np.ndarray], save_path: str, title: str = "Episode Rewards") -> None:
+        """Queue a snapshot for rendering, replacing any request still waiting."""
+        request = (snapshot, save_path, title)
+        while True:
+            try:
+                self._requests.put_nowait(request)
+                return
+            except queue.Full:
+                try:
+                    self._requests.get_nowait()
+                except queue.Empty:
+                    pass
+
+    def close(self) -> None:
+        """Render the last queued snapshot, then stop the process."""
+        while self._process.is_alive():
+            try:
+                self._requests.put(None, timeout=1.0)
+                break
+            except queue.Full:
+                continue
+        self._process.join()
+        if self._process.exitcode != 0:
+            print(f"Reward renderer exited with code {self._process.exitcode}")
+
+
+def plot_rewards(
+    sources: Sequence[str],
+    save_path: str,
+    title: str = "Episode Rewards",
+    rolling_window: int = 100,
+    max_points: int = 2000,
+    follow: bool = False,
+    interval: float = 10.0,
+) -> StreamingRewardSeries:
+    """
+    Plot episode rewards from Monitor CSV files or trajectory shards.
+
+    Args:
+        sources: Monitor CSV paths, or glob patterns of ``.npy``/``.npz`` shards
+        save_path: Image path
+        title: Plot title
+        rolling_window: Episodes in the rolling mean
+        max_points: Bound on plotted buckets (between ``max_points`` and twice that)
+        follow: Keep reading the Monitor files as training appends to them
+        interval: Seconds between updates when following
+
+    Returns:
+        The series after the last read
+    """
+    series = StreamingRewardSeries(rolling_window=rolling_window, max_points=max_points)
+    monitors = [source for source in sources if source.endswith(".csv")]
+    offsets = {path: 0 for path in monitors}
+    for source in sources:
+        if source not in offsets:
+            for rewards in iter_shard_rewards(source):
+                series.extend(rewards)
+
+    renderer = BackgroundRenderer()
+    try:
+        while True:
+            for path in monitors:
+                if not os.path.exists(path):
+                    continue
+                for offset, rewards in iter_monitor_chunks(path, offset=offsets[path]):
+                    offsets[path] = offset
+                    series.extend(rewards)
+            renderer.submit(series.snapshot(), save_path, title)
+            if not follow:
+                break
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        renderer.close()
+    print(f"Plotted {series.n_episodes} episodes to {save_path}")
+    return series
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Plot episode rewards from Monitor logs or trajectory shards")
+    parser.add_argument("sources", nargs="+", help="Monitor CSV files or shard glob patterns")
+    parser.add_argument("--output", default="rewards.png", help="Image path")
+    parser.add_argument("--title", default="Episode Rewards")
+    parser.add_argument("--window", type=int, default=100, help="Episodes in the rolling mean")
+    parser.add_argument("--max-points", type=int, default=2000, help="Bound on plotted buckets")
+    parser.add_argument("--follow", action="store_true", help="Keep updating while training runs (Ctrl-C to stop)")
+    parser.add_argument("--interval", type=float, default=10.0, help="Seconds between updates with --follow")
+    args = parser.parse_args(argv)
+
+    plot_rewards(args.sources, args.output, title=args.title, rolling_window=args.window,
+                 max_points=args.max_points, follow=args.follow, interval=args.interval)
+
+
+if __name__ == "__main__":
+    main()
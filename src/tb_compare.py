@@ -0,0 +1,297 @@
+"""
+Fast offline comparison of TensorBoard runs.
+
+Event files are parsed directly (record by record, with CRC checks) into an
+SQLite index of (run, tag, step, value). Indexing is incremental: each file's
+read offset is stored, so re-indexing only parses records appended since the
+last pass. Queries and plots then run against the index instead of the event
+files.
+
+Usage:
+    python -m src.tb_compare index her_fetch_tensorboard her_fetch_slide_tensorboard
+    python -m src.tb_compare tags
+    python -m src.tb_compare query rollout/success_rate --step 500000
+    python -m src.tb_compare plot rollout/success_rate --runs "her_fetch_slide*" --output slide.png
+"""
+
+import argparse
+import fnmatch
+import os
+import sqlite3
+from multiprocessing import Pool
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from src.tb_events import decode_scalar_event, find_event_files, iter_records_from
+
+DEFAULT_INDEX = "tb_index.sqlite"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    run TEXT NOT NULL,
+    offset INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS scalars (
+    run TEXT NOT NULL,
+    tag TEXT NOT NULL,
+    step INTEGER NOT NULL,
+    value REAL NOT NULL,
+    wall_time REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS scalars_tag_run_step ON scalars (tag, run, step);
+"""
+
+
+def open_index(path: str = DEFAULT_INDEX) -> sqlite3.Connection:
+    """
+    Open (and create if needed) an index database.
+
+    Args:
+        path: SQLite file
+
+    Returns:
+        Open connection
+    """
+    connection = sqlite3.connect(path)
+    connection.executescript(_SCHEMA)
+    return connection
+
+
+def _parse_file(job: Tuple[str, str, int, bool]) -> Tuple[str, str, int, List[Tuple]]:
+    path, run, offset, verify_crc = job
+    rows = []
+    for offset, record in iter_records_from(path, offset, verify_crc=verify_crc):
+        wall_time, step, scalars = decode_scalar_event(record)
+        rows.extend((run, tag, step, value, wall_time) for tag, value in scalars)
+    return path, run, offset, rows
+
+
+def index_runs(
+    connection: sqlite3.Connection,
+    roots: Sequence[str],
+    workers: Optional[int] = None,
+    verify_crc: bool = True,
+) -> int:
+    """
+    Add new records from every event file below ``roots`` to the index.
+
+    A run is named after the directory that holds its event files, relative to
+    the parent of the root it was found under (e.g. ``her_fetch_tensorboard/DDPG_1``).
+
+    Args:
+        connection: Index connection
+        roots: Directories (or event files) to scan
+        workers: Parser processes (defaults to the number of cores)
+        verify_crc: Check record checksums
+
+    Returns:
+        Number of scalars added
+    """
+    offsets = dict(connection.execute("SELECT path, offset FROM files"))
+    jobs = []
+    for root in roots:
+        base = os.path.dirname(os.path.abspath(root.rstrip(os.sep)))
+        for path in find_event_files(root):
+            path = os.path.abspath(path)
+            offset = offsets.get(path, 0)
+            if offset >= os.path.getsize(path):
+                continue
+            run = os.path.relpath(os.path.dirname(path), base)
+            jobs.append((path, run, offset, verify_crc))
+    if not jobs:
+        return 0
+
+    added = 0
+    with Pool(processes=min(workers or os.cpu_count() or 1, len(jobs))) as pool:
+        for path, run, offset, rows in pool.imap_unordered(_parse_file, jobs):
+            with connection:
+                connection.executemany("INSERT INTO scalars VALUES (?, ?, ?, ?, ?)", rows)
+                connection.execute(
+                    "INSERT OR REPLACE INTO files (path, run, offset) VALUES (?, ?, ?)", (path, run, offset)
+                )
+            added += len(rows)
+    return added
+
+
+def list_runs(connection: sqlite3.Connection, pattern: str = "*") -> List[str]:
+    """Indexed run names matching a glob pattern."""
+    runs = [row[0] for row in connection.execute("SELECT DISTINCT run FROM files ORDER BY run")]
+    return fnmatch.filter(runs, pattern)
+
+
+def list_tags(connection: sqlite3.Connection) -> List[Tuple[str, int]]:
+    """Indexed tags with the number of runs that log each one."""
+    return list(connection.execute(
+        "SELECT tag, COUNT(DISTINCT run) FROM scalars GROUP BY tag ORDER BY tag"
+    ))
+
+
+def value_at(
+    connection: sqlite3.Connection,
+    tag: str,
+    step: int,
+    pattern: str = "*",
+    include_ended: bool = False,
+) -> Dict[str, Tuple[int, float]]:
+    """
+    Value of ``tag`` at ``step`` in every matching run.
+
+    Uses the last point logged at or before ``step``; runs whose first point
+    comes after ``step`` report that first point instead. Runs whose last
+    point comes before ``step`` never reached it and are skipped unless
+    ``include_ended`` is set, in which case they report that last point.
+
+    Args:
+        connection: Index connection
+        tag: Scalar tag, e.g. ``rollout/success_rate``
+        step: Global step
+        pattern: Glob pattern on run names
+        include_ended: Also report runs that ended before ``step``
+
+    Returns:
+        Mapping from run to (step, value)
+    """
+    results = {}
+    for run in list_runs(connection, pattern):
+        if not include_ended:
+            last = last_step(connection, tag, run)
+            if last is not None and last < step:
+                continue
+        row = connection.execute(
+            "SELECT step, value FROM scalars WHERE tag = ? AND run = ? AND step <= ? "
+            "ORDER BY step DESC LIMIT 1",
+            (tag, run, step),
+        ).fetchone()
+        if row is None:
+            row = connection.execute(
+                "SELECT step, value FROM scalars WHERE tag = ? AND run = ? ORDER BY step LIMIT 1",
+                (tag, run),
+            ).fetchone()
+        if row is not None:
+            results[run] = row
+    return results
+
+
+def last_step(connection: sqlite3.Connection, tag: str, run: str) -> Optional[int]:
+    """Step of the last point of ``tag`` logged by ``run``, or None if it never logged it."""
+    return connection.execute(
+        "SELECT MAX(step) FROM scalars WHERE tag = ? AND run = ?", (tag, run)
+    ).fetchone()[0]
+
+
+def series(connection: sqlite3.Connection, tag: str, pattern: str = "*") -> Dict[str, Tuple[List[int], List[float]]]:
+    """
+    Full (steps, values) series of ``tag`` for every matching run.
+
+    Args:
+        connection: Index connection
+        tag: Scalar tag
+        pattern: Glob pattern on run names
+
+    Returns:
+        Mapping from run to (steps, values), sorted by step
+    """
+    results = {}
+    for run in list_runs(connection, pattern):
+        rows = connection.execute(
+            "SELECT step, value FROM scalars WHERE tag = ? AND run = ? ORDER BY step", (tag, run)
+        ).fetchall()
+        if rows:
+            steps, values = zip(*rows)
+            results[run] = (list(steps), list(values))
+    return results
+
+
+def plot_comparison(
+    connection: sqlite3.Connection,
+    tag: str,
+    pattern: str = "*",
+    save_path: Optional[str] = None,
+) -> None:
+    """
+    Plot ``tag`` for every matching run on one figure.
+
+    Args:
+        connection: Index connection
+        tag: Scalar tag
+        pattern: Glob pattern on run names
+        save_path: Path to save the figure (if None, will display instead)
+    """
+    from src.mujoco_utils import visualize_rewards
+
+    data = series(connection, tag, pattern)
+    if not data:
+        raise ValueError(f"No runs matching '{pattern}' log '{tag}'")
+    visualize_rewards(
+        {run: values for run, (_, values) in data.items()},
+        title=tag,
+        save_path=save_path,
+        steps={run: steps for run, (steps, _) in data.items()},
+        xlabel="Step",
+        ylabel=tag,
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Index, query and compare TensorBoard runs")
+    parser.add_argument("--db", default=DEFAULT_INDEX, help="Index database file")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    index_parser = commands.add_parser("index", help="Parse event files into the index")
+    index_parser.add_argument("roots", nargs="+", help="Run directories or event files")
+    index_parser.add_argument("--workers", type=int, default=None, help="Parser processes")
+    index_parser.add_argument("--no-crc", action="store_true", help="Skip record checksum verification")
+
+    runs_parser = commands.add_parser("runs", help="List indexed runs")
+    runs_parser.add_argument("--runs", default="*", help="Glob pattern on run names")
+
+    commands.add_parser("tags", help="List indexed tags")
+
+    query_parser = commands.add_parser("query", help="Value of a tag at a step across runs")
+    query_parser.add_argument("tag")
+    query_parser.add_argument("--step", type=int, required=True)
+    query_parser.add_argument("--runs", default="*", help="Glob pattern on run names")
+    query_parser.add_argument("--include-ended", action="store_true",
+                              help="Also show runs that ended before --step, at their last point")
+
+    plot_parser = commands.add_parser("plot", help="Plot a tag across runs")
+    plot_parser.add_argument("tag")
+    plot_parser.add_argument("--runs", default="*", help="Glob pattern on run names")
+    plot_parser.add_argument("--output", default=None, help="Save the figure instead of showing it")
+
+    args = parser.parse_args(argv)
+    connection = open_index(args.db)
+
+    if args.command == "index":
+        added = index_runs(connection, args.roots, workers=args.workers, verify_crc=not args.no_crc)
+        print(f"Indexed {added} new scalars into {args.db}")
+    elif args.command == "runs":
+        for run in list_runs(connection, args.runs):
+            print(run)
+    elif args.command == "tags":
+        for tag, n_runs in list_tags(connection):
+            print(f"{tag:40s} {n_runs} runs")
+    elif args.command == "query":
+        results = value_at(connection, args.tag, args.step, args.runs, include_ended=True)
+        ended = {run for run in results if last_step(connection, args.tag, run) < args.step}
+        if not args.include_ended:
+            results = {run: row for run, row in results.items() if run not in ended}
+        if not results:
+            print(f"No runs matching '{args.runs}' log '{args.tag}' up to step {args.step}")
+        for run, (step, value) in sorted(results.items()):
+            if run in ended:
+                note = " (run ended before the queried step)"
+            elif step > args.step:
+                note = " (first logged point)"
+            else:
+                note = ""
+            print(f"{run:45s} step {step:>9d}  {value:.4f}{note}")
+        if ended and not args.include_ended:
+            print(f"Skipped {len(ended)} runs that ended before step {args.step} (see --include-ended)")
+    elif args.command == "plot":
+        plot_comparison(connection, args.tag, args.runs, args.output)
+    connection.close()
+
+
+if __name__ == "__main__":
+    main()
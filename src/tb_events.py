@@ -0,0 +1,327 @@
+"""
+Reading and writing TensorBoard event files without TensorFlow.
+
+An event file is a sequence of TFRecords, each holding one serialized
+``Event`` protobuf. Only the fields needed for scalar logging are handled:
+``wall_time``, ``step``, ``file_version`` and ``Summary`` values carrying either
+a ``simple_value`` or a scalar ``tensor``.
+
+Record layout:
+    uint64 length | uint32 masked_crc32c(length) | data | uint32 masked_crc32c(data)
+"""
+
+import os
+import socket
+import struct
+import time
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+try:
+    # Optional C implementation, much faster than the table below on large files
+    from crc32c import crc32c as _crc32c_fast
+except ImportError:
+    _crc32c_fast = None
+
+EVENT_FILE_PREFIX = "events.out.tfevents"
+
+_CRC32C_POLY = 0x82F63B78
+_CRC_MASK_DELTA = 0xA282EAD8
+
+
+def _make_crc_table() -> List[int]:
+    table = []
+    for byte in range(256):
+        crc = byte
+        for _ in range(8):
+            crc = (crc >> 1) ^ _CRC32C_POLY if crc & 1 else crc >> 1
+        table.append(crc)
+    return table
+
+
+_CRC_TABLE = _make_crc_table()
+
+
+def crc32c(data: bytes) -> int:
+    """Castagnoli CRC32 of ``data``."""
+    if _crc32c_fast is not None:
+        return _crc32c_fast(data)
+    crc = 0xFFFFFFFF
+    table = _CRC_TABLE
+    for byte in data:
+        crc = table[(crc ^ byte) & 0xFF] ^ (crc >> 8)
+    return crc ^ 0xFFFFFFFF
+
+
+def masked_crc32c(data: bytes) -> int:
+    """CRC as stored in TFRecord files."""
+    crc = crc32c(data)
+    return (((crc >> 15) | (crc << 17)) + _CRC_MASK_DELTA) & 0xFFFFFFFF
+
+
+class CorruptRecordError(ValueError):
+    """Raised when a record's length or data checksum does not match."""
+
+
+# --- Protobuf wire format ---
+
+def _encode_varint(value: int) -> bytes:
+    value &= (1 << 64) - 1
+    out = bytearray()
+    while True:
+        bits = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(bits | 0x80)
+        else:
+            out.append(bits)
+            return bytes(out)
+
+
+def _encode_field(number: int, wire_type: int, payload: bytes) -> bytes:
+    key = _encode_varint((number << 3) | wire_type)
+    if wire_type == 2:
+        return key + _encode_varint(len(payload)) + payload
+    return key + payload
+
+
+def _decode_varint(buf: bytes, pos: int) -> Tuple[int, int]:
+    result = shift = 0
+    while True:
+        byte = buf[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return result, pos
+        shift += 7
+
+
+def _iter_fields(buf: bytes) -> Iterator[Tuple[int, int, object]]:
+    """Yield ``(field_number, wire_type, value)`` for each field of a message."""
+    pos = 0
+    end = len(buf)
+    while pos < end:
+        key, pos = _decode_varint(buf, pos)
+        number, wire_type = key >> 3, key & 7
+        if wire_type == 0:
+            value, pos = _decode_varint(buf, pos)
+        elif wire_type == 1:
+            value = buf[pos:pos + 8]
+            pos += 8
+        elif wire_type == 2:
+            length, pos = _decode_varint(buf, pos)
+            value = buf[pos:pos + length]
+            pos += length
+        elif wire_type == 5:
+            value = buf[pos:pos + 4]
+            pos += 4
+        else:
+            raise ValueError(f"Unsupported protobuf wire type {wire_type}")
+        yield number, wire_type, value
+
+
+def encode_scalar_event(step: int, scalars: Dict[str, float], wall_time: Optional[float] = None) -> bytes:
+    """
+    Serialize an ``Event`` holding one ``simple_value`` per tag.
+
+    Args:
+        step: Global step of the event
+        scalars: Mapping from tag to value
+        wall_time: Event time in seconds (defaults to now)
+
+    Returns:
+        Serialized ``Event`` protobuf
+    """
+    values = b"".join(
+        _encode_field(1, 2, _encode_field(1, 2, tag.encode("utf-8")) + _encode_field(2, 5, struct.pack("<f", value)))
+        for tag, value in scalars.items()
+    )
+    wall_time = time.time() if wall_time is None else wall_time
+    return (
+        _encode_field(1, 1, struct.pack("<d", wall_time))
+        + _encode_field(2, 0, _encode_varint(int(step)))
+        + _encode_field(5, 2, values)
+    )
+
+
+def _decode_tensor_scalar(buf: bytes) -> Optional[float]:
+    dtype = 0
+    content = None
+    for number, _, value in _iter_fields(buf):
+        if number == 1:
+            dtype = value
+        elif number == 4:
+            content = value
+        elif number == 5:
+            return struct.unpack("<f", value[:4])[0]
+        elif number == 6:
+            return struct.unpack("<d", value[:8])[0]
+        elif number in (7, 10):
+            return float(_decode_varint(value, 0)[0]) if isinstance(value, bytes) else float(value)
+    if content is not None:
+        # DT_FLOAT = 1, DT_DOUBLE = 2, DT_INT32 = 3, DT_INT64 = 9
+        fmt = {1: "<f", 2: "<d", 3: "<i", 9: "<q"}.get(dtype)
+        if fmt is not None and len(content) == struct.calcsize(fmt):
+            return float(struct.unpack(fmt, content)[0])
+    return None
+
+
+def decode_scalar_event(buf: bytes) -> Tuple[float, int, List[Tuple[str, float]]]:
+    """
+    Parse the scalar content of a serialized ``Event``.
+
+    Args:
+        buf: Serialized ``Event`` protobuf
+
+    Returns:
+        Tuple of (wall_time, step, [(tag, value), ...]). Non-scalar summary
+        values (images, histograms, ...) are skipped.
+    """
+    wall_time, step, scalars = 0.0, 0, []
+    for number, _, value in _iter_fields(buf):
+        if number == 1:
+            wall_time = struct.unpack("<d", value)[0]
+        elif number == 2:
+            step = value
+        elif number == 5:
+            for v_number, _, v_value in _iter_fields(value):
+                if v_number != 1:
+                    continue
+                tag, scalar = None, None
+                for f_number, _, f_value in _iter_fields(v_value):
+                    if f_number == 1:
+                        tag = f_value.decode("utf-8", errors="replace")
+                    elif f_number == 2:
+                        scalar = struct.unpack("<f", f_value)[0]
+                    elif f_number == 8:
+                        scalar = _decode_tensor_scalar(f_value)
+                if tag is not None and scalar is not None:
+                    scalars.append((tag, scalar))
+    return wall_time, step, scalars
+
+
+# --- TFRecord files ---
+
+def write_record(f: BinaryIO, data: bytes) -> None:
+    """Append one TFRecord to an open binary file."""
+    header = struct.pack("<Q", len(data))
+    f.write(header + struct.pack("<I", masked_crc32c(header)) + data + struct.pack("<I", masked_crc32c(data)))
+
+
+def iter_records_from(path: str, offset: int = 0, verify_crc: bool = True) -> Iterator[Tuple[int, bytes]]:
+    """
+    Stream the records of an event file one at a time, starting at ``offset``.
+
+    A truncated final record (e.g. from a run that is still writing or was
+    killed mid-write) ends the iteration quietly, so reading can resume from
+    the last returned offset once the file has grown.
+
+    Args:
+        path: Event file path
+        offset: Byte offset of the first record to read
+        verify_crc: Check the length and data checksums of every record
+
+    Yields:
+        Tuples of (offset after the record, raw record payload)
+    """
+    with open(path, "rb") as f:
+        f.seek(offset)
+        while True:
+            header = f.read(12)
+            if len(header) < 12:
+                return
+            length_bytes, length_crc = header[:8], struct.unpack("<I", header[8:])[0]
+            if verify_crc and masked_crc32c(length_bytes) != length_crc:
+                raise CorruptRecordError(f"Length checksum mismatch in {path} at offset {f.tell() - 12}")
+            length = struct.unpack("<Q", length_bytes)[0]
+            data = f.read(length)
+            footer = f.read(4)
+            if len(data) < length or len(footer) < 4:
+                return
+            if verify_crc and masked_crc32c(data) != struct.unpack("<I", footer)[0]:
+                raise CorruptRecordError(f"Data checksum mismatch in {path} at offset {f.tell() - length - 4}")
+            yield f.tell(), data
+
+
+def iter_records(path: str, verify_crc: bool = True) -> Iterator[bytes]:
+    """
+    Stream the records of an event file one at a time.
+
+    Args:
+        path: Event file path
+        verify_crc: Check the length and data checksums of every record
+
+    Yields:
+        Raw record payloads
+    """
+    for _, data in iter_records_from(path, verify_crc=verify_crc):
+        yield data
+
+
+def iter_scalars(path: str, verify_crc: bool = True) -> Iterator[Tuple[str, int, float, float]]:
+    """
+    Stream the scalars of an event file.
+
+    Args:
+        path: Event file path
+        verify_crc: Check record checksums
+
+    Yields:
+        Tuples of (tag, step, value, wall_time)
+    """
+    for record in iter_records(path, verify_crc=verify_crc):
+        wall_time, step, scalars = decode_scalar_event(record)
+        for tag, value in scalars:
+            yield tag, step, value, wall_time
+
+
+def find_event_files(root: str) -> List[str]:
+    """
+    Find every event file below ``root``.
+
+    Args:
+        root: Directory to search (or a single event file)
+
+    Returns:
+        Sorted list of event file paths
+    """
+    if os.path.isfile(root):
+        return [root]
+    paths = []
+    for dirpath, _, filenames in os.walk(root):
+        for name in filenames:
+            if name.startswith(EVENT_FILE_PREFIX):
+                paths.append(os.path.join(dirpath, name))
+    return sorted(paths)
+
+
+class EventFileWriter:
+    """
+    Minimal append-only writer for scalar TensorBoard event files.
+
+    Not thread-safe: callers that write from several threads must serialize
+    access themselves.
+    """
+    def __init__(self, log_dir: str, filename_suffix: str = ""):
+        os.makedirs(log_dir, exist_ok=True)
+        name = f"{EVENT_FILE_PREFIX}.{int(time.time())}.{socket.gethostname()}.{os.getpid()}.0{filename_suffix}"
+        self.path = os.path.join(log_dir, name)
+        self._file = open(self.path, "ab")
+        file_version = (
+            _encode_field(1, 1, struct.pack("<d", time.time()))
+            + _encode_field(3, 2, b"brain.Event:2")
+        )
+        write_record(self._file, file_version)
+        self._file.flush()
+
+    def add_scalars(self, step: int, scalars: Dict[str, float], wall_time: Optional[float] = None) -> None:
+        """Write one event holding all ``scalars`` at ``step``."""
+        if scalars:
+            write_record(self._file, encode_scalar_event(step, scalars, wall_time))
+
+    def flush(self) -> None:
+        self._file.flush()
+
+    def close(self) -> None:
+        if not self._file.closed:
+            self._file.flush()
+            self._file.close()
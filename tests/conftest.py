@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Make the repo's src package importable when pytest is run without installing it
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
@@ -0,0 +1,189 @@
+from types import SimpleNamespace
+
+import gymnasium as gym
+import numpy as np
+import pytest
+from stable_baselines3 import SAC
+
+from src.checkpointing import (IncrementalCheckpointCallback, IncrementalCheckpointer, _row_arrays, _row_ranges,
+                               load_checkpoint, read_manifest)
+
+BUFFER_SIZE = 200
+
+
+@pytest.mark.parametrize("start, count, expected", [
+    (0, 0, []),
+    (10, 5, [(10, 15)]),
+    (195, 5, [(195, 200)]),
+    (195, 10, [(195, 200), (0, 5)]),
+    (50, 200, [(0, 200)]),
+    (50, 250, [(0, 200)]),
+])
+def test_row_ranges(start, count, expected):
+    assert _row_ranges(start, count, BUFFER_SIZE) == expected
+
+
+def _checkpointer_after(tmp_path, pos, num_timesteps, full=False):
+    checkpointer = IncrementalCheckpointer(str(tmp_path))
+    checkpointer._manifest = {
+        "num_timesteps": num_timesteps,
+        "buffer": {"buffer_size": BUFFER_SIZE, "n_envs": 1, "pos": pos, "full": full},
+    }
+    return checkpointer
+
+
+def _buffer(pos, full=False):
+    return SimpleNamespace(buffer_size=BUFFER_SIZE, n_envs=1, pos=pos, full=full)
+
+
+def test_rows_to_write_without_previous_checkpoint(tmp_path):
+    checkpointer = IncrementalCheckpointer(str(tmp_path))
+    assert checkpointer._rows_to_write(_buffer(30), 30) == (0, 31)
+    assert checkpointer._rows_to_write(_buffer(30, full=True), 230) == (0, BUFFER_SIZE)
+
+
+def test_rows_to_write_incremental(tmp_path):
+    checkpointer = _checkpointer_after(tmp_path, pos=30, num_timesteps=30)
+    # One extra row for optimize_memory_usage
+    assert checkpointer._rows_to_write(_buffer(80), 80) == (30, 51)
+
+
+def test_rows_to_write_wraps_around(tmp_path):
+    checkpointer = _checkpointer_after(tmp_path, pos=150, num_timesteps=150)
+    assert checkpointer._rows_to_write(_buffer(20, full=True), 220) == (150, 71)
+
+
+def test_rows_to_write_rejects_unstored_steps(tmp_path):
+    # Saved before the current step is stored (e.g. from _on_step): the rows cannot be trusted
+    checkpointer = _checkpointer_after(tmp_path, pos=30, num_timesteps=30)
+    assert checkpointer._rows_to_write(_buffer(79), 80) == (0, 80)
+
+
+def test_callback_saves_after_the_step_is_stored(tmp_path):
+    model = SAC("MlpPolicy", gym.make("Pendulum-v1"), buffer_size=BUFFER_SIZE, learning_starts=10_000,
+                device="cpu", seed=0)
+    model.learn(45, callback=IncrementalCheckpointCallback(save_freq=20, checkpoint_dir=str(tmp_path)))
+    manifest = read_manifest(str(tmp_path))
+    assert manifest["buffer"]["pos"] == manifest["num_timesteps"] == 45
+    # Incremental after the step-40 checkpoint: 5 rows plus the optimize_memory_usage row
+    assert manifest["buffer"]["rows_written"] == 6
+
+
+def test_rows_to_write_falls_back_to_full_buffer(tmp_path):
+    # More steps than the buffer holds: positions alone cannot tell what changed
+    checkpointer = _checkpointer_after(tmp_path, pos=30, num_timesteps=30, full=True)
+    assert checkpointer._rows_to_write(_buffer(40, full=True), 30 + 3 * BUFFER_SIZE + 10) == (0, BUFFER_SIZE)
+    # Buffer resized since the previous checkpoint
+    checkpointer._manifest["buffer"]["buffer_size"] = 2 * BUFFER_SIZE
+    assert checkpointer._rows_to_write(_buffer(40, full=True), 40) == (0, BUFFER_SIZE)
+
+
+def _make_model():
+    model = SAC("MlpPolicy", gym.make("Pendulum-v1"), buffer_size=BUFFER_SIZE, learning_starts=10_000,
+                device="cpu", seed=0)
+    # Ring buffer full and wrapping before the first checkpoint
+    model.learn(BUFFER_SIZE + 50)
+    return model
+
+
+def _snapshot(model):
+    buffer = model.replay_buffer
+    return {key: array.copy() for key, array in _row_arrays(buffer).items()}, buffer.pos, buffer.full
+
+
+def _assert_restored(model, snapshot):
+    arrays, pos, full = snapshot
+    buffer = model.replay_buffer
+    assert (buffer.pos, buffer.full) == (pos, full)
+    restored = _row_arrays(buffer)
+    assert sorted(restored) == sorted(arrays)
+    for key, array in arrays.items():
+        np.testing.assert_array_equal(restored[key], array, err_msg=key)
+
+
+def _continue(model, steps=120):
+    model.learn(steps, reset_num_timesteps=False)
+
+
+def test_round_trip(tmp_path):
+    model = _make_model()
+    checkpointer = IncrementalCheckpointer(str(tmp_path))
+    checkpointer.save(model)
+    _continue(model)
+    manifest = checkpointer.save(model)
+    assert manifest["buffer"]["rows_written"] < BUFFER_SIZE
+
+    restored = load_checkpoint(SAC, str(tmp_path), env=gym.make("Pendulum-v1"), device="cpu")
+    assert restored.num_timesteps == model.num_timesteps
+    _assert_restored(restored, _snapshot(model))
+
+
+def test_crash_before_commit_keeps_previous_checkpoint(tmp_path, monkeypatch):
+    model = _make_model()
+    checkpointer = IncrementalCheckpointer(str(tmp_path))
+    checkpointer.save(model)
+    committed = _snapshot(model)
+    _continue(model)
+
+    def crash(*args, **kwargs):
+        raise RuntimeError("crash")
+
+    # The new rows are staged, but the process dies before the manifest is committed
+    monkeypatch.setattr(model, "save", crash)
+    with pytest.raises(RuntimeError):
+        checkpointer.save(model)
+
+    restored = load_checkpoint(SAC, str(tmp_path), env=gym.make("Pendulum-v1"), device="cpu")
+    _assert_restored(restored, committed)
+
+
+def test_crash_during_in_place_copy_is_completed_on_resume(tmp_path, monkeypatch):
+    model = _make_model()
+    checkpointer = IncrementalCheckpointer(str(tmp_path))
+    checkpointer.save(model)
+    _continue(model)
+    expected = _snapshot(model)
+
+    def torn_write(arrays, keys, ranges):
+        # Only some arrays, and only part of their rows, reach the .npy files
+        for key in keys[:2]:
+            memmap = checkpointer._open_memmap(key, arrays[key])
+            a, b = ranges[0]
+            memmap[a:(a + b) // 2] = arrays[key][a:(a + b) // 2]
+            memmap.flush()
+        raise RuntimeError("crash")
+
+    monkeypatch.setattr(checkpointer, "_write_rows", torn_write)
+    with pytest.raises(RuntimeError):
+        checkpointer.save(model)
+
+    restored = load_checkpoint(SAC, str(tmp_path), env=gym.make("Pendulum-v1"), device="cpu")
+    _assert_restored(restored, expected)
+
+
+def test_torn_copy_stays_repaired_after_the_next_checkpoint(tmp_path, monkeypatch):
+    model = _make_model()
+    checkpointer = IncrementalCheckpointer(str(tmp_path))
+    checkpointer.save(model)
+    _continue(model)
+
+    def torn_write(arrays, keys, ranges):
+        for key in keys:
+            memmap = checkpointer._open_memmap(key, arrays[key])
+            a, b = ranges[0]
+            memmap[a:b] = 0
+            memmap.flush()
+        raise RuntimeError("crash")
+
+    monkeypatch.setattr(checkpointer, "_write_rows", torn_write)
+    with pytest.raises(RuntimeError):
+        checkpointer.save(model)
+
+    # Resume, checkpoint the new rows (which drops the old segment), crash again and resume
+    resumed = load_checkpoint(SAC, str(tmp_path), env=gym.make("Pendulum-v1"), device="cpu")
+    _continue(resumed, steps=30)
+    IncrementalCheckpointer(str(tmp_path)).save(resumed)
+    expected = _snapshot(resumed)
+
+    restored = load_checkpoint(SAC, str(tmp_path), env=gym.make("Pendulum-v1"), device="cpu")
+    _assert_restored(restored, expected)